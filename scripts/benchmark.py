@@ -0,0 +1,367 @@
+"""
+読み上げパイプラインのベンチマーク (疑似エンジン使用、実エンジン不要)
+
+TaskManager → プレイヤー → save_log を通しで動かし、以下を JSON で出力する。
+  ttfa_ms        : テキスト投入から最初の音声がプレイヤーに届くまで
+  lines_per_sec  : 合成の処理速度 (保存時間を除く)
+  save_ms        : エンコード + タグ付け + 書き込みにかかった時間 (保存スレッド側)
+  save_ms_per_file : 1ファイルあたりの save_ms (--encoder でエンコーダ同士を比較できる)
+同じ設定で取った結果は --compare で別コミットの結果と比較できる。
+
+使い方:
+  python scripts/benchmark.py --output bench_before.json
+  (変更後)
+  python scripts/benchmark.py --compare bench_before.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+import aivis_reader  # noqa: E402
+from aivis_reader import AivisSynthesizer, cfg, create_task_manager  # noqa: E402
+from encoders import select_encoder  # noqa: E402
+from fake_engine import FakeEngine  # noqa: E402
+
+RESULT_VERSION = 1
+
+# 比較する指標と「大きい方が良いか」
+METRICS = {
+    "ttfa_ms": False,
+    "lines_per_sec": True,
+    "synth_ms": False,
+    "save_ms": False,
+    "save_ms_per_file": False,
+    "total_ms": False,
+    "realtime_factor": True,
+}
+
+_WORDS = [
+    "今日は",
+    "とても",
+    "良い天気",
+    "ですね",
+    "明日の会議は",
+    "午後から",
+    "始まります",
+    "資料を",
+    "確認して",
+    "おいてください",
+    "ありがとう",
+    "ございます",
+]
+
+
+def make_corpus(lines, seed=0):
+    """毎回同じになる読み上げ用テキスト (短い行と長い行が混ざる)"""
+    rng = random.Random(seed)
+    result = []
+    for _ in range(lines):
+        words = rng.choice([2, 3, 4, 8, 16])
+        result.append("".join(rng.choice(_WORDS) for _ in range(words)) + "。")
+    return result
+
+
+class BenchPlayer:
+    """音を出さず、届いた時刻と長さだけを記録するプレイヤー"""
+
+    def __init__(self):
+        self.first_audio_at = None
+        self.samples = 0
+        self.sample_rate = 0
+        self._lock = threading.Lock()
+
+    def enqueue(self, data, sr):
+        with self._lock:
+            if self.first_audio_at is None:
+                self.first_audio_at = time.perf_counter()
+            self.samples += len(data)
+            self.sample_rate = sr
+
+    def prewarm(self):
+        pass
+
+    def stop_immediate(self):
+        pass
+
+    def toggle_pause(self):
+        return False
+
+    @property
+    def audio_seconds(self):
+        return self.samples / self.sample_rate if self.sample_rate else 0.0
+
+
+@contextlib.contextmanager
+def override_config(values):
+    saved = dict(cfg.data)
+    cfg.data.update(values)
+    try:
+        yield
+    finally:
+        cfg.data.clear()
+        cfg.data.update(saved)
+
+
+def run_once(corpus):
+    """1回分の計測。save_log は実際にファイルを書き出し、total_ms は保存の完了まで"""
+    synth = AivisSynthesizer()
+    player = BenchPlayer()
+    manager = create_task_manager(synth, player)
+
+    started = time.perf_counter()
+    manager.add_text("\n".join(corpus))
+    manager.task_queue.join()
+    # 保存は別スレッドで行われるので、合成の所要時間には含めない
+    synth_seconds = max(time.perf_counter() - started, 1e-9)
+    synth.shutdown()
+    total = time.perf_counter() - started
+
+    save_stats = synth.get_save_stats()
+    save = save_stats["busy_sec"]
+    files = save_stats["saved"] + save_stats["failed"]
+    ttfa = None
+    if player.first_audio_at is not None:
+        ttfa = (player.first_audio_at - started) * 1000
+
+    return {
+        "ttfa_ms": ttfa,
+        "lines_per_sec": len(corpus) / synth_seconds,
+        "synth_ms": synth_seconds * 1000,
+        "save_ms": save * 1000,
+        "save_ms_per_file": save * 1000 / files if files else None,
+        "total_ms": total * 1000,
+        "realtime_factor": player.audio_seconds / synth_seconds,
+        "audio_seconds": player.audio_seconds,
+        "http": synth.get_http_stats(),
+    }
+
+
+def git_revision():
+    """計測したコミット (git が無ければ None)"""
+    root = os.path.join(os.path.dirname(__file__), "..")
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        return {"commit": commit, "dirty": bool(dirty)}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def run_benchmark(
+    lines=30,
+    repeat=3,
+    warmup=1,
+    latency_per_char=0.005,
+    latency_base=0.02,
+    engines=1,
+    pipeline_depth=None,
+    engine_mode="thread",
+    use_cache=False,
+    encoder="auto",
+    seed=0,
+    verbose=False,
+):
+    """
+    ベンチマークを実行して結果 (dict) を返す。
+    各指標は repeat 回の中央値。キャッシュは既定で無効 (毎回エンジンで合成)
+    encoder は "auto" / "soundfile" / "ffmpeg" / "flac"
+    """
+    force_flac = encoder == "flac"
+    backend = "auto" if force_flac else encoder
+    chosen = select_encoder(not force_flac, backend, aivis_reader.FFMPEG_PATH)
+    settings = {
+        "lines": lines,
+        "repeat": repeat,
+        "latency_per_char": latency_per_char,
+        "latency_base": latency_base,
+        "engines": engines,
+        "pipeline_depth": pipeline_depth or cfg.get("pipeline_depth", 2),
+        "engine_mode": engine_mode,
+        "cache": use_cache,
+        "seed": seed,
+        "encoder": chosen.name,
+    }
+    corpus = make_corpus(lines, seed)
+
+    fakes = [
+        FakeEngine(latency_per_char=latency_per_char, latency_base=latency_base)
+        for _ in range(engines)
+    ]
+    runs = []
+    with contextlib.ExitStack() as stack:
+        for fake in fakes:
+            stack.enter_context(fake)
+        work_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        if not verbose:
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+
+        overrides = {
+            "engines": [fake.url for fake in fakes],
+            "pipeline_depth": settings["pipeline_depth"],
+            "engine_mode": engine_mode,
+            "synth_cache": use_cache,
+            "query_cache": use_cache,
+            "cache_dir": os.path.join(work_dir, "cache"),
+            "dropbox_dir": work_dir,
+            "output_dir": "bench",
+            "override_date": None,
+            "dictionary": {},
+            "require_hiragana": False,
+            "min_length": 1,
+            "force_flac": force_flac,
+            "opus_encoder": backend,
+        }
+        with override_config(overrides):
+            for i in range(warmup + repeat):
+                result = run_once(corpus)
+                if i >= warmup:
+                    runs.append(result)
+
+    metrics = {}
+    for name in METRICS:
+        values = [r[name] for r in runs if r[name] is not None]
+        metrics[name] = statistics.median(values) if values else None
+
+    return {
+        "version": RESULT_VERSION,
+        **git_revision(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": settings,
+        "metrics": metrics,
+        "runs": runs,
+    }
+
+
+def compare(previous, current):
+    """2つの結果の差を表形式の文字列にする"""
+    lines = [
+        f"{'metric':<16}{'before':>12}{'after':>12}{'change':>10}",
+        "-" * 50,
+    ]
+    for name, higher_is_better in METRICS.items():
+        before = previous["metrics"].get(name)
+        after = current["metrics"].get(name)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        improved = change > 0 if higher_is_better else change < 0
+        # 5%未満の差は誤差として扱う
+        mark = ""
+        if abs(change) >= 5:
+            mark = "✅" if improved else "⚠️"
+        lines.append(f"{name:<16}{before:>12.2f}{after:>12.2f}{change:>+9.1f}% {mark}")
+
+    before_settings = dict(previous.get("settings") or {})
+    after_settings = dict(current.get("settings") or {})
+    # エンコーダ同士の比較はよく行うので、違っても注記だけにする
+    before_encoder = before_settings.pop("encoder", None)
+    after_encoder = after_settings.pop("encoder", None)
+    if before_encoder != after_encoder:
+        lines.append(f"ℹ️ エンコーダ: {before_encoder} → {after_encoder}")
+    if before_settings != after_settings:
+        lines.append("⚠️ 計測設定が異なるため、単純に比較できません。")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="読み上げパイプラインのベンチマーク")
+    parser.add_argument("--lines", type=int, default=30, help="読み上げる行数")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数 (中央値を採用)")
+    parser.add_argument("--warmup", type=int, default=1, help="計測前の空回し回数")
+    parser.add_argument("--latency-per-char", type=float, default=0.005)
+    parser.add_argument("--latency-base", type=float, default=0.02)
+    parser.add_argument("--engines", type=int, default=1, help="疑似エンジンの台数")
+    parser.add_argument("--pipeline-depth", type=int, default=None)
+    parser.add_argument(
+        "--engine-mode", choices=["thread", "asyncio"], default="thread"
+    )
+    parser.add_argument(
+        "--cache", action="store_true", help="合成キャッシュを有効にする"
+    )
+    parser.add_argument(
+        "--encoder",
+        choices=["auto", "soundfile", "ffmpeg", "flac"],
+        default="auto",
+        help="保存に使うエンコーダ (使えない場合は auto と同じ順で代わりを選ぶ)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="結果のJSONを書き出すファイル")
+    parser.add_argument("--compare", help="比較する過去の結果 (JSON)")
+    parser.add_argument("--verbose", action="store_true", help="処理中のログを表示")
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        # 比較元と同じ条件で計測する
+        saved = previous["settings"]
+        args.lines = saved["lines"]
+        args.repeat = saved["repeat"]
+        args.latency_per_char = saved["latency_per_char"]
+        args.latency_base = saved["latency_base"]
+        args.engines = saved["engines"]
+        args.pipeline_depth = saved["pipeline_depth"]
+        args.engine_mode = saved["engine_mode"]
+        args.cache = saved["cache"]
+        args.seed = saved["seed"]
+        # 比較元と違うエンコーダを --encoder で指定した場合はそちらを使う
+        if args.encoder == "auto":
+            args.encoder = saved.get("encoder", "auto")
+
+    result = run_benchmark(
+        lines=args.lines,
+        repeat=args.repeat,
+        warmup=args.warmup,
+        latency_per_char=args.latency_per_char,
+        latency_base=args.latency_base,
+        engines=args.engines,
+        pipeline_depth=args.pipeline_depth,
+        engine_mode=args.engine_mode,
+        use_cache=args.cache,
+        encoder=args.encoder,
+        seed=args.seed,
+        verbose=args.verbose,
+    )
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+    if previous is not None:
+        print()
+        print(compare(previous, result))
+
+
+if __name__ == "__main__":
+    main()
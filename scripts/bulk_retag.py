@@ -0,0 +1,153 @@
+"""
+保存フォルダのタグ一括書き換えツール (Opus / FLAC, サブフォルダを含む)
+
+アーティスト名・アルバム名 (接頭辞_日付)・カバー画像・トラック番号の振り直しを
+複数プロセスで並列に行う。すでに同じ値のファイルは書き換えない。
+
+使い方:
+  python scripts/bulk_retag.py Aivis_AudioLog --artist "新しい名前" --dry-run
+  python scripts/bulk_retag.py Aivis_AudioLog --from-config --renumber
+  (フォルダを省略すると、ドラッグ＆ドロップで指定できます)
+"""
+
+import argparse
+import os
+import sys
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from archive_retag import HAS_MUTAGEN, plan_retag, run_retag  # noqa: E402
+
+
+def load_config_defaults():
+    """config.json (config.local.json) のアーティスト名・アルバム接頭辞・カバー画像"""
+    # 作業プロセスでは読み込まないよう、必要になった時だけ import する
+    from aivis_reader import ConfigManager
+
+    cfg = ConfigManager()
+    artwork = cfg.get("artwork_path")
+    if artwork and not os.path.isabs(artwork):
+        artwork = os.path.join(cfg.root_dir, artwork)
+    return {
+        "artist": cfg.get("artist"),
+        "album_prefix": cfg.get("album_prefix"),
+        "artwork": artwork,
+        "artwork_max_px": cfg.get("artwork_max_px", 0),
+        "artwork_quality": cfg.get("artwork_quality", 90),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("root", nargs="?", help="対象のフォルダ (サブフォルダも対象)")
+    parser.add_argument("--artist", help="アーティスト名")
+    parser.add_argument(
+        "--album-prefix", help="アルバム名の接頭辞 (日付フォルダ内は 接頭辞_yymmdd)"
+    )
+    parser.add_argument("--artwork", help="埋め込むカバー画像")
+    parser.add_argument(
+        "--renumber",
+        action="store_true",
+        help="日付フォルダごとにトラック番号をファイル名 (保存時刻) 順に振り直す",
+    )
+    parser.add_argument(
+        "--from-config",
+        action="store_true",
+        help="指定しなかった項目を config.json の artist / album_prefix / artwork_path で補う",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0, help="並列プロセス数 (0 で CPU コア数)"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="書き換えずに変更内容だけ表示する"
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="変更のないファイルも表示する"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    print("=== 🎵 タグ一括書き換えツール (Opus / FLAC) ===")
+    if not HAS_MUTAGEN:
+        print("❌ エラー: mutagen がインストールされていません。")
+        print("pip install mutagen を実行してください。")
+        return 1
+
+    args = parse_args(argv)
+
+    root = args.root
+    if not root:
+        # フォルダの指定（ドラッグ＆ドロップ対応）
+        root = (
+            input("📁 対象のフォルダをここにドラッグ＆ドロップしてください: ")
+            .strip()
+            .strip('"')
+        )
+    if not os.path.isdir(root):
+        print("❌ エラー: フォルダが見つかりません。")
+        return 1
+
+    artwork_max_px, artwork_quality = 0, 90
+    if args.from_config:
+        defaults = load_config_defaults()
+        args.artist = args.artist or defaults["artist"]
+        args.album_prefix = args.album_prefix or defaults["album_prefix"]
+        args.artwork = args.artwork or defaults["artwork"]
+        artwork_max_px = defaults["artwork_max_px"]
+        artwork_quality = defaults["artwork_quality"]
+
+    if args.artwork and not os.path.exists(args.artwork):
+        print(f"❌ エラー: カバー画像が見つかりません: {args.artwork}")
+        return 1
+    if not (args.artist or args.album_prefix or args.artwork or args.renumber):
+        print("❌ エラー: 書き換える項目を指定してください (--help で一覧)。")
+        return 1
+
+    jobs = plan_retag(root, args.artist, args.album_prefix, args.renumber)
+    if not jobs:
+        print("⚠️ .opus / .flac ファイルが見つかりませんでした。")
+        return 0
+
+    mode = " (ドライラン: 書き換えません)" if args.dry_run else ""
+    print(f"\n🔍 {len(jobs)} 個のファイルを検出しました。処理を開始します{mode}...")
+
+    def on_result(path, status, detail):
+        name = os.path.relpath(path, root)
+        if status == "updated":
+            label = "変更予定" if args.dry_run else "更新"
+            print(f"✅ {label}: {name} ({', '.join(detail)})")
+        elif status == "failed":
+            print(f"❌ 失敗: {name} ({detail})")
+        elif args.verbose:
+            print(f"・ 変更なし: {name}")
+
+    summary = run_retag(
+        jobs,
+        artwork_path=args.artwork,
+        workers=args.workers or None,
+        dry_run=args.dry_run,
+        artwork_max_px=artwork_max_px,
+        artwork_quality=artwork_quality,
+        on_result=on_result,
+    )
+
+    print("-" * 30)
+    print(f"🎉 完了しました！ ({summary['elapsed_sec']:.1f}秒)")
+    label = "変更予定" if args.dry_run else "更新"
+    print(f"{label}: {summary['updated']} 件")
+    print(f"変更なし: {summary['unchanged']} 件")
+    if summary["changes"]:
+        detail = ", ".join(f"{k} {v}件" for k, v in sorted(summary["changes"].items()))
+        print(f"内訳: {detail}")
+    if summary["failed"]:
+        print(f"失敗: {summary['failed']} 件")
+
+    if not args.root:
+        input("\nEnterキーを押して終了...")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,30 @@
+"""
+カバー画像の設定と、保存フォルダの点検
+
+  python scripts/verify_artwork.py
+      設定 (artwork_path) がどの画像に解決されるかを確認する
+  python scripts/verify_artwork.py --archive Aivis_AudioLog --output report.json
+      保存フォルダのすべての日付フォルダを並列に点検し、結果を JSON で出力する
+      (デコードできるか・タグ・トラック番号の抜けや重複・書きかけのファイル)。
+      問題があれば終了コード 1 (毎晩の自動実行向け)
+"""
+
+import argparse
 import os
 import sys
 
 # srcディレクトリをパスに追加
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
 
-from aivis_reader import ConfigManager  # noqa: E402
+from archive_verify import dump_report, verify_archive  # noqa: E402
 
 
 def test_artwork_resolution():
     print("--- Testing Artwork Resolution ---")
 
+    # 作業プロセスでは読み込まないよう、必要になった時だけ import する
+    from aivis_reader import ConfigManager
+
     # ConfigManagerの初期化（これによりロード処理が走る）
     cfg = ConfigManager()
 
@@ -33,5 +48,71 @@ def test_artwork_resolution():
         print("❓ UNKNOWN: Unexpected path resolution.")
 
 
+def run_archive_check(args):
+    artist, album_prefix = args.artist, args.album_prefix
+    if args.from_config:
+        from aivis_reader import ConfigManager
+
+        cfg = ConfigManager()
+        artist = artist or cfg.get("artist")
+        album_prefix = album_prefix or cfg.get("album_prefix")
+
+    if not os.path.isdir(args.archive):
+        print(f"❌ エラー: フォルダが見つかりません: {args.archive}", file=sys.stderr)
+        return 2
+
+    # 標準出力は JSON だけにするため、経過は標準エラーに出す
+    def on_result(result):
+        if result["issues"]:
+            codes = ", ".join(issue["issue"] for issue in result["issues"])
+            print(f"⚠️ {result['path']}: {codes}", file=sys.stderr)
+
+    report = verify_archive(
+        args.archive,
+        workers=args.workers or None,
+        artist=artist,
+        album_prefix=album_prefix,
+        require_artwork=not args.no_artwork,
+        on_result=on_result,
+    )
+
+    if args.output:
+        dump_report(report, args.output)
+    else:
+        print(dump_report(report))
+
+    print(
+        f"🔎 点検完了: {report['files']}件中 {report['ok']}件 正常 / "
+        f"問題 {len(report['problems'])}件 ({report['elapsed_sec']:.1f}秒)",
+        file=sys.stderr,
+    )
+    return 1 if report["problems"] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--archive", help="点検する保存フォルダ (日付フォルダの親)")
+    parser.add_argument("--output", help="結果の JSON の書き出し先 (省略時は標準出力)")
+    parser.add_argument(
+        "--workers", type=int, default=0, help="並列プロセス数 (0 で CPU コア数)"
+    )
+    parser.add_argument("--artist", help="artist タグがこの値か確かめる")
+    parser.add_argument("--album-prefix", help="album タグが 接頭辞_yymmdd か確かめる")
+    parser.add_argument(
+        "--from-config",
+        action="store_true",
+        help="--artist / --album-prefix を config.json の値で補う",
+    )
+    parser.add_argument(
+        "--no-artwork", action="store_true", help="カバー画像が無くても問題にしない"
+    )
+    args = parser.parse_args(argv)
+
+    if not args.archive:
+        test_artwork_resolution()
+        return 0
+    return run_archive_check(args)
+
+
 if __name__ == "__main__":
-    test_artwork_resolution()
+    sys.exit(main())
@@ -88,7 +88,8 @@ class App(ctk.CTk):
         self.cfg = aivis_reader.cfg
         self.player = aivis_reader.AudioPlayer()
         self.synth = aivis_reader.AivisSynthesizer()
-        self.manager = aivis_reader.TaskManager(self.synth, self.player)
+        self.manager = aivis_reader.create_task_manager(self.synth, self.player)
+        self.synth.start_tiering(self.manager.is_busy)
 
         # UI構築
         self.setup_ui()
@@ -230,6 +231,24 @@ class App(ctk.CTk):
         )
         self.btn_skip.grid(row=1, column=0, columnspan=2, pady=20)
 
+        # ★追加: 再生速度 (合成し直さずに、再生待ちの音声にもすぐ反映される)
+        ctk.CTkLabel(self.dashboard_frame, text="再生速度 (Playback Rate)").pack()
+        # 範囲はプレイヤーが受け付ける範囲に合わせる (0.05 刻み)
+        rate_low, rate_high = aivis_reader.AudioPlayer.PLAYBACK_RATE_RANGE
+        self.slider_playback_rate = ctk.CTkSlider(
+            self.dashboard_frame,
+            from_=rate_low,
+            to=rate_high,
+            number_of_steps=round((rate_high - rate_low) / 0.05),
+            command=self.change_playback_rate,
+        )
+        self.slider_playback_rate.set(self.player.playback_rate)
+        self.slider_playback_rate.pack(fill="x", padx=40, pady=5)
+        self.lbl_playback_rate = ctk.CTkLabel(
+            self.dashboard_frame, text=f"x{self.player.playback_rate:.2f}"
+        )
+        self.lbl_playback_rate.pack(pady=(0, 5))
+
         self.lbl_info = ctk.CTkLabel(
             self.dashboard_frame,
             text="Copy text to clipboard to start reading.",
@@ -495,6 +514,7 @@ class App(ctk.CTk):
             self.cfg["pitch"] = round(self.slider_pitch.get(), 2)
             self.cfg["intonation"] = round(self.slider_intonation.get(), 2)
             self.cfg["post_pause"] = round(self.slider_post_pause.get(), 2)
+            self.cfg["playback_rate"] = round(self.slider_playback_rate.get(), 2)
 
             # Switches
             self.cfg["show_artwork"] = self.switch_artwork.get() == 1
@@ -528,8 +548,8 @@ class App(ctk.CTk):
             self.cfg["stop"] = self.settings_widgets["stop"].get()
             self.cfg["pause"] = self.settings_widgets["pause"].get()
 
-            # 再接続のためにBase URLを更新
-            self.synth.base_url = f"http://{self.cfg['host']}:{self.cfg['port']}"
+            # 再接続のために接続先エンジンを組み直す
+            self.synth.configure_engines()
 
             # サーバー側にも設定反映 (force_flacなど)
             self.synth.force_flac = self.cfg["force_flac"]
@@ -555,6 +575,10 @@ class App(ctk.CTk):
             text_color="orange" if paused else "cyan",
         )
 
+    def change_playback_rate(self, value):
+        rate = self.player.set_playback_rate(round(value, 2))
+        self.lbl_playback_rate.configure(text=f"x{rate:.2f}")
+
     def stop_playback(self):
         self.manager.force_stop()
         sys.stdout.write("GUI: Force Stopped\n")
@@ -605,7 +629,9 @@ class App(ctk.CTk):
 
     def on_closing(self):
         self.clipboard_running = False
-        self.player.stop_immediate()
+        # ★追加: 書きかけの保存ファイルを破棄し、保存待ちを書き出してから終了する
+        self.manager.close()
+        self.synth.shutdown()
         self.destroy()
         sys.exit(0)
 
@@ -617,7 +643,7 @@ if __name__ == "__main__":
         "-f",
         "--flac",
         action="store_true",
-        help="強制的にFLAC形式で保存します (FFmpegがある場合でも)",
+        help="強制的にFLAC形式で保存します (Opusが使える場合でも)",
     )
     parser.add_argument(
         "-d",
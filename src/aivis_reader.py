@@ -1,5 +1,7 @@
 import argparse  # ★追加: 引数解析用
-import base64
+import asyncio
+import collections
+import concurrent.futures
 import datetime
 import io
 import json
@@ -7,10 +9,11 @@ import os
 import queue
 import re
 import shutil
-import subprocess
+import sqlite3
 import sys
 import threading
 import time
+import zipfile
 
 import keyboard
 import numpy as np
@@ -18,19 +21,48 @@ import pyperclip
 import requests
 import sounddevice as sd
 import soundfile as sf
-
+from requests.adapters import HTTPAdapter
+
+from archive_index import ArchiveIndex
+from archive_manifest import DayManifest
+from archive_tiering import ArchiveTiering
+from archive_writer import ArchiveWriter
+from artwork_cache import ArtworkCache
+from audio_dsp import (
+    PolyphaseResampler,
+    WavStreamDecoder,
+    WsolaStretcher,
+    match_channels,
+    parse_wav_header,
+    pcm_to_float32,
+    resample,
+)
+from chunker import chunk_lines
+from encoders import select_encoder
+from engine_pool import EnginePool, normalize_endpoint
+from ring_buffer import SPSCRingBuffer
+from save_queue import SaveQueue
+from segment_assembler import SegmentAssembler
+from synth_cache import QueryCache, SynthCache
 from version import __version__
 
 # FLACタグ編集用 (あれば使う)
 try:
     from mutagen import File as MutagenFile
-    from mutagen.flac import Picture
 
     HAS_MUTAGEN = True
 except ImportError:
     HAS_MUTAGEN = False
 
-# FFmpeg検出 (あればOpusエンコードに使用)
+# asyncio エンジン用の非同期HTTPクライアント (あれば使う)
+try:
+    import aiohttp
+
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+# FFmpeg検出 (libsndfile が Opus 非対応の場合の Opus エンコードに使用)
 FFMPEG_PATH = shutil.which("ffmpeg")
 HAS_FFMPEG = FFMPEG_PATH is not None
 
@@ -74,6 +106,45 @@ class ConfigManager:
         "dictionary": {},
         "force_flac": False,  # ★追加: デフォルト設定
         "use_dropbox": False,  # ★追加: Dropbox使用フラグ
+        "audio_block_ms": 10,  # ★追加: 再生コールバック1回あたりの長さ (ミリ秒)
+        "audio_buffer_sec": 1.0,  # ★追加: 再生用リングバッファの長さ (秒)
+        "playback_rate": 1.0,  # ★追加: 再生速度 (合成済み・再生待ちの音声にも反映)
+        "audio_idle_timeout": 30,  # ★追加: 無音がこの秒数続いたらストリームを休止 (0で無効)
+        "audio_idle_action": "stop",  # ★追加: 休止方法 "stop" (停止) / "close" (解放)
+        "output_sample_rate": 0,  # ★追加: 再生・保存のサンプリングレートを固定 (0で無効)
+        "output_channels": 0,  # ★追加: 再生・保存のチャンネル数を固定 (1/2, 0で無効)
+        "segment_crossfade_ms": 30,  # ★追加: 行の継ぎ目を重ねてクロスフェードする長さ
+        "segment_gap_ms": 0,  # ★追加: 重ねずに行の間に入れる無音 (ミリ秒, 0で重ねる)
+        "pipeline_depth": 2,  # ★追加: 先行して合成する行数 (1で従来の逐次合成)
+        "engines": [],  # ★追加: 複数エンジンの "host:port" リスト (空なら host/port)
+        "engine_health_interval": 10,  # ★追加: 停止中エンジンの再確認間隔 (秒)
+        "engine_mode": "thread",  # ★追加: "thread" または "asyncio" (要 aiohttp)
+        "http_retries": 3,  # ★追加: 一時的な通信エラー時の再試行回数
+        "http_backoff": 0.5,  # ★追加: 再試行待ち時間の初期値 (秒, 指数的に増加)
+        "batch_char_budget": 80,  # ★追加: 短い行をまとめて合成する合計文字数 (0で無効)
+        "batch_line_chars": 20,  # ★追加: まとめ合成の対象にする「短い行」の文字数
+        "streaming_min_chars": 60,  # ★追加: この文字数以上の行は受信しながら再生する
+        "chunk_sentences": True,  # ★追加: 長い行を文 (。！？、) 単位に分けて合成する
+        "first_audio_target": 0.5,  # ★追加: 最初の音が出るまでの目標時間 (秒)
+        "first_chunk_chars": 20,  # ★追加: 合成速度が未計測の間の最初のチャンク文字数
+        "chunk_min_chars": 8,  # ★追加: これより短い断片は隣のチャンクにまとめる
+        "chunk_max_chars": 120,  # ★追加: 1チャンクの最大文字数
+        "opus_encoder": "auto",  # ★追加: "auto" / "soundfile" (libsndfile) / "ffmpeg"
+        "archive_streaming": True,  # ★追加: 合成した分から保存ファイルに書き足す
+        "save_workers": 1,  # ★追加: ファイル保存 (エンコード・タグ付け) 用のスレッド数
+        "archive_tiering_days": 0,  # ★追加: この日数より前の FLAC を Opus に変換 (0で無効)
+        "archive_tiering_duty": 0.2,  # ★追加: 変換に使う時間の割合 (残りは休む)
+        "archive_tiering_artwork_px": 600,  # ★追加: 変換したファイルのカバー画像の長辺の上限
+        "archive_index": True,  # ★追加: 保存した読み上げの全文検索用の索引を作る
+        "archive_warm_cache": True,  # ★追加: 保存済みと同じ読み上げは合成せずファイルを再生
+        "artwork_max_px": 0,  # ★追加: 埋め込む画像の長辺の上限 (超えたら縮小, 0で元のまま)
+        "artwork_quality": 90,  # ★追加: 縮小した画像を JPEG にする際の画質
+        "synthesis_timeout": 30,  # ★追加: 合成速度が未計測の間のタイムアウト (秒)
+        "synth_cache": True,  # ★追加: 合成結果をディスクにキャッシュする
+        "cache_dir": "cache",  # ★追加: キャッシュ保存先 (ルートからの相対パス)
+        "synth_cache_mb": 512,  # ★追加: 合成キャッシュの上限サイズ (MB)
+        "query_cache": True,  # ★追加: audio_query の結果をキャッシュする
+        "query_cache_mb": 64,  # ★追加: audio_query キャッシュの上限サイズ (MB)
     }
 
     def __init__(self):
@@ -185,173 +256,1186 @@ cfg = ConfigManager()
 
 # ─── プレーヤー (ストリーム再生・常時接続版) ────────────────
 class AudioPlayer:
+    """
+    コールバック方式の再生。
+    enqueue されたデータは供給スレッドがリングバッファに詰め、
+    音声デバイスのコールバックがブロック (audio_block_ms) ごとに取り出す。
+    停止・一時停止・スキップは次のブロックから反映される。
+    """
+
+    # リングバッファへ書き込む単位 (秒)。再生速度はこの単位ごとに読み直す
+    FEED_CHUNK_SEC = 0.05
+    PLAYBACK_RATE_RANGE = (0.5, 3.0)
+
     def __init__(self):
         self.queue: queue.Queue = queue.Queue()
-        self.stop_flag = threading.Event()
         self.is_paused = False
         # ストリーム管理用
         self.stream = None
         self.current_sr = None
+        self.channels = None
+        # ストリームを開くときに sr・チャンネル数に合わせて作り直す
+        self.ring = SPSCRingBuffer(1, 1)
+        self.block_ms = float(cfg.get("audio_block_ms", 10))
+        self.buffer_sec = float(cfg.get("audio_buffer_sec", 1.0))
+
+        # ★追加: 再生速度 (音の高さは変えずに WSOLA で伸縮する)
+        self.playback_rate = 1.0
+        self.set_playback_rate(cfg.get("playback_rate", 1.0))
+
+        # ★追加: アイドル時の休止 (無音を流し続けてデバイスを起こしたままにしない)
+        self.idle_timeout = float(cfg.get("audio_idle_timeout", 30))
+        self.idle_action = cfg.get("audio_idle_action", "stop")
+        self._suspended = False
+        self._last_active = time.monotonic()
+
+        # 停止要求の通し番号。コールバックは捨て終えた番号を _flushed_seq に残す
+        self._control_lock = threading.Lock()
+        self._flush_seq = 0
+        self._flushed_seq = 0
+        # 供給スレッドがまだ送るデータを持っているか (アンダーラン判定用)
+        self._feeding = False
+
+        # アンダーラン: 再生中にデータが間に合わなかったブロック数
+        # オーバーラン: バッファが満杯で供給側が待たされた回数
+        # デバイスのアンダーフロー: 音声デバイス側が報告した回数 (別に数える)
+        self.underruns = 0
+        self.overruns = 0
+        self.device_underflows = 0
 
         self.thread = threading.Thread(target=self._worker, daemon=True)
         self.thread.start()
 
-    def _worker(self):
-        # アイドル時に流す無音チャンク（0.1秒分）
-        silence_chunk = None
+    def _callback(self, outdata, frames, time_info, status):
+        """音声デバイスから呼ばれる。ロックを取らずにリングバッファから読む"""
+        if status and status.output_underflow:
+            self.device_underflows += 1
 
-        while True:
-            # 1. 停止フラグがあればキューを空にする
-            if self.stop_flag.is_set():
-                with self.queue.mutex:
-                    self.queue.queue.clear()
-                self.stop_flag.clear()
+        ring = self.ring
+        flush_seq = self._flush_seq
+        if self._flushed_seq != flush_seq:
+            ring.discard()
+            self._flushed_seq = flush_seq
 
-            # 2. キューからデータを取得
-            try:
-                item = self.queue.get(timeout=0.05)
-            except queue.Empty:
-                item = None
-
-            # 3. データがある場合の処理
-            if item is not None:
-                data, sr = item
-
-                # ストリームの初期化 or サンプリングレート変更時の再作成
-                if self.stream is None or self.current_sr != sr:
-                    if self.stream is not None:
-                        self.stream.stop()
-                        self.stream.close()
-
-                    self.current_sr = sr
-                    channels = 1 if data.ndim == 1 else data.shape[1]
-
-                    try:
-                        self.stream = sd.OutputStream(
-                            samplerate=sr,
-                            channels=channels,
-                            dtype="float32",
-                        )
-                        self.stream.start()
-                        # 無音チャンクもこのSRに合わせて作り直す
-                        silence_chunk = np.zeros(
-                            (int(sr * 0.1), channels), dtype=np.float32
-                        )
-                        if channels == 1:
-                            silence_chunk = silence_chunk.flatten()
+        if self.is_paused:
+            outdata.fill(0)
+            return
 
-                        print(f"🔊 ストリーム開始: {sr}Hz / {channels}ch")
-                    except Exception as e:
-                        print(f"⚠️ ストリーム初期化エラー: {e}")
-                        self.queue.task_done()
-                        continue
+        n = ring.read_into(outdata)
+        if n < frames:
+            outdata[n:].fill(0)
+            if self._feeding:
+                self.underruns += 1
 
-                # 再生（書き込み）
-                try:
-                    while self.is_paused:
-                        if self.stop_flag.is_set():
-                            break
-                        self.stream.write(silence_chunk)
+    def _open_stream(self, sr, channels):
+        self._close_stream()
 
-                    if not self.stop_flag.is_set():
-                        self.stream.write(data)
+        self.current_sr = sr
+        self.channels = channels
+        self.ring = SPSCRingBuffer(max(1, int(sr * self.buffer_sec)), channels)
+        # 新しいバッファには捨てるべき古いデータが無い
+        self._flushed_seq = self._flush_seq
 
-                except Exception as e:
-                    print(f"⚠️ 再生書き込みエラー: {e}")
-                finally:
-                    self.queue.task_done()
+        try:
+            self.stream = sd.OutputStream(
+                samplerate=sr,
+                channels=channels,
+                dtype="float32",
+                blocksize=max(1, int(sr * self.block_ms / 1000)),
+                callback=self._callback,
+            )
+            self.stream.start()
+            print(f"🔊 ストリーム開始: {sr}Hz / {channels}ch")
+            return True
+        except Exception as e:
+            print(f"⚠️ ストリーム初期化エラー: {e}")
+            self.stream = None
+            return False
 
-            # 4. データがない（アイドル中）の場合
-            else:
-                if self.stream is not None and self.stream.active:
-                    try:
-                        self.stream.write(silence_chunk)
-                    except Exception:
-                        pass
+    def _close_stream(self):
+        if self.stream is None:
+            return
+        try:
+            self.stream.stop()
+            self.stream.close()
+        except Exception:
+            pass
+        self.stream = None
+
+    def _stream_running(self):
+        return self.stream is not None and self.stream.active
+
+    def _wait_interval(self):
+        return self.block_ms / 2000
+
+    def _wait_flushed(self):
+        """停止要求をコールバックが処理し終えるまで待つ"""
+        while self._flushed_seq != self._flush_seq:
+            if not self._stream_running():
+                # 読み出す側が動いていなければ自分で捨ててよい
+                self.ring.discard()
+                self._flushed_seq = self._flush_seq
+                return
+            time.sleep(self._wait_interval())
+
+    def _drain(self, seq):
+        """今のバッファを鳴らし切るまで待つ (サンプリングレート変更前)"""
+        while self._stream_running() and self.ring.readable() > 0:
+            if self._flush_seq != seq:
+                return
+            time.sleep(self._wait_interval())
+
+    def _request_flush(self):
+        with self._control_lock:
+            self._flush_seq += 1
+
+    def _ensure_stream(self, sr, channels, seq=None):
+        """再生できる状態のストリームを用意する (休止中なら再開する)"""
+        # ストリームの初期化 or サンプリングレート変更時の再作成
+        if self.stream is None or self.current_sr != sr or self.channels != channels:
+            if seq is not None:
+                self._drain(seq)
+            self._suspended = False
+            return self._open_stream(sr, channels)
+
+        if self._suspended:
+            try:
+                self.stream.start()
+                print("🔊 ストリーム再開")
+            except Exception as e:
+                print(f"⚠️ ストリーム再開エラー: {e}")
+                return self._open_stream(sr, channels)
+            finally:
+                self._suspended = False
+        return True
+
+    def _check_idle(self):
+        """無音が idle_timeout 秒続いたらストリームを休止する"""
+        if self.stream is None or self._suspended or self.idle_timeout <= 0:
+            return
+        if self.ring.readable() > 0:
+            self._last_active = time.monotonic()
+            return
+        if time.monotonic() - self._last_active < self.idle_timeout:
+            return
+
+        # バッファは空で無音しか流れていないので、ここで止めてもプチッとならない
+        if self.idle_action == "close":
+            self._close_stream()
+        else:
+            try:
+                self.stream.stop()
+            except Exception:
+                self._close_stream()
+        self._suspended = True
+        print("💤 再生ストリームを休止しました")
+
+    def _prewarm(self):
+        """休止中のストリームを前回と同じ形式で開き直す"""
+        if self.current_sr is None:
+            # まだ一度も再生していない (形式が分からない)
+            return
+        if self.stream is None or self._suspended:
+            self._ensure_stream(self.current_sr, self.channels)
+        self._last_active = time.monotonic()
+
+    def _feed(self, data, sr):
+        """1件ぶんの音声をリングバッファに詰める (満杯なら空くまで待つ)"""
+        seq = self._flush_seq
+        frames = data.reshape(-1, 1) if data.ndim == 1 else data
+        channels = frames.shape[1]
+
+        if not self._ensure_stream(sr, channels, seq):
+            return
+
+        self._wait_flushed()
+        self._feeding = True
+
+        waiting = False
+        for segment in self._segments(frames, sr):
+            pos = 0
+            waited = False
+            while pos < len(segment):
+                if self._flush_seq != seq:
+                    return
+                n = self.ring.write(segment[pos:])
+                if self._flush_seq != seq:
+                    # 停止と行き違いで書き込んだ分も捨ててもらう
+                    self._request_flush()
+                    return
+
+                pos += n
+                if pos < len(segment):
+                    if not waiting:
+                        self.overruns += 1
+                        waiting = True
+                    waited = True
+                    time.sleep(self._wait_interval())
+            if not waited:
+                waiting = False
+
+    def _segments(self, frames, sr):
+        """
+        リングバッファに書き込む単位で音声を返す。
+        再生速度が 1 以外になったら、その位置から先を WSOLA で伸縮して返す。
+        速度は書き込む直前に読むので、変更はバッファに溜まった分の後に反映される
+        """
+        step = max(1, int(sr * self.FEED_CHUNK_SEC))
+        pos = 0
+        while pos < len(frames) and self.playback_rate == 1.0:
+            yield frames[pos : pos + step]
+            pos += step
+        if pos >= len(frames):
+            return
+
+        stretcher = WsolaStretcher(frames[pos:], sr)
+        while True:
+            out = stretcher.read(self.playback_rate, step)
+            if out is None:
+                return
+            yield out
+
+    def _worker(self):
+        while True:
+            try:
+                data, sr = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                self._check_idle()
+                continue
+
+            try:
+                if data is None:
+                    self._prewarm()
                 else:
-                    pass
+                    self._feed(data, sr)
+                    self._last_active = time.monotonic()
+            except Exception as e:
+                print(f"⚠️ 再生書き込みエラー: {e}")
+            finally:
+                if self.queue.empty():
+                    self._feeding = False
+                self.queue.task_done()
 
     def enqueue(self, data, sr):
         self.queue.put((data, sr))
 
+    def prewarm(self):
+        """
+        合成を始める時点で休止中のストリームを起こしておく。
+        最初の音が届くまでに無音が流れ始めるので、再開時のノイズや遅れが出ない
+        """
+        if self._suspended or (self.stream is None and self.current_sr is not None):
+            self.queue.put((None, None))
+
     def stop_immediate(self):
-        self.stop_flag.set()
         with self.queue.mutex:
             self.queue.queue.clear()
+        self._request_flush()
 
     def toggle_pause(self):
         self.is_paused = not self.is_paused
         return self.is_paused
 
+    def set_playback_rate(self, rate):
+        """再生速度を変える (合成し直さず、再生待ちの音声にも反映される)"""
+        low, high = self.PLAYBACK_RATE_RANGE
+        self.playback_rate = min(high, max(low, float(rate)))
+        return self.playback_rate
+
+    def get_stats(self):
+        """再生バッファの状況 (アンダーラン・オーバーラン回数など)"""
+        buffered = self.ring.readable()
+        return {
+            "underruns": self.underruns,
+            "overruns": self.overruns,
+            "device_underflows": self.device_underflows,
+            "buffered_ms": buffered * 1000 / self.current_sr if self.current_sr else 0,
+        }
+
+
+# ─── ストリーミング受信した WAV のデコード ───────────────────
+class LineStreamDecoder:
+    """
+    ストリーミングで届く /synthesis の WAV を少しずつデコードし、
+    出力形式 (output_sample_rate / output_channels) に揃えたブロックにする。
+    スレッド版と asyncio 版の synthesize_stream で共用する
+    """
+
+    def __init__(self, output_sr=0, output_channels=0):
+        self.output_sr = output_sr
+        self.output_channels = output_channels
+        self.decoder = WavStreamDecoder()
+        self.raw_blocks: list = []
+        self.emitted: list = []
+        self.sr = 0
+        self.out_sr = 0
+        # ★追加: 出力形式の統一 (ブロックをまたいで継ぎ目が出ないよう状態を持つ)
+        self.resampler = None
+
+    def _emit(self, out):
+        if self.output_channels:
+            out = match_channels(out, self.output_channels)
+        if len(out) == 0:
+            return []
+        self.emitted.append(out)
+        return [out]
+
+    def feed(self, chunk):
+        """受信した分をデコードし、新しく出せるブロックのリストを返す"""
+        frames = self.decoder.feed(chunk)
+        if frames is None or len(frames) == 0:
+            return []
+        if not self.sr:
+            self.sr = self.out_sr = self.decoder.sample_rate
+            if self.output_sr and self.sr != self.output_sr:
+                self.resampler = PolyphaseResampler(self.sr, self.output_sr)
+                self.out_sr = self.output_sr
+
+        self.raw_blocks.append(frames)
+        if self.resampler is not None:
+            frames = self.resampler.process(frames)
+        return self._emit(frames)
+
+    def finish(self):
+        """受信の終わり。リサンプラに残っていた分のブロックのリストを返す"""
+        if not self.raw_blocks:
+            raise ValueError("Empty WAV response")
+        if self.resampler is None:
+            return []
+        return self._emit(self.resampler.flush())
+
+    def raw(self):
+        """エンジンから届いたままの (data, sr)。キャッシュ用"""
+        return np.concatenate(self.raw_blocks), self.sr
+
+    def audio(self):
+        """出力形式に揃えた行全体の (data, sr)"""
+        return np.concatenate(self.emitted), self.out_sr
+
 
 # ─── 合成器 (API通信 & 保存) ───────────────────
 class AivisSynthesizer:
+    # 再試行の対象とするHTTPステータス (エンジン過負荷・一時的な障害)
+    RETRY_STATUS = (500, 502, 503, 504)
+    # ストリーミング受信時に一度に読むバイト数
+    STREAM_CHUNK_BYTES = 16384
+    # 直近のリクエストの記録 (接続の再利用・応答時間) を残す件数
+    HTTP_LOG_SIZE = 200
+    # エンジンのバージョンが取得できなかった時、問い合わせ直すまでの秒数
+    ENGINE_VERSION_RETRY_SEC = 5.0
+    # まとめて合成する時に同時に送る /audio_query の数
+    BATCH_QUERY_WORKERS = 4
+
     def __init__(self):
-        self.base_url = f"http://{cfg['host']}:{cfg['port']}"
         # ★修正: 設定ファイルからデフォルト値を読み込む
         self.force_flac = cfg.get("force_flac", False)
 
-    def check_connection(self):
+        # ★追加: Keep-Alive で接続を使い回すセッション (行ごとのTCP接続を避ける)
+        pool_size = max(4, int(cfg.get("pipeline_depth", 2)) * 2)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.hooks["response"].append(self._mark_reused)
+
+        # まとめて合成する行の /audio_query を並行して送るスレッド
+        self.query_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.BATCH_QUERY_WORKERS, thread_name_prefix="audio-query"
+        )
+
+        # ★追加: 接続先エンジン (複数あれば処理中の少ないエンジンへ振り分け)
+        self.pool: EnginePool
+        self.configure_engines()
+
+        # 再試行設定 (指数バックオフ、上限あり)
+        self.http_retries = max(0, int(cfg.get("http_retries", 3)))
+        self.http_backoff = float(cfg.get("http_backoff", 0.5))
+        self.http_backoff_max = 4.0
+
+        # ★追加: 出力形式の統一 (話者・エンジンが変わっても再生ストリームを開き直さない)
+        self.output_sr = int(cfg.get("output_sample_rate", 0) or 0)
+        self.output_channels = int(cfg.get("output_channels", 0) or 0)
+
+        # /multi_synthesis 非対応のエンジンと分かったら行ごとの合成に戻す
+        self.multi_synthesis_supported = True
+
+        # ★追加: 保存 (エンコード・タグ付け) は専用スレッドで行い、次の読み上げを待たせない
+        self.save_queue = SaveQueue(int(cfg.get("save_workers", 1)))
+        # ★追加: 埋め込むカバー画像 (変換済みのものを使い回す)
+        self.artwork_cache = ArtworkCache(
+            cfg.get("artwork_max_px", 0), cfg.get("artwork_quality", 90)
+        )
+        # ★追加: 日ごとの保存フォルダの目録 (トラック番号の管理)
+        self._manifests: dict = {}
+        self._manifest_lock = threading.Lock()
+        # ★追加: 古い FLAC の Opus への変換 (start_tiering で開始)
+        self.tiering = None
+
+        # 適応タイムアウト用: 1文字あたりの合成時間 (指数移動平均, 秒)
+        self.sec_per_char = None
+
+        # ★追加: 合成結果のディスクキャッシュ
+        self._engine_version = None
+        self._engine_version_url = None
+        # 取得に失敗した時刻 (行ごとに問い合わせて待たされないようにする)
+        self._engine_version_failed_at = None
+        cache_root = os.path.join(cfg.root_dir, str(cfg.get("cache_dir", "cache")))
+        self.cache = None
+        if cfg.get("synth_cache", True):
+            cache_dir = os.path.join(cache_root, "synth")
+            max_bytes = int(float(cfg.get("synth_cache_mb", 512)) * 1024 * 1024)
+            try:
+                self.cache = SynthCache(cache_dir, max_bytes)
+                stats = self.cache.stats()
+                print(
+                    f"🗃️ 合成キャッシュ: {stats['entries']}件 "
+                    f"({stats['bytes'] / 1024 / 1024:.1f}MB)"
+                )
+            except OSError as e:
+                print(f"⚠️ キャッシュ初期化エラー ({cache_dir}): {e}")
+
+        # ★追加: audio_query (アクセント解析) 結果のキャッシュ
+        # スライダー変更後の読み直しでは /synthesis だけを呼ぶ
+        self.query_cache = None
+        if cfg.get("query_cache", True):
+            cache_dir = os.path.join(cache_root, "query")
+            max_bytes = int(float(cfg.get("query_cache_mb", 64)) * 1024 * 1024)
+            try:
+                self.query_cache = QueryCache(cache_dir, max_bytes)
+            except OSError as e:
+                print(f"⚠️ キャッシュ初期化エラー ({cache_dir}): {e}")
+
+        # ★追加: 保存した読み上げの全文検索用の索引
+        # archive_warm_cache なら、保存済みと同じ読み上げは合成せずにファイルを再生する
+        self.archive_index = None
+        self.archive_warm_cache = bool(cfg.get("archive_warm_cache", True))
+        if cfg.get("archive_index", True):
+            index_path = os.path.join(cache_root, "archive_index.sqlite3")
+            try:
+                self.archive_index = ArchiveIndex(index_path)
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️ 索引の初期化エラー ({index_path}): {e}")
+
+        self._stats_lock = threading.Lock()
+        self.http_stats = {
+            "requests": 0,
+            "new_connections": 0,
+            "retries": 0,
+            "failures": 0,
+        }
+        self.http_log: collections.deque = collections.deque(maxlen=self.HTTP_LOG_SIZE)
+        self.decode_stats = {
+            "lines": 0,
+            "allocations": 0,
+            "bytes_copied": 0,
+            "fallbacks": 0,
+        }
+
+    def configure_engines(self):
+        """設定 (engines または host/port) から接続先エンジンを組み直す"""
+        engines = cfg.get("engines") or [f"{cfg['host']}:{cfg['port']}"]
+        urls = [normalize_endpoint(e, cfg["port"]) for e in engines]
+        if getattr(self, "pool", None) is not None:
+            self.pool.close()
+        self.pool = EnginePool(
+            urls,
+            probe=self.check_connection,
+            health_interval=float(cfg.get("engine_health_interval", 10)),
+        )
+        if len(urls) > 1:
+            print(f"🖧 エンジン {len(urls)}台に振り分けます: {', '.join(urls)}")
+
+    @property
+    def base_url(self):
+        """代表のエンジン (設定の先頭) のURL"""
+        return self.pool.primary.url
+
+    @base_url.setter
+    def base_url(self, url):
+        # 単一のエンジンに切り替える
+        self.pool.close()
+        self.pool = EnginePool(
+            [normalize_endpoint(url)],
+            probe=self.check_connection,
+            health_interval=self.pool.health_interval,
+        )
+
+    def get_engine_stats(self):
+        """エンジンごとの処理状況 (振り分け・障害の確認用)"""
+        return self.pool.stats()
+
+    def _pool_connection_count(self):
+        """セッションの接続プールが今までに開いたTCP接続の総数"""
+        total = 0
+        # http/https に同じアダプタを登録しているので重複を除く
+        adapters = {id(a): a for a in self.session.adapters.values()}
+        for adapter in adapters.values():
+            pools = getattr(adapter, "poolmanager", None)
+            if pools is None:
+                continue
+            for key in list(pools.pools.keys()):
+                pool = pools.pools.get(key)
+                if pool is not None:
+                    total += pool.num_connections
+        return total
+
+    def get_http_stats(self):
+        """接続の再利用状況を返す (ベンチマーク・ログ用)"""
+        with self._stats_lock:
+            stats: dict = dict(self.http_stats)
+        stats["new_connections"] = self._pool_connection_count()
+        stats["reused_connections"] = max(
+            0, stats["requests"] - stats["new_connections"]
+        )
+        if stats["requests"]:
+            stats["reuse_ratio"] = stats["reused_connections"] / stats["requests"]
+        else:
+            stats["reuse_ratio"] = 0.0
+        return stats
+
+    @staticmethod
+    def _mark_reused(res, *args, **kwargs):
+        """応答フック: 使った接続が以前のリクエストでも使われていたかを res に記録する"""
+        conn = getattr(res.raw, "connection", None)
+        if conn is not None:
+            uses = getattr(conn, "_aivis_requests", 0) + 1
+            conn._aivis_requests = uses
+            res.reused_connection = uses > 1
+        return res
+
+    def _log_request(self, method, path, endpoint, started, status, reused):
+        """1回のリクエストの結果を記録する (status は失敗なら None)"""
+        self.http_log.append(
+            {
+                "method": method,
+                "path": path,
+                "engine": endpoint.url,
+                "status": status,
+                "reused": reused,
+                "elapsed_ms": (time.perf_counter() - started) * 1000,
+            }
+        )
+
+    def get_http_log(self):
+        """
+        直近のリクエストごとの記録 (古い順)。
+        reused は接続を使い回したか (分からなければ None)、
+        elapsed_ms は送信から応答 (ストリーミングはヘッダー) までの時間
+        """
+        return list(self.http_log)
+
+    def _synthesis_timeout(self, text):
+        """計測済みの合成速度から /synthesis のタイムアウトを見積もる"""
+        default_timeout = float(cfg.get("synthesis_timeout", 30))
+        if self.sec_per_char is None:
+            return default_timeout
+
+        estimate = self.sec_per_char * max(1, len(text))
+        # 見積もりの4倍 + 余裕分。ただし極端に短く/長くならないよう制限する
+        return min(default_timeout * 4, max(5.0, estimate * 4 + 2.0))
+
+    def _record_latency(self, text, elapsed):
+        per_char = elapsed / max(1, len(text))
+        if self.sec_per_char is None:
+            self.sec_per_char = per_char
+        else:
+            self.sec_per_char = 0.8 * self.sec_per_char + 0.2 * per_char
+
+    def _request(self, method, path, timeout, **kwargs):
+        """
+        セッション経由でリクエストを送り、一時的な失敗は指数バックオフで再試行する。
+        複数エンジンがある場合は、失敗したエンジンを避けて待たずに切り替える
+        """
+        attempt = 0
+        tried: list = []
+
+        while True:
+            endpoint = self.pool.acquire(exclude=tried)
+            url = f"{endpoint.url}{path}"
+            with self._stats_lock:
+                self.http_stats["requests"] += 1
+            reachable = True
+            released_on_close = False
+            started = time.perf_counter()
+            try:
+                # timeout は (接続タイムアウト, 読み込みタイムアウト) のタプル
+                res = self.session.request(method, url, timeout=timeout, **kwargs)
+                reused = getattr(res, "reused_connection", None)
+                self._log_request(
+                    method,
+                    path,
+                    endpoint,
+                    started,
+                    res.status_code,
+                    reused if isinstance(reused, bool) else None,
+                )
+                if res.status_code not in self.RETRY_STATUS:
+                    res.raise_for_status()
+                    if kwargs.get("stream"):
+                        # ストリーミングは本文を読み終える (close) まで処理中に数える
+                        self._release_on_close(res, endpoint)
+                        released_on_close = True
+                    return res
+                res.close()
+                error: Exception = requests.HTTPError(
+                    f"{res.status_code} Server Error: {url}", response=res
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._log_request(method, path, endpoint, started, None, None)
+                error = e
+                reachable = False
+            finally:
+                if not released_on_close:
+                    self.pool.release(endpoint, ok=reachable)
+
+            if attempt >= self.http_retries:
+                with self._stats_lock:
+                    self.http_stats["failures"] += 1
+                raise error
+
+            tried.append(endpoint)
+            attempt += 1
+            with self._stats_lock:
+                self.http_stats["retries"] += 1
+
+            if self.pool.has_alternative(tried):
+                print(
+                    f"  ├ 🔀 別のエンジンで再試行 {attempt}/{self.http_retries}: {error}"
+                )
+            else:
+                delay = min(
+                    self.http_backoff * (2 ** (attempt - 1)), self.http_backoff_max
+                )
+                print(
+                    f"  ├ 🔁 再試行 {attempt}/{self.http_retries} "
+                    f"({delay:.1f}秒後): {error}"
+                )
+                time.sleep(delay)
+
+            # タイムアウトが原因なら次は待ち時間を延ばす
+            if isinstance(error, requests.Timeout):
+                timeout = (timeout[0], timeout[1] * 2)
+
+    def _release_on_close(self, res, endpoint):
+        """応答を閉じた時にエンジンの処理中の数を1減らす (1回だけ)"""
+        close = res.close
+        released = threading.Event()
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if not released.is_set():
+                    released.set()
+                    self.pool.release(endpoint)
+
+        res.close = close_and_release
+
+    def check_connection(self, base_url=None):
+        """
+        エンジンに接続できるか確認する。
+        base_url を省略すると全エンジンを確認し、1台でも使えれば True
+        """
+        if base_url is None:
+            return self.pool.check_all() > 0
         try:
-            requests.get(f"{self.base_url}/speakers", timeout=2)
+            self.session.get(f"{base_url}/speakers", timeout=2)
             return True
         except Exception:
             return False
 
+    def get_engine_version(self):
+        """エンジンのバージョン (キャッシュキー用)。取得できなければ unknown"""
+        # 複数エンジンは同じバージョンで揃えて運用する前提で、最初に答えた1台を使う
+        urls = self.pool.urls
+        if self._engine_version_url == urls and self._engine_version:
+            return self._engine_version
+        failed_at = self._engine_version_failed_at
+        if (
+            self._engine_version_url == urls
+            and failed_at is not None
+            and time.monotonic() - failed_at < self.ENGINE_VERSION_RETRY_SEC
+        ):
+            return "unknown"
+
+        for url in urls:
+            try:
+                res = self.session.get(f"{url}/version", timeout=2)
+                res.raise_for_status()
+                version = str(res.json())
+            except requests.HTTPError:
+                # /version 非対応のエンジン
+                version = "unknown"
+            except Exception:
+                continue
+
+            self._engine_version = version
+            self._engine_version_url = urls
+            self._engine_version_failed_at = None
+            return version
+
+        # 接続できない場合は少し間を空けてから問い合わせ直す (起動待ちの間など)
+        self._engine_version = None
+        self._engine_version_url = urls
+        self._engine_version_failed_at = time.monotonic()
+        return "unknown"
+
+    def _current_params(self):
+        """audio_query に上書きする合成パラメータ"""
+        return {
+            "speedScale": cfg["speed"],
+            "intonationScale": cfg["intonation"],
+            "pitchScale": cfg["pitch"],
+            "volumeScale": cfg["volume"],
+            "postPhonemeLength": cfg["post_pause"],
+        }
+
+    def get_cache_stats(self):
+        if self.cache is None:
+            return None
+        return self.cache.stats()
+
+    def get_query_cache_stats(self):
+        if self.query_cache is None:
+            return None
+        return self.query_cache.stats()
+
+    def _cache_key(self, text, speaker_id, synth_params):
+        if self.cache is None:
+            return None
+        return SynthCache.make_key(
+            text, speaker_id, synth_params, self.get_engine_version()
+        )
+
+    def _cache_lookup(self, cache_key, text):
+        """キャッシュにあれば出力形式を揃えた (data, sr) を返す"""
+        if self.cache is None or cache_key is None:
+            return None
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return None
+        print(f"  ├ ♻️ キャッシュ使用: {text[:20]}...")
+        data, sr = cached
+        return self._finish_audio(data, sr)
+
+    def find_saved_reading(self, text):
+        """
+        ★追加: 読み上げ全体 (整形後の文章) を同じ話者・設定・エンジンのバージョンで
+        保存したファイルのパス (無ければ None)。
+        索引には読み上げ全体の文章が入っているので、行・チャンク単位では探さない
+        """
+        if self.archive_index is None or not self.archive_warm_cache:
+            return None
+        try:
+            return self.archive_index.find_audio(
+                text,
+                cfg["speaker_id"],
+                self._current_params(),
+                self.get_engine_version(),
+            )
+        except Exception as e:
+            print(f"⚠️ 索引を検索できませんでした: {e}")
+            return None
+
+    def load_saved_reading(self, path):
+        """
+        保存ファイルの (data, sr) を出力形式に揃えて返す (読めなければ None)。
+        圧縮・フェード済みの音声なので、合成キャッシュには入れない
+        """
+        try:
+            data, sr = sf.read(path, dtype="float32")
+        except Exception as e:
+            print(f"⚠️ 保存済みの音声を読めませんでした: {e}")
+            return None
+        return self._conform(data, sr)
+
+    def _cache_store(self, cache_key, data, sr):
+        # 出力形式を揃える前の音声を保存しておく
+        if self.cache is not None and cache_key is not None:
+            self.cache.put(cache_key, data, sr)
+
     def synthesize(self, text):
         try:
-            params = {"text": text, "speaker": cfg["speaker_id"]}
-            q_res = requests.post(
-                f"{self.base_url}/audio_query", params=params, timeout=5
+            speaker_id = cfg["speaker_id"]
+            synth_params = self._current_params()
+
+            # ★追加: 同じ行・同じ設定なら合成済みPCMをそのまま使う
+            cache_key = self._cache_key(text, speaker_id, synth_params)
+            cached = self._cache_lookup(cache_key, text)
+            if cached is not None:
+                return cached
+
+            data, sr = self._synthesize_engine(text, speaker_id, synth_params)
+            self._cache_store(cache_key, data, sr)
+
+            return self._finish_audio(data, sr)
+
+        except Exception as e:
+            print(f"❌ APIエラー (この行をスキップ): {e}")
+            return None
+
+    def synthesize_batch(self, lines):
+        """
+        短い行をまとめて /multi_synthesis 1回で合成する。
+        /audio_query は行ごとに必要なので、並行して送り待ち時間を重ねる。
+        戻り値は行ごとの synthesize() と同じ結果のリスト (失敗した行は None)
+        """
+        if len(lines) <= 1 or not self.multi_synthesis_supported:
+            return [self.synthesize(line) for line in lines]
+
+        try:
+            speaker_id = cfg["speaker_id"]
+            synth_params = self._current_params()
+
+            results: list = [None] * len(lines)
+            cache_keys = [
+                self._cache_key(line, speaker_id, synth_params) for line in lines
+            ]
+            missing = []
+            for i, line in enumerate(lines):
+                results[i] = self._cache_lookup(cache_keys[i], line)
+                if results[i] is None:
+                    missing.append(i)
+
+            if not missing:
+                return results
+
+            joined_text = "".join(lines[i] for i in missing)
+            started = time.perf_counter()
+            queries = list(
+                self.query_executor.map(
+                    lambda i: self._get_audio_query(lines[i], speaker_id), missing
+                )
+            )
+            for query in queries:
+                query.update(synth_params)
+
+            res = self._request(
+                "POST",
+                "/multi_synthesis",
+                timeout=(2, self._synthesis_timeout(joined_text)),
+                params={"speaker": speaker_id},
+                json=queries,
+                headers={"Accept": "application/zip"},
             )
-            q_res.raise_for_status()
-
-            query = q_res.json()
-            query["speedScale"] = cfg["speed"]
-            query["intonationScale"] = cfg["intonation"]
-            query["pitchScale"] = cfg["pitch"]
-            query["volumeScale"] = cfg["volume"]
-            query["postPhonemeLength"] = cfg["post_pause"]
-
-            w_res = requests.post(
-                f"{self.base_url}/synthesis",
-                params={"speaker": cfg["speaker_id"]},
+            self._record_latency(joined_text, time.perf_counter() - started)
+
+            decoded = self._unpack_multi_synthesis(res.content, len(missing))
+            for i, (data, sr) in zip(missing, decoded):
+                self._cache_store(cache_keys[i], data, sr)
+                results[i] = self._finish_audio(data, sr)
+
+            return results
+
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status in (404, 405, 501):
+                print("ℹ️ /multi_synthesis 非対応のエンジンです。行ごとに合成します。")
+                self.multi_synthesis_supported = False
+            else:
+                print(f"⚠️ まとめて合成に失敗したため行ごとに合成します: {e}")
+        except Exception as e:
+            print(f"⚠️ まとめて合成に失敗したため行ごとに合成します: {e}")
+
+        return [self.synthesize(line) for line in lines]
+
+    def synthesize_stream(self, text, on_block):
+        """
+        /synthesis の応答をストリーミングで受け取り、届いた分から
+        on_block(block, sr) に渡す。長い行でも最初の音が早く出る。
+        戻り値は synthesize() と同じ (行全体の data, sr) か None
+        """
+        try:
+            speaker_id = cfg["speaker_id"]
+            synth_params = self._current_params()
+
+            cache_key = self._cache_key(text, speaker_id, synth_params)
+            cached = self._cache_lookup(cache_key, text)
+            if cached is not None:
+                on_block(*cached)
+                return cached
+
+            started = time.perf_counter()
+            query = self._get_audio_query(text, speaker_id)
+            query.update(synth_params)
+
+            w_res = self._request(
+                "POST",
+                "/synthesis",
+                timeout=(2, self._synthesis_timeout(text)),
+                params={"speaker": speaker_id},
                 json=query,
                 headers={"Accept": "audio/wav"},
-                timeout=30,
+                stream=True,
             )
-            w_res.raise_for_status()
 
-            data, sr = sf.read(io.BytesIO(w_res.content), dtype="float32")
+            line = LineStreamDecoder(self.output_sr, self.output_channels)
+            with w_res:
+                for chunk in w_res.iter_content(chunk_size=self.STREAM_CHUNK_BYTES):
+                    for block in line.feed(chunk):
+                        on_block(block, line.out_sr)
+            for block in line.finish():
+                on_block(block, line.out_sr)
 
-            # --- クリックノイズ対策 (フェード処理) ---
-            fade_duration = 0.03
-            fade_len = int(sr * fade_duration)
+            self._record_latency(text, time.perf_counter() - started)
+            self._cache_store(cache_key, *line.raw())
 
-            if len(data) > fade_len * 2:
-                fade_in_curve = np.linspace(0.0, 1.0, fade_len, dtype=np.float32)
+            return line.audio()
 
-                if data.ndim == 1:
-                    data[:fade_len] *= fade_in_curve
-                    data[-fade_len:] *= fade_in_curve[::-1]
-                else:
-                    data[:fade_len] *= fade_in_curve[:, np.newaxis]
-                    data[-fade_len:] *= fade_in_curve[::-1][:, np.newaxis]
-            # ---------------------------------------
+        except Exception as e:
+            print(f"❌ APIエラー (この行をスキップ): {e}")
+            return None
+
+    def _unpack_multi_synthesis(self, content, count):
+        """/multi_synthesis の zip (001.wav, 002.wav ...) を行ごとの音声に戻す"""
+        with zipfile.ZipFile(io.BytesIO(content)) as zf:
+            names = sorted(n for n in zf.namelist() if n.endswith(".wav"))
+            if len(names) != count:
+                raise ValueError(
+                    f"multi_synthesis returned {len(names)} files for {count} lines"
+                )
+            return [self._decode_wav(zf.read(name)) for name in names]
+
+    def _synthesize_engine(self, text, speaker_id, synth_params):
+        """エンジンに audio_query + synthesis を投げて (data, sr) を得る"""
+        started = time.perf_counter()
+        query = self._get_audio_query(text, speaker_id)
+        query.update(synth_params)
+
+        w_res = self._request(
+            "POST",
+            "/synthesis",
+            timeout=(2, self._synthesis_timeout(text)),
+            params={"speaker": speaker_id},
+            json=query,
+            headers={"Accept": "audio/wav"},
+        )
+        self._record_latency(text, time.perf_counter() - started)
+
+        return self._decode_wav(w_res.content)
 
-            return data, sr
+    def _decode_wav(self, content):
+        """
+        エンジンのWAVを float32 に変換する。
+        PCM WAVはヘッダを直接読み、応答バイト列を np.frombuffer で参照したまま
+        確保済みの出力配列へ1回で変換する (BytesIO や中間配列を作らない)。
+        対応外の形式のみ soundfile で読む。
+        """
+        try:
+            fmt = parse_wav_header(content)
+        except ValueError:
+            fmt = None
+
+        if fmt is not None:
+            end = len(content)
+            if fmt.data_size not in (0, 0xFFFFFFFF):
+                end = min(end, fmt.data_offset + fmt.data_size)
+            usable = end - fmt.data_offset
+            usable -= usable % fmt.block_align
+            view = memoryview(content)[fmt.data_offset : fmt.data_offset + usable]
+
+            sample_count = usable * 8 // fmt.bits_per_sample
+            out = np.empty(sample_count, dtype=np.float32)
+            try:
+                data = pcm_to_float32(view, fmt, out=out)
+            except ValueError:
+                data = None
+
+            if data is not None:
+                with self._stats_lock:
+                    self.decode_stats["lines"] += 1
+                    self.decode_stats["allocations"] += 1
+                    self.decode_stats["bytes_copied"] += out.nbytes
+                return data, fmt.sample_rate
+
+        data, sr = sf.read(io.BytesIO(content), dtype="float32")
+        with self._stats_lock:
+            self.decode_stats["lines"] += 1
+            self.decode_stats["fallbacks"] += 1
+            # BytesIO へのコピー + デコード結果の配列
+            self.decode_stats["allocations"] += 2
+            self.decode_stats["bytes_copied"] += len(content) + data.nbytes
+        return data, sr
+
+    def get_decode_stats(self):
+        """WAVデコードの割り当て回数・コピー量 (ベンチマーク用)"""
+        with self._stats_lock:
+            stats: dict = dict(self.decode_stats)
+        lines = stats["lines"]
+        stats["allocations_per_line"] = stats["allocations"] / lines if lines else 0.0
+        stats["bytes_copied_per_line"] = stats["bytes_copied"] / lines if lines else 0.0
+        return stats
+
+    def _get_audio_query(self, text, speaker_id):
+        """audio_query の結果を返す (キャッシュがあればエンジンに問い合わせない)"""
+        query_cache = self.query_cache
+        cache_key = None
+        if query_cache is not None:
+            cache_key = QueryCache.make_key(text, speaker_id, self.get_engine_version())
+            query = query_cache.get(cache_key)
+            if query is not None:
+                return query
+
+        q_res = self._request(
+            "POST",
+            "/audio_query",
+            timeout=(2, max(5.0, self._synthesis_timeout(text) / 2)),
+            params={"text": text, "speaker": speaker_id},
+        )
+        query = q_res.json()
+
+        if query_cache is not None and cache_key is not None:
+            query_cache.put(cache_key, query)
+        return query
+
+    def _finish_audio(self, data, sr):
+        """
+        再生・保存に渡す直前の仕上げ (出力形式の統一)。
+        行頭・行末のフェードは行をつなぐ SegmentAssembler で行う
+        """
+        return self._conform(data, sr)
+
+    def _conform(self, data, sr):
+        """output_sample_rate / output_channels が指定されていれば揃える"""
+        channels = 1 if data.ndim == 1 else data.shape[1]
+        # チャンネル数を減らす場合は先に減らした方が変換が軽い
+        if self.output_channels and self.output_channels < channels:
+            data = match_channels(data, self.output_channels)
+        if self.output_sr and sr != self.output_sr:
+            data = resample(data, sr, self.output_sr)
+            sr = self.output_sr
+        if self.output_channels:
+            data = match_channels(data, self.output_channels)
+        return data, sr
+
+    def get_save_stats(self):
+        return self.save_queue.stats()
+
+    def flush_saves(self, timeout=None):
+        """保存待ちのファイルをすべて書き出すまで待つ"""
+        backlog = self.save_queue.backlog()
+        if backlog:
+            print(f"💾 保存待ち {backlog}件を書き出しています...")
+        return self.save_queue.flush(timeout)
+
+    def shutdown(self):
+        """終了時の後片付け (保存待ちを書き出してから保存スレッドを止める)"""
+        if self.tiering is not None:
+            self.tiering.stop()
+        self.pool.close()
+        self.query_executor.shutdown(wait=False)
+        self.flush_saves()
+        self.save_queue.shutdown()
+        if self.archive_index is not None:
+            self.archive_index.close()
+
+    def select_encoder(self):
+        """保存に使うエンコーダ (FLAC強制なら FLAC、Opus は使えるものを選ぶ)"""
+        return select_encoder(
+            use_opus=not self.force_flac,
+            backend=cfg.get("opus_encoder", "auto"),
+            ffmpeg_path=FFMPEG_PATH,
+        )
+
+    def _get_manifest(self, daily_save_dir):
+        """保存先フォルダの目録 (フォルダごとに1つを使い回す)"""
+        with self._manifest_lock:
+            manifest = self._manifests.get(daily_save_dir)
+            if manifest is None:
+                manifest = DayManifest(daily_save_dir)
+                self._manifests[daily_save_dir] = manifest
+            return manifest
+
+    def _record_log_result(self, job, status, duration=None):
+        """保存の結果を目録に記録し、保存できたものは検索用の索引にも登録する"""
+        fields = {} if duration is None else {"duration": round(duration, 3)}
+        try:
+            job["manifest"].finish(job["track"], status, **fields)
+        except Exception as e:
+            print(f"⚠️ 目録の更新に失敗: {e}")
 
+        if status != "saved" or self.archive_index is None:
+            return
+        try:
+            self.archive_index.add(
+                job["filepath"],
+                job["text"],
+                day=job["day"],
+                track=job["track"],
+                speaker_id=job["speaker_id"],
+                params=job["params"],
+                duration=fields.get("duration"),
+                saved_at=datetime.datetime.now().isoformat(timespec="seconds"),
+                engine_version=job["engine_version"],
+            )
         except Exception as e:
-            print(f"❌ APIエラー: {e}")
+            print(f"⚠️ 索引の更新に失敗: {e}")
+
+    def start_tiering(self, is_busy=None):
+        """
+        ★追加: archive_tiering_days より前の日付フォルダの FLAC を、
+        バックグラウンドで少しずつ Opus に変換する。
+        is_busy() が True の間 (読み上げ中) と保存待ちがある間は変換しない
+        """
+        days = int(cfg.get("archive_tiering_days", 0) or 0)
+        if days <= 0 or self.tiering is not None:
             return None
 
-    def save_log(self, full_audio, sr, original_text):
-        """FLAC/Opusで保存し、mutagenでタグ付けを行う"""
+        # FLAC 強制の設定に関係なく、Opus にできるエンコーダを探す
+        encoder = select_encoder(
+            use_opus=True,
+            backend=cfg.get("opus_encoder", "auto"),
+            ffmpeg_path=FFMPEG_PATH,
+        )
+        if encoder.ext != ".opus":
+            print("ℹ️ Opusエンコーダが無いため、古いFLACの変換は行いません。")
+            return None
 
-        # ★変更: 引数 or 設定でFLAC強制が指定されている場合は、Opusを使わない
-        use_opus = HAS_FFMPEG and not self.force_flac
-        target_ext = ".opus" if use_opus else ".flac"
+        def busy():
+            return self.save_queue.backlog() > 0 or bool(is_busy and is_busy())
+
+        # Opus ではカバー画像が base64 で埋め込まれて大きくなるので、
+        # 変換するファイルの画像は既定で縮小する (0 なら artwork_max_px と同じ)
+        artwork = self.artwork_cache
+        tiering_px = int(cfg.get("archive_tiering_artwork_px", 600) or 0)
+        if tiering_px:
+            artwork = ArtworkCache(tiering_px, cfg.get("artwork_quality", 90))
+
+        self.tiering = ArchiveTiering(
+            self.archive_root(),
+            encoder,
+            days,
+            duty=float(cfg.get("archive_tiering_duty", 0.2)),
+            is_busy=busy,
+            on_moved=self._on_tiered,
+            artwork=artwork,
+        )
+        self.tiering.start()
+        print(f"🗜️ {days}日より前のFLACをOpusに変換します (エンコーダ: {encoder.name})")
+        return self.tiering
 
+    def _on_tiered(self, old_path, new_path):
+        if self.archive_index is None:
+            return
+        try:
+            self.archive_index.rename(old_path, new_path)
+        except Exception as e:
+            print(f"⚠️ 索引の更新に失敗: {e}")
+
+    def reindex_archive(self):
+        """保存フォルダの既存ファイルを索引に取り込む。戻り値は (追加, 削除) 件数"""
+        if self.archive_index is None:
+            return 0, 0
+        return self.archive_index.backfill(self.archive_root())
+
+    def search_archive(self, query, limit=20, day=None):
+        """読み上げた文章から保存ファイルを探す"""
+        if self.archive_index is None:
+            return []
+        return self.archive_index.search(query, limit=limit, day=day)
+
+    def archive_root(self):
+        """保存先のルート (この下に日付ごとのフォルダを作る)"""
         root_path = cfg["dropbox_dir"]
 
         # use_dropboxが有効かつカスタムパスが未指定の場合のみ自動検出
@@ -368,6 +1452,14 @@ class AivisSynthesizer:
         if not root_path:
             root_path = os.getcwd()
 
+        return os.path.join(root_path, cfg["output_dir"])
+
+    def _prepare_log_job(self, original_text):
+        """保存先・ファイル名・トラック番号・タグを、この時点の設定で決める"""
+        # ★変更: 引数 or 設定でFLAC強制が指定されている場合は、Opusを使わない
+        encoder = self.select_encoder()
+        target_ext = encoder.ext
+
         # ★日付オーバーライド確認
         override_date = cfg.get("override_date")
         if override_date:
@@ -375,20 +1467,9 @@ class AivisSynthesizer:
         else:
             daily_date_str = datetime.datetime.now().strftime("%y%m%d")
 
-        daily_save_dir = os.path.join(root_path, cfg["output_dir"], daily_date_str)
+        daily_save_dir = os.path.join(self.archive_root(), daily_date_str)
         os.makedirs(daily_save_dir, exist_ok=True)
 
-        try:
-            existing_files = [
-                filename
-                for filename in os.listdir(daily_save_dir)
-                if filename.endswith((".flac", ".ogg", ".opus"))
-            ]
-            track_number = len(existing_files) + 1
-        except OSError as e:
-            print(f"⚠️ ディレクトリ読み込みエラー ({daily_save_dir}): {e}")
-            track_number = 1
-
         meta_title = re.sub(r"[^\w\u3002]", "", original_text)
         sentence_part = original_text.split("。")[0]
         clean_title = re.sub(r"[^\w]", "", sentence_part)[:20] or "NoTitle"
@@ -401,106 +1482,86 @@ class AivisSynthesizer:
             timestamp = datetime.datetime.now().strftime("%y%m%d%H%M%S")
 
         filename = f"{timestamp}_{clean_title}{target_ext}"
-        filepath = os.path.join(daily_save_dir, filename)
 
-        try:
-            if use_opus:
-                # --- FFmpeg Opus保存処理 ---
-                if full_audio.dtype != np.float32:
-                    audio_input = full_audio.astype(np.float32)
-                else:
-                    audio_input = full_audio
-
-                channels = 1 if audio_input.ndim == 1 else audio_input.shape[1]
-
-                command = [
-                    FFMPEG_PATH,
-                    "-f",
-                    "f32le",
-                    "-ar",
-                    str(sr),
-                    "-ac",
-                    str(channels),
-                    "-i",
-                    "pipe:0",
-                    "-c:a",
-                    "libopus",
-                    "-b:a",
-                    "128k",
-                    "-vbr",
-                    "on",
-                    "-y",
-                    filepath,
-                ]
-
-                # Windowsの場合、コマンドプロンプトが出ないようにフラグを設定
-                creation_flags = 0
-                if os.name == "nt":
-                    creation_flags = 0x08000000  # CREATE_NO_WINDOW
-
-                process = subprocess.Popen(
-                    command,  # type: ignore
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.PIPE,
-                    creationflags=creation_flags,
-                )
-                _, stderr = process.communicate(input=audio_input.tobytes())
+        # ★変更: トラック番号はフォルダの目録で確保する (ファイル数は数えない)
+        speaker_id = cfg["speaker_id"]
+        synth_params = self._current_params()
+        manifest = self._get_manifest(daily_save_dir)
+        track_number = manifest.reserve(
+            filename, original_text, params={"speaker_id": speaker_id, **synth_params}
+        )
 
-                if process.returncode != 0:
-                    err_msg = stderr.decode("utf-8", errors="ignore")
-                    print(f"⚠️ FFmpegエラー詳細: {err_msg}")
-                    raise Exception(f"FFmpeg failed (Code: {process.returncode})")
+        return {
+            "filepath": os.path.join(daily_save_dir, filename),
+            "label": f"{daily_date_str}/ No.{track_number} - {filename}",
+            "encoder": encoder,
+            "tags": {
+                "title": meta_title,
+                "artist": cfg["artist"],
+                "album": f"{cfg['album_prefix']}_{daily_date_str}",
+                "tracknumber": str(track_number),
+            },
+            "artwork": cfg["artwork_path"],
+            "manifest": manifest,
+            "track": track_number,
+            "day": daily_date_str,
+            "text": original_text,
+            "speaker_id": speaker_id,
+            "params": synth_params,
+            "engine_version": self.get_engine_version(),
+        }
+
+    def save_log(self, full_audio, sr, original_text):
+        """FLAC/Opusでの保存を保存キューに入れる (すぐに戻る)"""
+        job = self._prepare_log_job(original_text)
+        backlog = self.save_queue.backlog()
+        if backlog:
+            print(f"💾 保存待ち: {backlog}件")
+        future = self.save_queue.submit(self._write_log, full_audio, sr, job)
+        future.add_done_callback(
+            lambda f: self._record_log_result(
+                job,
+                "saved" if f.result() else "failed",
+                len(full_audio) / sr if f.result() else None,
+            )
+        )
+        return future
+
+    def open_log(self, sr, channels, original_text):
+        """
+        ★追加: 読み上げ中に少しずつ書き足す保存ファイルを開く (ArchiveWriter)。
+        ファイル名・トラック番号は save_log と同じく開いた時点で決める
+        """
+        job = self._prepare_log_job(original_text)
+        writer = ArchiveWriter(
+            job["filepath"],
+            job["encoder"],
+            sr,
+            channels,
+            self.save_queue,
+            finalize=lambda path: self._finalize_log(job),
+        )
+
+        def record(finished):
+            result = finished.result()
+            if result is None:
+                self._record_log_result(job, "discarded")
+            elif result:
+                self._record_log_result(job, "saved", writer.frames / sr)
             else:
-                with open(filepath, "wb") as audio_file:
-                    sf.write(audio_file, full_audio, sr, format="FLAC")
+                self._record_log_result(job, "failed")
 
-            if HAS_MUTAGEN:
-                audio = MutagenFile(filepath)
+        writer.finished.add_done_callback(record)
+        return writer
 
-                if audio is None:
-                    print(
-                        "⚠️ タグ付け失敗: mutagenがファイル形式を認識できませんでした。"
-                    )
-                else:
-                    if override_date:
-                        current_date_str = override_date
-                    else:
-                        current_date_str = datetime.datetime.now().strftime("%y%m%d")
-
-                    audio["title"] = meta_title
-                    audio["artist"] = cfg["artist"]
-                    audio["album"] = f"{cfg['album_prefix']}_{current_date_str}"
-                    audio["tracknumber"] = str(track_number)
-
-                    artwork = cfg["artwork_path"]
-                    if os.path.exists(artwork):
-                        image = Picture()
-                        # ★修正: Enumではなく整数値(3=Cover Front)を明示的に設定
-                        image.type = 3
-                        # ★修正: Descriptionを明示 (一部プレーヤー対策)
-                        image.desc = "Cover"
-
-                        if artwork.lower().endswith((".jpg", ".jpeg")):
-                            image.mime = "image/jpeg"
-                        else:
-                            image.mime = "image/png"
-
-                        with open(artwork, "rb") as artwork_file:
-                            image.data = artwork_file.read()
-
-                        if use_opus:
-                            # Opus (Ogg) の場合は METADATA_BLOCK_PICTURE タグとして
-                            # Base64エンコードしたFLAC画像ブロック構造体を書き込む
-                            image_data = image.write()
-                            encoded_data = base64.b64encode(image_data).decode("ascii")
-                            audio["METADATA_BLOCK_PICTURE"] = [encoded_data]
-                        else:
-                            audio.add_picture(image)
-
-                    audio.save()
-
-            print(f"💾 [保存完了] {daily_date_str}/ No.{track_number} - {filename}")
+    def _write_log(self, full_audio, sr, job):
+        """保存スレッドで実行: エンコードして書き出し、mutagenでタグ付けを行う"""
+        filepath = job["filepath"]
+
+        try:
+            job["encoder"].encode(filepath, full_audio, sr)
+            self._finalize_log(job)
+            return True
 
         except Exception as e:
             print(f"⚠️ 保存失敗: {e}")
@@ -509,16 +1570,66 @@ class AivisSynthesizer:
                     os.remove(filepath)
                 except OSError:
                     pass
+            return False
+
+    def _finalize_log(self, job):
+        """書き出したファイルに mutagen でタグ (カバー画像含む) を付ける"""
+        filepath = job["filepath"]
+        use_opus = job["encoder"].ext == ".opus"
+
+        if HAS_MUTAGEN:
+            audio = MutagenFile(filepath)
+
+            if audio is None:
+                print("⚠️ タグ付け失敗: mutagenがファイル形式を認識できませんでした。")
+            else:
+                for key, value in job["tags"].items():
+                    audio[key] = value
+
+                # ★変更: 画像の読み込み・変換は ArtworkCache で1回だけ行う
+                artwork = self.artwork_cache.get(job["artwork"])
+                if artwork is not None:
+                    if use_opus:
+                        # Opus (Ogg) の場合は METADATA_BLOCK_PICTURE タグとして
+                        # Base64エンコードしたFLAC画像ブロック構造体を書き込む
+                        audio["METADATA_BLOCK_PICTURE"] = [artwork.block_base64]
+                    else:
+                        audio.add_picture(artwork.picture)
+
+                audio.save()
+
+        print(f"💾 [保存完了] {job['label']}")
 
 
 # ─── TaskManager クラス ──────────────────────────
 class TaskManager:
+    # 1文字あたりの音声の長さ (秒) の初期値。行をつなぐバッファの確保量の見積もりに使う
+    AUDIO_SEC_PER_CHAR = 0.15
+
     def __init__(self, synth, player):
         self.synth = synth
         self.player = player
         self.task_queue: queue.Queue[str] = queue.Queue()
         self.stop_current_flag = False
 
+        # ★追加: パイプライン合成 (次の行を再生中に先行合成する)
+        self.pipeline_depth = max(1, int(cfg.get("pipeline_depth", 2)))
+        # ★追加: 実際に合成された音声の長さから更新する
+        self.audio_sec_per_char = self.AUDIO_SEC_PER_CHAR
+
+        # ★追加: 終了処理 (close) 用。処理中の読み上げと、その後片付けの完了
+        self.closed = False
+        self._current_state = None
+        self._idle = threading.Event()
+        self._idle.set()
+
+        self._start_worker()
+
+    def _start_worker(self):
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.pipeline_depth, thread_name_prefix="synth"
+        )
+
         self.thread = threading.Thread(target=self._worker, daemon=True)
         self.thread.start()
 
@@ -528,6 +1639,10 @@ class TaskManager:
         if q_size > 1:
             print(f"📥 キュー待機中: {q_size}件")
 
+    def is_busy(self):
+        """読み上げ中・読み上げ待ちがあるか (バックグラウンド処理の間引き用)"""
+        return self.task_queue.unfinished_tasks > 0
+
     def force_stop(self):
         self.stop_current_flag = True
         with self.task_queue.mutex:
@@ -543,6 +1658,24 @@ class TaskManager:
         # キューはクリアしない
         # stop_current_flagにより_workerループ内の合成/再生がbreakされる
 
+    def close(self, timeout=2.0):
+        """
+        ★追加: 終了時に呼ぶ (synth.shutdown() より前)。
+        読み上げを止め、書きかけの保存ファイルを削除して目録を「破棄」にする
+        """
+        self.closed = True
+        self.stop_current_flag = True
+        with self.task_queue.mutex:
+            self.task_queue.queue.clear()
+        self.player.stop_immediate()
+        # 作業スレッドが中断を終えるのを少し待つ (通信中でも待ち続けない)
+        self._idle.wait(timeout)
+
+        state = self._current_state
+        if state is not None and state["archive"] is not None:
+            # 確定・破棄済みのファイルならここでの破棄は何もしない
+            state["archive"].discard()
+
     def _clean_text(self, text):
         user_dict = cfg.get("dictionary", {})
         if user_dict:
@@ -566,56 +1699,792 @@ class TaskManager:
 
         return text.strip()
 
+    def _first_chunk_chars(self, min_chars, max_chars):
+        """
+        最初のチャンクの文字数。計測済みの合成速度 (秒/文字) から、
+        first_audio_target 秒以内に合成が終わる長さにする
+        """
+        sec_per_char = getattr(self.synth, "sec_per_char", None)
+        if not isinstance(sec_per_char, (int, float)) or sec_per_char <= 0:
+            return int(cfg.get("first_chunk_chars", 20))
+
+        target = float(cfg.get("first_audio_target", 0.5))
+        return max(min_chars, min(max_chars, int(target / sec_per_char)))
+
+    def _chunk_lines(self, lines):
+        """長い行を文単位のチャンクに分ける (最初のチャンクは短く)"""
+        if not cfg.get("chunk_sentences", True):
+            return lines
+
+        max_chars = max(1, int(cfg.get("chunk_max_chars", 120)))
+        min_chars = int(cfg.get("chunk_min_chars", 8))
+        first_chars = self._first_chunk_chars(min_chars, max_chars)
+        return chunk_lines(lines, first_chars, max_chars, min_chars)
+
+    def _group_lines(self, lines, first_alone=False):
+        """
+        連続する短い行を文字数の予算内でまとめる。
+        まとめた行は /multi_synthesis 1回で合成される。
+        first_alone=True なら、最初の音を早く出すため先頭の行はまとめない
+        """
+        budget = int(cfg.get("batch_char_budget", 80))
+        short_len = int(cfg.get("batch_line_chars", 20))
+
+        groups: list = []
+        current: list = []
+        current_len = 0
+        for i, line in enumerate(lines):
+            is_short = budget > 0 and len(line) <= short_len
+            if first_alone and i == 0:
+                is_short = False
+            if current and (not is_short or current_len + len(line) > budget):
+                groups.append(current)
+                current, current_len = [], 0
+
+            if is_short:
+                current.append(line)
+                current_len += len(line)
+            else:
+                groups.append([line])
+
+        if current:
+            groups.append(current)
+        return groups
+
+    def _submit_group(self, group, first_index, total):
+        """
+        1件ぶんの合成を投げる。(future, blocks) を返す。
+        長い行はストリーミング合成し、届いたブロックを blocks キューに流す
+        """
+        if len(group) == 1:
+            line = group[0]
+            print(f"  ├ 合成中 ({first_index + 1}/{total}): {line[:20]}...")
+
+            stream_min = int(cfg.get("streaming_min_chars", 60))
+            if stream_min > 0 and len(line) >= stream_min:
+                blocks: queue.Queue = queue.Queue()
+
+                def on_block(block, sr):
+                    blocks.put((block, sr))
+
+                future = self.executor.submit(
+                    lambda: [self.synth.synthesize_stream(line, on_block)]
+                )
+                return future, blocks
+
+            return self.executor.submit(lambda: [self.synth.synthesize(line)]), None
+
+        last = first_index + len(group)
+        print(
+            f"  ├ まとめて合成中 ({first_index + 1}-{last}/{total}): "
+            f"{group[0][:20]}..."
+        )
+        return self.executor.submit(self.synth.synthesize_batch, group), None
+
+    def _wait_head(self, future, blocks, state):
+        """
+        先頭の合成が終わるまで待つ (停止フラグは短い間隔で確認する)。
+        ストリーミング中の行は、届いたブロックをその場でつないで再生キューに送る
+        """
+        new_line = True
+        while not self.stop_current_flag:
+            if blocks is None:
+                if future.done():
+                    return
+                concurrent.futures.wait([future], timeout=0.05)
+                continue
+
+            try:
+                block, sr = blocks.get(timeout=0.05)
+                self._play(state, state["assembler"].add(block, sr, new_line))
+                new_line = False
+                continue
+            except queue.Empty:
+                pass
+            # ブロックを流し終えてから future が完了するので、この順で確認する
+            if future.done() and blocks.empty():
+                return
+
+    def _synthesize_pipelined(self, lines, state):
+        """
+        最大 pipeline_depth 件ぶんの合成を先行して投げ、
+        完了した結果を元の行順で返すジェネレータ。
+        (結果, 再生キュー投入済みか) のタプルを返す
+        """
+        groups = self._group_lines(lines, first_alone=True)
+        pending: collections.deque = collections.deque()
+        next_group = 0
+        next_line = 0
+
+        try:
+            while next_group < len(groups) or pending:
+                # 先行枠が空いている分だけ次の行 (またはまとめた行) を合成に回す
+                while (
+                    not self.stop_current_flag
+                    and next_group < len(groups)
+                    and len(pending) < self.pipeline_depth
+                ):
+                    group = groups[next_group]
+                    pending.append(self._submit_group(group, next_line, len(lines)))
+                    next_group += 1
+                    next_line += len(group)
+
+                if self.stop_current_flag or not pending:
+                    break
+
+                future, blocks = pending[0]
+                self._wait_head(future, blocks, state)
+
+                if self.stop_current_flag:
+                    break
+
+                pending.popleft()
+                for res in future.result():
+                    yield res, blocks is not None
+        finally:
+            # 中断時はまだ始まっていない合成を取り消す
+            for future, _ in pending:
+                future.cancel()
+
+    def _prepare_task(self, raw_text):
+        """テキストを整形して行に分ける。読み上げ対象外なら None"""
+        cleaned_text = self._clean_text(raw_text)
+
+        if not cleaned_text:
+            return None
+
+        lines = [line.strip() for line in cleaned_text.splitlines() if line.strip()]
+
+        total_len = sum(len(line) for line in lines)
+        if total_len < cfg["min_length"]:
+            return None
+
+        # ★追加: 長い段落でもすぐ読み始められるよう文単位に分ける
+        lines = self._chunk_lines(lines)
+
+        # ★追加: 合成している間に休止中の再生ストリームを起こしておく
+        self.player.prewarm()
+        return cleaned_text, lines
+
+    def _new_task_state(self, cleaned_text, lines):
+        print(f"🎤 合成開始: {len(lines)}行 (Queue: {self.task_queue.qsize()})")
+        # ★追加: 行の継ぎ目をクロスフェードしながら1本の音声につなぐ
+        # (再生と保存の両方にこの音声を使う)
+        chars = sum(len(line) for line in lines)
+        streaming = bool(cfg.get("archive_streaming", True))
+        assembler = SegmentAssembler(
+            crossfade_ms=int(cfg.get("segment_crossfade_ms", 30)),
+            gap_ms=int(cfg.get("segment_gap_ms", 0)),
+            # 見積もりより長くなった場合だけバッファを広げ直す
+            expected_sec=chars * self.audio_sec_per_char * 1.25,
+            # 保存ファイルに書き足していく場合は、書いた分を手元に残さない
+            retain=not streaming,
+        )
+        state = {
+            "assembler": assembler,
+            "chars": chars,
+            "text": cleaned_text,
+            "streaming": streaming,
+            "archive": None,
+        }
+        self._current_state = state
+        return state
+
+    def _play(self, state, audio):
+        """確定した音声を再生キューに送り、保存ファイルにも書き足す"""
+        if len(audio) == 0:
+            return
+        assembler = state["assembler"]
+        self.player.enqueue(audio, assembler.sample_rate)
+
+        if state["streaming"] and not self.closed:
+            if state["archive"] is None:
+                # 最初の音声が確定した時点でファイルを開く
+                self._open_archive(state)
+            state["archive"].write(audio)
+
+    def _open_archive(self, state):
+        # 開いた時点で state に残す (中断された場合に close() が破棄できるよう)
+        assembler = state["assembler"]
+        state["archive"] = self.synth.open_log(
+            assembler.sample_rate, assembler.channels, state["text"]
+        )
+
+    def _consume_result(self, state, res, already_enqueued):
+        """合成済みの1行をつなぎ、確定した部分を再生キューに送る"""
+        if not res or already_enqueued:
+            return
+
+        data, sr = res
+        self._play(state, state["assembler"].add(data, sr))
+
+    def _finish_task(self, cleaned_text, state):
+        if self.stop_current_flag:
+            print("⛔ タスク中断")
+            # 書きかけの保存ファイルは残さない
+            if state["archive"] is not None:
+                state["archive"].discard()
+            return
+
+        assembler = state["assembler"]
+        if assembler.sample_rate == 0:
+            return
+
+        self._play(state, assembler.finish())
+        duration = assembler.total_frames / assembler.sample_rate
+        self.audio_sec_per_char = duration / max(1, state["chars"])
+
+        if state["archive"] is not None:
+            state["archive"].close()
+        elif not state["streaming"]:
+            self.synth.save_log(assembler.audio, assembler.sample_rate, cleaned_text)
+
+    def _replay_saved(self, cleaned_text):
+        """
+        ★追加: 同じ読み上げ全体を保存したファイルがあれば、合成・保存せずに
+        それをそのまま再生して True を返す
+        """
+        find = getattr(self.synth, "find_saved_reading", None)
+        path = find(cleaned_text) if find is not None else None
+        if not isinstance(path, str):
+            return False
+        saved = self.synth.load_saved_reading(path)
+        if saved is None:
+            return False
+        print(f"♻️ 保存済みの読み上げを再生します: {os.path.basename(path)}")
+        data, sr = saved
+        self.player.enqueue(data, sr)
+        return True
+
     def _worker(self):
         while True:
             raw_text = self.task_queue.get()
+            if self.closed:
+                self.task_queue.task_done()
+                continue
+            self._idle.clear()
             self.stop_current_flag = False
 
-            cleaned_text = self._clean_text(raw_text)
+            prepared = self._prepare_task(raw_text)
+            if prepared is not None and not self._replay_saved(prepared[0]):
+                cleaned_text, lines = prepared
+                state = self._new_task_state(cleaned_text, lines)
 
-            if not cleaned_text:
-                self.task_queue.task_done()
-                continue
+                for res, already_enqueued in self._synthesize_pipelined(lines, state):
+                    self._consume_result(state, res, already_enqueued)
+
+                self._finish_task(cleaned_text, state)
+
+            self._idle.set()
+            self.task_queue.task_done()
+
+
+# ─── asyncio 版 (合成器・TaskManager) ──────────────────────
+class AsyncAivisSynthesizer:
+    """
+    AivisSynthesizer の asyncio 版 (aiohttp 使用)。
+    キャッシュ・デコード・統計などは元の合成器のものをそのまま使う。
+    """
+
+    def __init__(self, synth):
+        self.synth = synth
+        self.session = None
+
+    async def _get_session(self):
+        if self.session is None or self.session.closed:
+            pool_size = max(4, int(cfg.get("pipeline_depth", 2)) * 2)
+            # 接続を使い回したかをリクエストごとに記録する
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_reuseconn.append(self._on_connection)
+            trace.on_connection_create_end.append(self._on_connection)
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=pool_size),
+                trace_configs=[trace],
+            )
+        return self.session
+
+    @staticmethod
+    async def _on_connection(session, trace_config_ctx, params):
+        ctx = trace_config_ctx.trace_request_ctx
+        if ctx is not None:
+            ctx["reused"] = isinstance(params, aiohttp.TraceConnectionReuseconnParams)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _request(self, method, path, timeout, on_chunk=None, **kwargs):
+        """
+        AivisSynthesizer._request と同じ再試行・エンジン振り分けのルールで
+        リクエストし、本文を返す。
+        on_chunk (async) を渡すと本文は受信した分から順に渡し、None を返す。
+        タスクが取り消されると通信中のリクエストもその場で中断される
+        """
+        synth = self.synth
+        attempt = 0
+        tried: list = []
+
+        while True:
+            endpoint = synth.pool.acquire(exclude=tried)
+            url = f"{endpoint.url}{path}"
+            with synth._stats_lock:
+                synth.http_stats["requests"] += 1
+            session = await self._get_session()
+            client_timeout = aiohttp.ClientTimeout(
+                sock_connect=timeout[0], sock_read=timeout[1]
+            )
+            reachable = True
+            streamed = False
+            started = time.perf_counter()
+            trace_ctx: dict = {}
+            logged = False
+            try:
+                async with session.request(
+                    method,
+                    url,
+                    timeout=client_timeout,
+                    trace_request_ctx=trace_ctx,
+                    **kwargs,
+                ) as res:
+                    synth._log_request(
+                        method,
+                        path,
+                        endpoint,
+                        started,
+                        res.status,
+                        trace_ctx.get("reused"),
+                    )
+                    logged = True
+                    if res.status not in synth.RETRY_STATUS:
+                        res.raise_for_status()
+                        if on_chunk is None:
+                            return await res.read()
+                        async for chunk in res.content.iter_chunked(
+                            synth.STREAM_CHUNK_BYTES
+                        ):
+                            streamed = True
+                            await on_chunk(chunk)
+                        return None
+                    error: Exception = aiohttp.ClientResponseError(
+                        res.request_info,
+                        res.history,
+                        status=res.status,
+                        message=str(res.reason),
+                    )
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if not logged:
+                    synth._log_request(method, path, endpoint, started, None, None)
+                error = e
+                reachable = False
+                if streamed:
+                    # 途中まで渡した分があるので、最初からやり直さない
+                    raise
+            finally:
+                # 本文を読み終えてから (または失敗・取り消し時に) 処理中の数を戻す
+                synth.pool.release(endpoint, ok=reachable)
+
+            if attempt >= synth.http_retries:
+                with synth._stats_lock:
+                    synth.http_stats["failures"] += 1
+                raise error
+
+            tried.append(endpoint)
+            attempt += 1
+            with synth._stats_lock:
+                synth.http_stats["retries"] += 1
+
+            if synth.pool.has_alternative(tried):
+                print(
+                    f"  ├ 🔀 別のエンジンで再試行 {attempt}/{synth.http_retries}: {error}"
+                )
+            else:
+                delay = min(
+                    synth.http_backoff * (2 ** (attempt - 1)), synth.http_backoff_max
+                )
+                print(
+                    f"  ├ 🔁 再試行 {attempt}/{synth.http_retries} "
+                    f"({delay:.1f}秒後): {error}"
+                )
+                await asyncio.sleep(delay)
+
+            if isinstance(error, asyncio.TimeoutError):
+                timeout = (timeout[0], timeout[1] * 2)
+
+    async def _get_audio_query(self, text, speaker_id):
+        synth = self.synth
+        cache_key = None
+        if synth.query_cache is not None:
+            cache_key = await asyncio.to_thread(
+                QueryCache.make_key, text, speaker_id, synth.get_engine_version()
+            )
+            query = await asyncio.to_thread(synth.query_cache.get, cache_key)
+            if query is not None:
+                return query
+
+        body = await self._request(
+            "POST",
+            "/audio_query",
+            timeout=(2, max(5.0, synth._synthesis_timeout(text) / 2)),
+            params={"text": text, "speaker": speaker_id},
+        )
+        query = json.loads(body)
+
+        if synth.query_cache is not None and cache_key is not None:
+            await asyncio.to_thread(synth.query_cache.put, cache_key, query)
+        return query
+
+    async def synthesize(self, text):
+        synth = self.synth
+        try:
+            speaker_id = cfg["speaker_id"]
+            synth_params = synth._current_params()
+
+            # キャッシュ (ディスクI/O・バージョン確認) はスレッドに逃がす
+            cache_key = await asyncio.to_thread(
+                synth._cache_key, text, speaker_id, synth_params
+            )
+            cached = await asyncio.to_thread(synth._cache_lookup, cache_key, text)
+            if cached is not None:
+                return cached
+
+            started = time.perf_counter()
+            query = await self._get_audio_query(text, speaker_id)
+            query.update(synth_params)
+
+            body = await self._request(
+                "POST",
+                "/synthesis",
+                timeout=(2, synth._synthesis_timeout(text)),
+                params={"speaker": speaker_id},
+                json=query,
+                headers={"Accept": "audio/wav"},
+            )
+            synth._record_latency(text, time.perf_counter() - started)
+
+            # デコード・変換もイベントループを止めないようスレッドで行う
+            data, sr = await asyncio.to_thread(synth._decode_wav, body)
+            await asyncio.to_thread(synth._cache_store, cache_key, data, sr)
+            return await asyncio.to_thread(synth._finish_audio, data, sr)
+
+        except Exception as e:
+            print(f"❌ APIエラー (この行をスキップ): {e}")
+            return None
+
+    async def synthesize_stream(self, text, on_block):
+        """
+        AivisSynthesizer.synthesize_stream の asyncio 版。
+        届いた分のデコードはスレッドで行い、on_block(block, sr) はループ上で呼ぶ
+        """
+        synth = self.synth
+        try:
+            speaker_id = cfg["speaker_id"]
+            synth_params = synth._current_params()
+
+            cache_key = await asyncio.to_thread(
+                synth._cache_key, text, speaker_id, synth_params
+            )
+            cached = await asyncio.to_thread(synth._cache_lookup, cache_key, text)
+            if cached is not None:
+                on_block(*cached)
+                return cached
+
+            started = time.perf_counter()
+            query = await self._get_audio_query(text, speaker_id)
+            query.update(synth_params)
+
+            line = LineStreamDecoder(synth.output_sr, synth.output_channels)
+
+            async def on_chunk(chunk):
+                for block in await asyncio.to_thread(line.feed, chunk):
+                    on_block(block, line.out_sr)
+
+            await self._request(
+                "POST",
+                "/synthesis",
+                timeout=(2, synth._synthesis_timeout(text)),
+                on_chunk=on_chunk,
+                params={"speaker": speaker_id},
+                json=query,
+                headers={"Accept": "audio/wav"},
+            )
+            for block in await asyncio.to_thread(line.finish):
+                on_block(block, line.out_sr)
+            synth._record_latency(text, time.perf_counter() - started)
 
-            lines = [line.strip() for line in cleaned_text.splitlines() if line.strip()]
+            data, sr = await asyncio.to_thread(line.raw)
+            await asyncio.to_thread(synth._cache_store, cache_key, data, sr)
+            return await asyncio.to_thread(line.audio)
 
-            total_len = sum(len(line) for line in lines)
-            if total_len < cfg["min_length"]:
+        except Exception as e:
+            print(f"❌ APIエラー (この行をスキップ): {e}")
+            return None
+
+    async def synthesize_batch(self, lines):
+        """AivisSynthesizer.synthesize_batch の asyncio 版"""
+        synth = self.synth
+        if len(lines) <= 1 or not synth.multi_synthesis_supported:
+            return list(await asyncio.gather(*(self.synthesize(x) for x in lines)))
+
+        try:
+            speaker_id = cfg["speaker_id"]
+            synth_params = synth._current_params()
+
+            results: list = [None] * len(lines)
+            cache_keys = []
+            missing = []
+            for i, line in enumerate(lines):
+                key = await asyncio.to_thread(
+                    synth._cache_key, line, speaker_id, synth_params
+                )
+                cache_keys.append(key)
+                results[i] = await asyncio.to_thread(synth._cache_lookup, key, line)
+                if results[i] is None:
+                    missing.append(i)
+
+            if not missing:
+                return results
+
+            joined_text = "".join(lines[i] for i in missing)
+            started = time.perf_counter()
+            queries = await asyncio.gather(
+                *(self._get_audio_query(lines[i], speaker_id) for i in missing)
+            )
+            for query in queries:
+                query.update(synth_params)
+
+            body = await self._request(
+                "POST",
+                "/multi_synthesis",
+                timeout=(2, synth._synthesis_timeout(joined_text)),
+                params={"speaker": speaker_id},
+                json=queries,
+                headers={"Accept": "application/zip"},
+            )
+            synth._record_latency(joined_text, time.perf_counter() - started)
+
+            decoded = await asyncio.to_thread(
+                synth._unpack_multi_synthesis, body, len(missing)
+            )
+            for i, (data, sr) in zip(missing, decoded):
+                await asyncio.to_thread(synth._cache_store, cache_keys[i], data, sr)
+                results[i] = await asyncio.to_thread(synth._finish_audio, data, sr)
+
+            return results
+
+        except aiohttp.ClientResponseError as e:
+            if e.status in (404, 405, 501):
+                print("ℹ️ /multi_synthesis 非対応のエンジンです。行ごとに合成します。")
+                synth.multi_synthesis_supported = False
+            else:
+                print(f"⚠️ まとめて合成に失敗したため行ごとに合成します: {e}")
+        except Exception as e:
+            print(f"⚠️ まとめて合成に失敗したため行ごとに合成します: {e}")
+
+        return list(await asyncio.gather(*(self.synthesize(x) for x in lines)))
+
+
+class AsyncTaskManager(TaskManager):
+    """
+    TaskManager の asyncio 版。
+    1本のイベントループで複数の合成リクエストを並行に扱い (行ごとのスレッド不要)、
+    停止・スキップ時は通信中のリクエストもその場で取り消す。
+    ファイルの準備 (目録の予約など) やデコードはスレッドに逃がし、
+    ループ上の他のリクエストを止めない。
+    """
+
+    def _start_worker(self):
+        self.async_synth = AsyncAivisSynthesizer(self.synth)
+        self.loop = asyncio.new_event_loop()
+        self._current_task = None
+
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        while True:
+            raw_text = self.task_queue.get()
+            if self.closed:
                 self.task_queue.task_done()
                 continue
+            self._idle.clear()
+            self.stop_current_flag = False
 
-            print(f"🎤 合成開始: {len(lines)}行 (Queue: {self.task_queue.qsize()})")
+            self._current_task = self.loop.create_task(self._process(raw_text))
+            try:
+                self.loop.run_until_complete(self._current_task)
+            except asyncio.CancelledError:
+                print("⛔ タスク中断")
+            except Exception as e:
+                print(f"❌ Worker Error: {e}")
+            finally:
+                self._current_task = None
+                self._idle.set()
+                self.task_queue.task_done()
 
-            audio_segments = []
-            sample_rate = 0
+    async def _synthesize_group(self, group, first_index, total, semaphore, blocks):
+        """
+        1件ぶんを合成する。blocks (asyncio.Queue) を渡した長い行はストリーミング
+        合成し、届いたブロックを流して最後に None を入れる
+        """
+        async with semaphore:
+            if len(group) == 1:
+                print(f"  ├ 合成中 ({first_index + 1}/{total}): {group[0][:20]}...")
+                if blocks is None:
+                    return [await self.async_synth.synthesize(group[0])]
+                try:
+                    return [
+                        await self.async_synth.synthesize_stream(
+                            group[0], lambda block, sr: blocks.put_nowait((block, sr))
+                        )
+                    ]
+                finally:
+                    blocks.put_nowait(None)
 
-            for i, line in enumerate(lines):
-                if self.stop_current_flag:
-                    print("⛔ タスク中断")
-                    break
+            last = first_index + len(group)
+            print(
+                f"  ├ まとめて合成中 ({first_index + 1}-{last}/{total}): "
+                f"{group[0][:20]}..."
+            )
+            return await self.async_synth.synthesize_batch(group)
+
+    async def _process(self, raw_text):
+        prepared = self._prepare_task(raw_text)
+        if prepared is None:
+            return
+
+        cleaned_text, lines = prepared
+        if await asyncio.to_thread(self._replay_saved, cleaned_text):
+            return
+        state = self._new_task_state(cleaned_text, lines)
+
+        # 同時に投げる合成数を pipeline_depth に制限する (取得は先着順)
+        semaphore = asyncio.Semaphore(self.pipeline_depth)
+        stream_min = int(cfg.get("streaming_min_chars", 60))
+        tasks = []
+        first_index = 0
+        for group in self._group_lines(lines, first_alone=True):
+            blocks = None
+            if len(group) == 1 and stream_min > 0 and len(group[0]) >= stream_min:
+                blocks = asyncio.Queue()
+            task = asyncio.ensure_future(
+                self._synthesize_group(
+                    group, first_index, len(lines), semaphore, blocks
+                )
+            )
+            tasks.append((task, blocks))
+            first_index += len(group)
 
-                print(f"  ├ 合成中 ({i + 1}/{len(lines)}): {line[:20]}...")
+        try:
+            for task, blocks in tasks:
+                if blocks is not None:
+                    await self._play_blocks(state, blocks)
+                for res in await task:
+                    await self._consume_async(state, res, blocks is not None)
+        except asyncio.CancelledError:
+            # 中断時は書きかけの保存ファイルを残さない
+            if state["archive"] is not None:
+                state["archive"].discard()
+            raise
+        finally:
+            for task, _ in tasks:
+                task.cancel()
+
+        # 保存ファイルの確定・save_log (目録の予約) はループの外で行う
+        await asyncio.to_thread(self._finish_task, cleaned_text, state)
+
+    async def _play_blocks(self, state, blocks):
+        """ストリーミング中の行は、届いたブロックをその場でつないで再生キューに送る"""
+        new_line = True
+        while True:
+            item = await blocks.get()
+            if item is None:
+                return
+            block, sr = item
+            await self._play_async(state, state["assembler"].add(block, sr, new_line))
+            new_line = False
+
+    async def _consume_async(self, state, res, already_enqueued):
+        """_consume_result の asyncio 版"""
+        if not res or already_enqueued:
+            return
+        data, sr = res
+        await self._play_async(state, state["assembler"].add(data, sr))
+
+    async def _play_async(self, state, audio):
+        """_play と同じ。ただし保存ファイルを開く処理はスレッドで行う"""
+        if (
+            len(audio) > 0
+            and state["streaming"]
+            and state["archive"] is None
+            and not self.closed
+        ):
+            await asyncio.to_thread(self._open_archive, state)
+        self._play(state, audio)
+
+    def _cancel_current(self):
+        # 呼び出し時点のタスクだけを取り消す (次のタスクを巻き込まない)
+        task = self._current_task
+        if task is not None:
+            self.loop.call_soon_threadsafe(task.cancel)
 
-                res = self.synth.synthesize(line)
-                if not res:
-                    continue
+    def force_stop(self):
+        self._cancel_current()
+        super().force_stop()
 
-                data, sr = res
-                sample_rate = sr
+    def skip_current(self):
+        self._cancel_current()
+        super().skip_current()
 
-                self.player.enqueue(data, sr)
-                audio_segments.append(data)
+    def close(self, timeout=2.0):
+        self._cancel_current()
+        super().close(timeout)
 
-            if audio_segments and not self.stop_current_flag:
-                full_audio = np.concatenate(audio_segments)
-                self.synth.save_log(full_audio, sample_rate, cleaned_text)
 
-            self.task_queue.task_done()
+def create_task_manager(synth, player):
+    """設定 (engine_mode) に応じてスレッド版か asyncio 版の TaskManager を作る"""
+    mode = cfg.get("engine_mode", "thread")
+    if mode == "asyncio":
+        if HAS_AIOHTTP:
+            print("⚡ asyncio エンジンで動作します。")
+            return AsyncTaskManager(synth, player)
+        print(
+            "⚠️ aiohttp が無いため asyncio エンジンは使えません。スレッド版で動作します。"
+        )
+    return TaskManager(synth, player)
 
 
 # ─── メインループ ──────────────────────────
 
-# ─── メインループ ──────────────────────────
+
+def run_archive_command(args):
+    """--search / --reindex: 保存した読み上げの索引を扱って終了する"""
+    synth = AivisSynthesizer()
+    try:
+        if synth.archive_index is None:
+            print(
+                "❌ エラー: 索引が使えません (設定 archive_index を確認してください)。"
+            )
+            return
+
+        if args.reindex:
+            print(f"🔎 索引を更新しています: {synth.archive_root()}")
+            added, removed = synth.reindex_archive()
+            print(
+                f"✅ 索引の更新完了: 追加・更新 {added}件 / 削除 {removed}件 "
+                f"(合計 {synth.archive_index.count()}件)"
+            )
+
+        if args.search is not None:
+            results = synth.search_archive(args.search, day=args.search_date)
+            if not results:
+                print(f"🔎 「{args.search}」を含む読み上げは見つかりませんでした。")
+            for record in results:
+                print(f"📄 {record['day']}/ No.{record['track']} - {record['path']}")
+                print(f"    {record['text'][:80]}")
+    finally:
+        synth.shutdown()
 
 
 def run_cli():
@@ -625,7 +2494,7 @@ def run_cli():
         "-f",
         "--flac",
         action="store_true",
-        help="強制的にFLAC形式で保存します (FFmpegがある場合でも)",
+        help="強制的にFLAC形式で保存します (Opusが使える場合でも)",
     )
     # ★追加: 日付上書きオプション
     parser.add_argument(
@@ -634,8 +2503,29 @@ def run_cli():
         type=str,
         help="保存時の日付を強制的に指定します (形式: YYMMDD, 例: 251206)",
     )
+    # ★追加: 保存した読み上げの検索・索引の作り直し
+    parser.add_argument(
+        "-s",
+        "--search",
+        type=str,
+        help="読み上げた文章を含む保存ファイルを検索して終了します",
+    )
+    parser.add_argument(
+        "--search-date",
+        type=str,
+        help="検索を日付で絞り込みます (YYMMDD の前方一致, 例: 2512 で2025年12月)",
+    )
+    parser.add_argument(
+        "--reindex",
+        action="store_true",
+        help="保存フォルダの既存ファイルを検索用の索引に取り込みます",
+    )
     args = parser.parse_args()
 
+    if args.search is not None or args.reindex:
+        run_archive_command(args)
+        return
+
     # 日付オプションのバリデーション
     if args.date:
         if not re.match(r"^\d{6}$", args.date):
@@ -649,7 +2539,8 @@ def run_cli():
     # インスタンス生成
     player = AudioPlayer()
     synth = AivisSynthesizer()
-    manager = TaskManager(synth, player)
+    manager = create_task_manager(synth, player)
+    synth.start_tiering(manager.is_busy)
 
     # ホットキー関数 (クロージャとして定義)
     def on_stop_hotkey():
@@ -677,15 +2568,13 @@ def run_cli():
 
     print(f"✨ AivisSpeech Clipboard Reader v{__version__}")
 
-    if HAS_FFMPEG:
-        if synth.force_flac:
-            print(
-                "🔧 FFmpeg検出済みですが、設定またはオプションによりFLAC保存を行います。"
-            )
-        else:
-            print("🔧 FFmpeg検出: Opus形式での保存を有効化します。")
+    encoder = synth.select_encoder()
+    if synth.force_flac:
+        print("🔧 設定またはオプションによりFLAC保存を行います。")
+    elif encoder.ext == ".opus":
+        print(f"🔧 Opus形式での保存を有効化します (エンコーダ: {encoder.name})。")
     else:
-        print("ℹ️ FFmpeg未検出: FLAC形式で保存します。")
+        print("ℹ️ Opusエンコーダ (libsndfile / FFmpeg) 未検出: FLAC形式で保存します。")
 
     if not synth.check_connection():
         print(
@@ -725,6 +2614,9 @@ def run_cli():
 
     except KeyboardInterrupt:
         print("\n👋 終了します")
+        # ★追加: 書きかけの保存ファイルを破棄し、保存待ちを書き出してから終了する
+        manager.close()
+        synth.shutdown()
         sys.exit(0)
 
 
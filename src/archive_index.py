@@ -0,0 +1,301 @@
+"""読み上げた文章から保存ファイルを探すための索引 (SQLite FTS5)"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from archive_manifest import (
+    AUDIO_EXTS,
+    DAY_DIR_PATTERN,
+    MANIFEST_NAME,
+    DayManifest,
+    read_tags,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    day TEXT,
+    track INTEGER,
+    text TEXT NOT NULL,
+    speaker_id INTEGER,
+    params TEXT,
+    duration REAL,
+    saved_at TEXT,
+    mtime REAL,
+    source TEXT NOT NULL,
+    engine_version TEXT
+);
+CREATE INDEX IF NOT EXISTS recordings_lookup
+    ON recordings (text, speaker_id, params);
+"""
+
+# 日本語は単語で区切れないので、3文字ずつの trigram で索引を作る
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS recordings_fts USING fts5(
+    text, content='recordings', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS recordings_ai AFTER INSERT ON recordings BEGIN
+    INSERT INTO recordings_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS recordings_ad AFTER DELETE ON recordings BEGIN
+    INSERT INTO recordings_fts (recordings_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS recordings_au AFTER UPDATE ON recordings BEGIN
+    INSERT INTO recordings_fts (recordings_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    INSERT INTO recordings_fts (rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+_COLUMNS = "path, day, track, text, speaker_id, params, duration, saved_at, source"
+
+
+def _params_key(params):
+    """合成パラメータを比較できる文字列にする"""
+    if params is None:
+        return None
+    return json.dumps(params, sort_keys=True)
+
+
+class ArchiveIndex:
+    """
+    保存したファイルの全文・日付・話者・合成パラメータの索引。
+    保存が完了した時点で add() し、既存のファイルは backfill() で取り込む。
+    FTS5 (trigram) が使えない SQLite では LIKE による検索になる。
+    保存スレッドと読み上げスレッドの両方から使うので、接続はロックで守る。
+    """
+
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            # 古い索引には engine_version の列が無いので足す
+            columns = {
+                row["name"]
+                for row in self._conn.execute("PRAGMA table_info(recordings)")
+            }
+            if "engine_version" not in columns:
+                self._conn.execute(
+                    "ALTER TABLE recordings ADD COLUMN engine_version TEXT"
+                )
+        try:
+            with self._conn:
+                self._conn.executescript(_FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ─── 登録 ────────────────
+    def add(
+        self,
+        path,
+        text,
+        day=None,
+        track=None,
+        speaker_id=None,
+        params=None,
+        duration=None,
+        saved_at=None,
+        source="save",
+        engine_version=None,
+    ):
+        """保存したファイルを登録する (同じパスなら上書き)"""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"""
+                INSERT INTO recordings ({_COLUMNS}, mtime, engine_version)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (path) DO UPDATE SET
+                    day = excluded.day, track = excluded.track,
+                    text = excluded.text, speaker_id = excluded.speaker_id,
+                    params = excluded.params, duration = excluded.duration,
+                    saved_at = excluded.saved_at, source = excluded.source,
+                    mtime = excluded.mtime, engine_version = excluded.engine_version
+                """,
+                (
+                    os.path.abspath(path),
+                    day,
+                    track,
+                    text,
+                    speaker_id,
+                    _params_key(params),
+                    duration,
+                    saved_at,
+                    source,
+                    mtime,
+                    engine_version,
+                ),
+            )
+
+    def remove(self, path):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM recordings WHERE path = ?", (os.path.abspath(path),)
+            )
+
+    def rename(self, old_path, new_path):
+        """ファイルの置き換え (形式の変換など) に合わせて登録を移す"""
+        try:
+            mtime = os.path.getmtime(new_path)
+        except OSError:
+            mtime = None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE recordings SET path = ?, mtime = ? WHERE path = ?",
+                (os.path.abspath(new_path), mtime, os.path.abspath(old_path)),
+            )
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM recordings").fetchone()[0]
+
+    # ─── 検索 ────────────────
+    def search(self, query, limit=20, day=None):
+        """
+        query を含む読み上げを新しい順に返す (dict のリスト)。
+        day を指定すると、その日付 (前方一致: "2401" なら 2024年1月) に絞る
+        """
+        query = query.strip()
+        conditions = []
+        args: list = []
+        if day:
+            conditions.append("r.day LIKE ?")
+            args.append(day + "%")
+
+        # trigram は3文字未満の語を引けないので、短い語は LIKE で探す
+        if self.has_fts and len(query) >= 3:
+            source = "recordings_fts f JOIN recordings r ON r.id = f.rowid"
+            conditions.insert(0, "recordings_fts MATCH ?")
+            args.insert(0, '"' + query.replace('"', '""') + '"')
+        else:
+            source = "recordings r"
+            if query:
+                conditions.insert(0, "r.text LIKE ? ESCAPE '\\'")
+                args.insert(0, "%" + re.sub(r"([%_\\])", r"\\\1", query) + "%")
+
+        where = " AND ".join(conditions) or "1"
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT r.path, r.day, r.track, r.text, r.speaker_id, r.params,
+                       r.duration, r.saved_at, r.source
+                FROM {source} WHERE {where}
+                ORDER BY r.day DESC, r.track DESC LIMIT ?
+                """,
+                (*args, int(limit)),
+            ).fetchall()
+
+        results = []
+        for row in rows:
+            record = dict(row)
+            record["params"] = json.loads(row["params"]) if row["params"] else None
+            results.append(record)
+        return results
+
+    def find_audio(self, text, speaker_id, params, engine_version):
+        """
+        同じ文章・話者・合成パラメータ・エンジンのバージョンで保存したファイルの
+        パス (無ければ None)。
+        backfill で取り込んだものは本文が正確でないので対象にしない
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT path FROM recordings
+                WHERE text = ? AND speaker_id = ? AND params = ?
+                    AND engine_version = ? AND source = 'save'
+                ORDER BY saved_at DESC
+                """,
+                (text, speaker_id, _params_key(params), engine_version),
+            ).fetchall()
+        for row in rows:
+            if os.path.exists(row["path"]):
+                return row["path"]
+        return None
+
+    # ─── 既存ファイルの取り込み ────────────────
+    def backfill(self, archive_root):
+        """
+        保存フォルダ (archive_root/<yymmdd>/) のファイルを索引に取り込む。
+        本文はタイトルタグ、パラメータ・長さは目録があれば目録から取る。
+        登録済みのファイルは更新されていなければ読み直さず、消えたファイルは外す。
+        戻り値は (追加・更新した件数, 外した件数)
+        """
+        with self._lock:
+            known = {
+                row["path"]: (row["mtime"], row["source"])
+                for row in self._conn.execute(
+                    "SELECT path, mtime, source FROM recordings"
+                )
+            }
+
+        added = 0
+        seen = set()
+        try:
+            days = sorted(os.listdir(archive_root))
+        except OSError:
+            days = []
+        for day in days:
+            day_dir = os.path.join(archive_root, day)
+            if not (DAY_DIR_PATTERN.fullmatch(day) and os.path.isdir(day_dir)):
+                continue
+
+            manifest = {}
+            if os.path.exists(os.path.join(day_dir, MANIFEST_NAME)):
+                manifest = {
+                    record.get("filename"): record
+                    for record in DayManifest(day_dir).records()
+                }
+
+            for name in sorted(os.listdir(day_dir)):
+                if not name.endswith(AUDIO_EXTS):
+                    continue
+                path = os.path.abspath(os.path.join(day_dir, name))
+                seen.add(path)
+                if path in known:
+                    mtime, source = known[path]
+                    # 保存時に登録したもの (本文が正確) はそのまま使う
+                    if source == "save" or mtime == os.path.getmtime(path):
+                        continue
+
+                track, title, duration = read_tags(path)
+                record = manifest.get(name, {})
+                params = dict(record.get("params") or {}) or None
+                speaker_id = params.pop("speaker_id", None) if params else None
+                self.add(
+                    path,
+                    title or "",
+                    day=day,
+                    track=track or record.get("track"),
+                    speaker_id=speaker_id,
+                    params=params,
+                    duration=duration or record.get("duration"),
+                    saved_at=record.get("timestamp"),
+                    source="backfill",
+                )
+                added += 1
+
+        # 保存フォルダから消えたファイルを外す
+        root = os.path.abspath(archive_root) + os.sep
+        removed = [p for p in known if p.startswith(root) and p not in seen]
+        for path in removed:
+            self.remove(path)
+        return added, len(removed)
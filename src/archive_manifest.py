@@ -0,0 +1,265 @@
+"""日ごとの保存フォルダの目録 (トラック番号・ファイル名など) を管理する"""
+
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+# タグ読み取り用 (あれば使う)
+try:
+    from mutagen import File as MutagenFile
+
+    HAS_MUTAGEN = True
+except ImportError:
+    HAS_MUTAGEN = False
+
+AUDIO_EXTS = (".flac", ".ogg", ".opus")
+# 日ごとの保存フォルダの名前 (yymmdd)
+DAY_DIR_PATTERN = re.compile(r"\d{6}")
+MANIFEST_NAME = ".manifest.jsonl"
+
+# 番号を使ったままにしない状態 (最後の番号なら次の保存で使い直す)
+RELEASED_STATUSES = ("discarded", "failed")
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def read_tags(path):
+    """ファイルのトラック番号・タイトル・長さ (読めなければ None)"""
+    if not HAS_MUTAGEN:
+        return None, None, None
+    try:
+        audio = MutagenFile(path)
+    except Exception:
+        return None, None, None
+    if audio is None:
+        return None, None, None
+
+    def first(key):
+        value = audio.get(key)
+        return value[0] if isinstance(value, list) and value else None
+
+    try:
+        track = int(str(first("tracknumber")).split("/")[0])
+    except ValueError:
+        track = None
+    length = getattr(audio.info, "length", None)
+    return track, first("title"), round(length, 3) if length else None
+
+
+class DayManifest:
+    """
+    1日ぶんの保存フォルダの目録 (JSON Lines, 追記のみ)。
+    1行が1件の記録で、同じトラック番号は後の行で上書きされる。
+    reserve() でトラック番号を確保し、保存の結果を finish() で記録する。
+    同じフォルダを複数のプロセスが使っても番号が重ならないよう、
+    確保はロックファイルで排他し、他のプロセスが追記した分を読み込んでから行う。
+    目録が無いフォルダでは、既存のファイルから作り直す。
+    """
+
+    LOCK_TIMEOUT = 10.0
+
+    def __init__(self, day_dir):
+        self.day_dir = day_dir
+        self.path = os.path.join(day_dir, MANIFEST_NAME)
+        self._lock_path = self.path + ".lock"
+        self._lock = threading.Lock()
+        self._records: dict = {}
+        self._offset = 0
+        # 読んでいるファイルの識別 (別のインスタンスが書き直すと変わる)
+        self._file_id = None
+        self._loaded = False
+
+    # ─── 読み込み ────────────────
+    @staticmethod
+    def _identify(stat):
+        return (stat.st_dev, stat.st_ino)
+
+    def _read_new(self):
+        """前回読んだ位置より後ろに追記された行を取り込む"""
+        try:
+            with open(self.path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                file_id = self._identify(stat)
+                if file_id != self._file_id or stat.st_size < self._offset:
+                    # 作り直し・番号の振り直しで置き換えられたので最初から読み直す
+                    self._records = {}
+                    self._offset = 0
+                    self._file_id = file_id
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # 書きかけの最終行は次回に回す
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+                self._records[int(record["track"])] = record
+            except (ValueError, KeyError, TypeError):
+                continue
+        self._offset += end
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            self._read_new()
+            return
+        self._loaded = True
+        if os.path.exists(self.path):
+            self._read_new()
+        else:
+            self._rebuild_unlocked()
+
+    # ─── 排他 ────────────────
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """スレッド間・プロセス間で目録の更新を排他する"""
+        with self._lock:
+            deadline = time.monotonic() + self.LOCK_TIMEOUT
+            while True:
+                try:
+                    fd = os.open(self._lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                    break
+                except FileExistsError:
+                    if time.monotonic() > deadline:
+                        # 異常終了したプロセスのロックが残っているとみなす
+                        print(f"⚠️ 目録のロックを解除します: {self._lock_path}")
+                        with contextlib.suppress(OSError):
+                            os.remove(self._lock_path)
+                        deadline = time.monotonic() + self.LOCK_TIMEOUT
+                    time.sleep(0.01)
+            try:
+                os.close(fd)
+                yield
+            finally:
+                with contextlib.suppress(OSError):
+                    os.remove(self._lock_path)
+
+    def _append(self, record):
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with open(self.path, "ab") as f:
+            if f.tell() != self._offset:
+                # 異常終了で書きかけの行が残っている場合は行を改めて書く
+                line = b"\n" + line
+            f.write(line)
+            self._offset = f.tell()
+            self._file_id = self._identify(os.fstat(f.fileno()))
+        self._records[int(record["track"])] = record
+
+    # ─── 番号の確保・記録 ────────────────
+    def _next_track(self):
+        used = [
+            track
+            for track, record in self._records.items()
+            if record.get("status") not in RELEASED_STATUSES
+        ]
+        return max(used, default=0) + 1
+
+    def reserve(self, filename, text="", duration=None, params=None):
+        """次のトラック番号を確保して返す"""
+        with self._exclusive():
+            self._ensure_loaded()
+            track = self._next_track()
+            self._append(
+                {
+                    "track": track,
+                    "filename": filename,
+                    "text_hash": text_hash(text) if text else None,
+                    "duration": duration,
+                    "params": params,
+                    "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "status": "reserved",
+                }
+            )
+            return track
+
+    def finish(self, track, status, **fields):
+        """保存の結果 ("saved" / "failed" / "discarded") と長さなどを記録する"""
+        with self._exclusive():
+            self._ensure_loaded()
+            record = dict(self._records.get(track, {"track": track}))
+            record.update(fields, status=status)
+            self._append(record)
+
+    def records(self):
+        """トラック番号順の最新の記録"""
+        with self._exclusive():
+            self._ensure_loaded()
+            return [self._records[t] for t in sorted(self._records)]
+
+    # ─── 作り直し ────────────────
+    def _rebuild_unlocked(self):
+        files = sorted(
+            name for name in os.listdir(self.day_dir) if name.endswith(AUDIO_EXTS)
+        )
+        records = {}
+        next_free = 1
+        for name in files:
+            track, title, duration = read_tags(os.path.join(self.day_dir, name))
+            if track is None or track in records:
+                # タグが無い・重複している場合はファイル名 (時刻) 順で空き番号を振る
+                while next_free in records:
+                    next_free += 1
+                track = next_free
+            mtime = os.path.getmtime(os.path.join(self.day_dir, name))
+            records[track] = {
+                "track": track,
+                "filename": name,
+                "text_hash": None,
+                "title": title,
+                "duration": duration,
+                "params": None,
+                "timestamp": datetime.datetime.fromtimestamp(mtime).isoformat(
+                    timespec="seconds"
+                ),
+                "status": "saved",
+                "rebuilt": True,
+            }
+
+        self._write_all(records)
+        if records:
+            print(f"🗂️ 目録を作り直しました: {self.day_dir} ({len(records)}件)")
+
+    def _write_all(self, records):
+        """目録全体を書き直す (書きかけの状態が残らないよう一時ファイル経由)"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for track in sorted(records):
+                f.write(json.dumps(records[track], ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+
+        stat = os.stat(self.path)
+        self._records = records
+        self._offset = stat.st_size
+        self._file_id = self._identify(stat)
+
+    def rebuild(self):
+        """フォルダ内のファイルから目録を作り直す (目録が壊れた・消えた場合)"""
+        with self._exclusive():
+            self._loaded = True
+            self._rebuild_unlocked()
+
+    def renumber(self, tracks):
+        """
+        {ファイル名: 新しいトラック番号} のとおりに目録を書き直す (一括タグ書き換え用)。
+        記録の無いファイルは保存済みとして加え、tracks に無いファイルの記録は外す
+        """
+        with self._exclusive():
+            self._ensure_loaded()
+            by_name = {
+                record.get("filename"): record
+                for record in self._records.values()
+                if record.get("status") not in RELEASED_STATUSES
+            }
+            records = {}
+            for name, track in tracks.items():
+                record = dict(by_name.get(name, {"filename": name, "status": "saved"}))
+                record["track"] = track
+                records[track] = record
+            self._write_all(records)
@@ -0,0 +1,188 @@
+"""保存フォルダのタグ (アーティスト・アルバム・カバー画像・トラック番号) を一括で書き換える"""
+
+import collections
+import concurrent.futures
+import os
+import time
+
+from archive_manifest import AUDIO_EXTS, DAY_DIR_PATTERN, DayManifest
+from artwork_cache import ArtworkCache
+
+# タグ編集用 (あれば使う)
+try:
+    from mutagen import File as MutagenFile
+
+    HAS_MUTAGEN = True
+except ImportError:
+    HAS_MUTAGEN = False
+
+
+# 作業プロセスごとのカバー画像 (初期化時に設定し、以降は変換済みのものを使い回す)
+_artwork_cache = None
+_artwork_path = None
+
+
+def plan_retag(root, artist=None, album_prefix=None, renumber=False):
+    """
+    root 以下 (サブフォルダを含む) のファイルごとに、付けるべきタグを決める。
+    アルバム名とトラック番号は日付フォルダ (yymmdd) の中のファイルだけが対象で、
+    トラック番号はファイル名 (保存時刻) 順に 1 から振り直す。
+    戻り値は (パス, {タグ: 値}) のリスト
+    """
+    jobs = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        day = os.path.basename(dirpath)
+        is_day_dir = DAY_DIR_PATTERN.fullmatch(day) is not None
+        files = sorted(name for name in filenames if name.endswith(AUDIO_EXTS))
+        for number, name in enumerate(files, 1):
+            tags = {}
+            if artist:
+                tags["artist"] = artist
+            if album_prefix and is_day_dir:
+                tags["album"] = f"{album_prefix}_{day}"
+            if renumber and is_day_dir:
+                tags["tracknumber"] = str(number)
+            jobs.append((os.path.join(dirpath, name), tags))
+    return jobs
+
+
+def init_worker(artwork_path=None, artwork_max_px=0, artwork_quality=90):
+    """作業プロセスの初期化 (カバー画像を使う場合は変換済みのものを持っておく)"""
+    global _artwork_cache, _artwork_path
+    _artwork_path = artwork_path
+    _artwork_cache = ArtworkCache(artwork_max_px, artwork_quality)
+
+
+def _has_artwork(audio, artwork):
+    """すでに同じカバー画像が入っているか"""
+    if hasattr(audio, "add_picture"):
+        # FLAC: 画像ブロック
+        pictures = audio.pictures
+        return len(pictures) == 1 and pictures[0].data == artwork.data
+    # Opus (Ogg): METADATA_BLOCK_PICTURE タグ
+    return audio.get("metadata_block_picture") == [artwork.block_base64]
+
+
+def _set_artwork(audio, artwork):
+    if hasattr(audio, "add_picture"):
+        audio.clear_pictures()
+        audio.add_picture(artwork.picture)
+    else:
+        audio["METADATA_BLOCK_PICTURE"] = [artwork.block_base64]
+
+
+def retag_file(path, tags, dry_run=False):
+    """
+    1ファイルのタグを書き換える。すでに同じ値ならファイルには触れない。
+    戻り値は (パス, "updated" / "unchanged" / "failed", 変更した項目 or エラー内容)
+    """
+    try:
+        audio = MutagenFile(path)
+        if audio is None:
+            return path, "failed", "mutagen が形式を認識できません"
+
+        changed = []
+        if audio.tags is None:
+            audio.add_tags()
+        for key, value in tags.items():
+            if audio.get(key) != [value]:
+                changed.append(key)
+                audio[key] = [value]
+
+        artwork = _artwork_cache.get(_artwork_path) if _artwork_cache else None
+        if artwork is not None and not _has_artwork(audio, artwork):
+            changed.append("artwork")
+            _set_artwork(audio, artwork)
+
+        if not changed:
+            return path, "unchanged", []
+        if not dry_run:
+            audio.save()
+        return path, "updated", changed
+
+    except Exception as e:
+        return path, "failed", str(e)
+
+
+def _retag_chunk(jobs, dry_run):
+    return [retag_file(path, tags, dry_run) for path, tags in jobs]
+
+
+def _update_manifests(jobs, failed):
+    """
+    トラック番号を振り直したフォルダの目録を新しい番号に合わせる。
+    書き換えに失敗したファイルがあるフォルダは、そのファイルのタグが古い番号の
+    ままで新しい番号と重なりうるので、目録を書き直さない (次回の実行で揃える)
+    """
+    tracks_by_dir: dict = collections.defaultdict(dict)
+    skipped = set()
+    for path, tags in jobs:
+        if "tracknumber" not in tags:
+            continue
+        day_dir, name = os.path.split(path)
+        if path in failed:
+            skipped.add(day_dir)
+        tracks_by_dir[day_dir][name] = int(tags["tracknumber"])
+    for day_dir, tracks in tracks_by_dir.items():
+        if day_dir in skipped:
+            print(
+                f"⚠️ 書き換えに失敗したファイルがあるため目録は更新しません: {day_dir}"
+            )
+            continue
+        DayManifest(day_dir).renumber(tracks)
+
+
+def run_retag(
+    jobs,
+    artwork_path=None,
+    workers=None,
+    dry_run=False,
+    artwork_max_px=0,
+    artwork_quality=90,
+    on_result=None,
+):
+    """
+    jobs (plan_retag の結果) をプロセスプールで処理する。workers=1 ならこのプロセスで行う。
+    ファイルは数十件ずつまとめて作業プロセスに渡す (1件ずつだと受け渡しの方が重い)。
+    on_result(path, status, detail) を1件ごとに呼ぶ。戻り値は件数などの集計
+    """
+    if not HAS_MUTAGEN:
+        raise RuntimeError("mutagen がインストールされていません")
+
+    started = time.perf_counter()
+    summary: dict = {"files": len(jobs), "updated": 0, "unchanged": 0, "failed": 0}
+    changes: collections.Counter = collections.Counter()
+    failed = set()
+
+    def collect(results):
+        for path, status, detail in results:
+            summary[status] += 1
+            if status == "updated":
+                changes.update(detail)
+            elif status == "failed":
+                failed.add(path)
+            if on_result is not None:
+                on_result(path, status, detail)
+
+    workers = workers or os.cpu_count() or 1
+    init_args = (artwork_path, artwork_max_px, artwork_quality)
+    if workers == 1 or len(jobs) <= 1:
+        init_worker(*init_args)
+        collect(_retag_chunk(jobs, dry_run))
+    else:
+        chunk = max(1, min(64, len(jobs) // (workers * 4)))
+        chunks = [jobs[i : i + chunk] for i in range(0, len(jobs), chunk)]
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=init_worker, initargs=init_args
+        ) as executor:
+            futures = [executor.submit(_retag_chunk, c, dry_run) for c in chunks]
+            for future in concurrent.futures.as_completed(futures):
+                collect(future.result())
+
+    if not dry_run:
+        _update_manifests(jobs, failed)
+
+    summary["changes"] = dict(changes)
+    summary["elapsed_sec"] = time.perf_counter() - started
+    return summary
@@ -0,0 +1,294 @@
+"""古い日付フォルダの FLAC を Opus に変換して、保存フォルダの容量を抑える"""
+
+import base64
+import datetime
+import os
+import shutil
+import threading
+import time
+
+import soundfile as sf
+
+from archive_manifest import DAY_DIR_PATTERN, MANIFEST_NAME, DayManifest
+from archive_verify import decode_frames, ogg_finished
+
+# タグのコピー用 (あれば使う)
+try:
+    from mutagen import File as MutagenFile
+
+    HAS_MUTAGEN = True
+except ImportError:
+    HAS_MUTAGEN = False
+
+# 変換中のファイルを置く場所 (日付フォルダの中。保存ファイルとしては数えられない)
+WORK_DIR_NAME = ".tiering"
+_READ_BLOCK = 65536
+# 変換前後の長さの許容差 (秒)。Opus の先頭の捨てサンプルやリサンプルの端の分
+LENGTH_TOLERANCE_SEC = 0.1
+# 目録の tiering の値: Opus にしても小さくならないので FLAC のまま残した
+KEPT_FLAC = "kept_flac"
+
+
+class ArchiveTiering:
+    """
+    min_age_days 日より前の日付フォルダにある FLAC を Opus に変換する。
+    変換結果はデコードして長さとタグを確かめ、元より小さい場合だけ
+    元の FLAC と置き換える。小さくならなかったファイルは目録に記録し、
+    次からは変換しない。カバー画像は artwork (ArtworkCache) の
+    max_px に合わせて縮小してから埋め込む。
+
+    読み上げを邪魔しないよう、is_busy() が True の間は (変換の途中でも) 待ち、
+    変換に使った時間のうち duty の割合しか動かない (残りは休む)。
+    on_moved(旧パス, 新パス) はファイルを置き換えるたびに呼ぶ (索引の更新用)。
+    """
+
+    def __init__(
+        self,
+        archive_root,
+        encoder,
+        min_age_days,
+        duty=0.2,
+        is_busy=None,
+        on_moved=None,
+        interval=3600.0,
+        artwork=None,
+    ):
+        self.archive_root = archive_root
+        self.encoder = encoder
+        self.min_age_days = max(1, int(min_age_days))
+        self.duty = min(1.0, max(0.01, float(duty)))
+        self.is_busy = is_busy
+        self.on_moved = on_moved
+        self.interval = interval
+        self.artwork = artwork
+        self.stats = {
+            "converted": 0,
+            "skipped": 0,
+            "failed": 0,
+            "bytes_before": 0,
+            "bytes_after": 0,
+        }
+        self._stop = threading.Event()
+        self._thread = None
+        # 読み上げ中で待った時間 (休みの長さの計算から除く)
+        self._waited = 0.0
+        # 失敗した・小さくならなかったファイルは、このプロセスの間は試し直さない
+        self._passed_over: set = set()
+
+    # ─── 対象の検索 ────────────────
+    def candidates(self, today=None):
+        """変換対象の FLAC (古い日付フォルダから順)"""
+        today = today or datetime.date.today()
+        try:
+            days = sorted(os.listdir(self.archive_root))
+        except OSError:
+            return []
+
+        paths: list = []
+        for day in days:
+            day_dir = os.path.join(self.archive_root, day)
+            if not (DAY_DIR_PATTERN.fullmatch(day) and os.path.isdir(day_dir)):
+                continue
+            try:
+                date = datetime.datetime.strptime(day, "%y%m%d").date()
+            except ValueError:
+                continue
+            if (today - date).days < self.min_age_days:
+                continue
+            names = [
+                name
+                for name in sorted(os.listdir(day_dir))
+                if name.endswith(".flac")
+                and os.path.join(day_dir, name) not in self._passed_over
+            ]
+            if names:
+                kept = self._kept_flac(day_dir)
+                paths.extend(
+                    os.path.join(day_dir, name) for name in names if name not in kept
+                )
+        return paths
+
+    @staticmethod
+    def _kept_flac(day_dir):
+        """Opus にしても小さくならないと目録に記録したファイル名"""
+        if not os.path.exists(os.path.join(day_dir, MANIFEST_NAME)):
+            return set()
+        return {
+            record.get("filename")
+            for record in DayManifest(day_dir).records()
+            if record.get("tiering") == KEPT_FLAC
+        }
+
+    # ─── 1ファイルの変換 ────────────────
+    def _encode(self, src, dst):
+        """FLAC を少しずつ読んで Opus に書き出す。戻り値は元の (フレーム数, sr)"""
+        info = sf.info(src)
+        stream = self.encoder.open(dst, info.samplerate, info.channels)
+        frames = 0
+        try:
+            for block in sf.blocks(src, blocksize=_READ_BLOCK, dtype="float32"):
+                stream.write(block)
+                frames += len(block)
+                # 長いファイルでも、読み上げが始まったらその場で待つ
+                if not self._wait_idle():
+                    raise InterruptedError("停止しました")
+        except BaseException:
+            stream.abort()
+            raise
+        stream.close()
+        return frames, info.samplerate
+
+    def _copy_tags(self, src, dst):
+        """タグとカバー画像 (縮小して METADATA_BLOCK_PICTURE として) を写す"""
+        source = MutagenFile(src)
+        target = MutagenFile(dst)
+        if source is None or target is None:
+            raise ValueError("mutagen がファイル形式を認識できません")
+        if source.tags is not None:
+            for key in set(source.tags.keys()):
+                target[key] = source[key]
+        if getattr(source, "pictures", None):
+            pictures = source.pictures
+            if self.artwork is not None:
+                pictures = [self.artwork.shrink_picture(p) for p in pictures]
+            target["METADATA_BLOCK_PICTURE"] = [
+                base64.b64encode(picture.write()).decode("ascii")
+                for picture in pictures
+            ]
+        target.save()
+        return source
+
+    def _verify(self, dst, source, frames, sr):
+        """変換結果が最後までデコードでき、長さとタグが元と同じか"""
+        if not ogg_finished(dst):
+            raise ValueError("変換結果に終端ページがありません")
+        decoded_sec = decode_frames(dst) / sf.info(dst).samplerate
+        if abs(decoded_sec - frames / sr) > LENGTH_TOLERANCE_SEC:
+            raise ValueError(
+                f"長さが違います ({decoded_sec:.2f}秒 / {frames / sr:.2f}秒)"
+            )
+        target = MutagenFile(dst)
+        for key in source.tags.keys() if source.tags is not None else []:
+            if target.get(key) != source.get(key):
+                raise ValueError(f"タグ {key} が写せていません")
+
+    def transcode(self, src):
+        """
+        1ファイルを変換し、確認できて元より小さければ元の FLAC を削除する。
+        戻り値は新しいパス (小さくならなかった場合は None で、元のまま)。
+        失敗した場合は元のファイルを残して例外を出す
+        """
+        day_dir, name = os.path.split(src)
+        work_dir = os.path.join(day_dir, WORK_DIR_NAME)
+        os.makedirs(work_dir, exist_ok=True)
+        new_name = os.path.splitext(name)[0] + self.encoder.ext
+        work_path = os.path.join(work_dir, new_name)
+        dst = os.path.join(day_dir, new_name)
+        if os.path.exists(dst):
+            raise FileExistsError(f"変換先がすでにあります: {dst}")
+
+        try:
+            frames, sr = self._encode(src, work_path)
+            source = self._copy_tags(src, work_path)
+            self._verify(work_path, source, frames, sr)
+            # カバー画像などで元より大きくなる場合は置き換えない
+            if os.path.getsize(work_path) >= os.path.getsize(src):
+                return None
+            # 更新時刻は元のファイルに合わせる (保存した日時のまま)
+            stat = os.stat(src)
+            os.utime(work_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            os.replace(work_path, dst)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        size_before = os.path.getsize(src)
+        os.remove(src)
+        self._rename_in_manifest(day_dir, name, new_name)
+
+        self.stats["converted"] += 1
+        self.stats["bytes_before"] += size_before
+        self.stats["bytes_after"] += os.path.getsize(dst)
+        if self.on_moved is not None:
+            self.on_moved(src, dst)
+        return dst
+
+    @staticmethod
+    def _rename_in_manifest(day_dir, old_name, new_name):
+        if not os.path.exists(os.path.join(day_dir, MANIFEST_NAME)):
+            return
+        ArchiveTiering._update_manifest(day_dir, old_name, filename=new_name)
+
+    @staticmethod
+    def _update_manifest(day_dir, name, **fields):
+        """目録のそのファイルの記録に fields を書き足す (目録が無ければ作り直す)"""
+        manifest = DayManifest(day_dir)
+        for record in manifest.records():
+            if record.get("filename") == name:
+                manifest.finish(record["track"], record["status"], **fields)
+
+    # ─── 間引きながらの実行 ────────────────
+    def _wait_idle(self):
+        """読み上げ・保存が終わるまで待つ。停止されたら False"""
+        started = time.perf_counter()
+        try:
+            while self.is_busy is not None and self.is_busy():
+                if self._stop.wait(1.0):
+                    return False
+            return not self._stop.is_set()
+        finally:
+            self._waited += time.perf_counter() - started
+
+    def run_once(self, today=None):
+        """対象をすべて変換する (1件ずつ、読み上げ中は待ち、間に休みを入れる)"""
+        if not HAS_MUTAGEN:
+            print("⚠️ mutagen が無いため、タグを写せないので変換しません。")
+            return dict(self.stats)
+        for src in self.candidates(today):
+            if not self._wait_idle():
+                break
+            started = time.perf_counter()
+            self._waited = 0.0
+            try:
+                dst = self.transcode(src)
+                if dst is None:
+                    self.stats["skipped"] += 1
+                    self._passed_over.add(src)
+                    # 次に起動した時も変換し直さないよう目録に残す
+                    day_dir, name = os.path.split(src)
+                    self._update_manifest(day_dir, name, tiering=KEPT_FLAC)
+                    print(f"ℹ️ Opus にしても小さくならないので FLAC のまま: {src}")
+                else:
+                    print(f"🗜️ Opus に変換: {os.path.relpath(dst, self.archive_root)}")
+            except InterruptedError:
+                break
+            except Exception as e:
+                self.stats["failed"] += 1
+                self._passed_over.add(src)
+                print(f"⚠️ Opus への変換に失敗 (元のファイルは残します): {src} ({e})")
+            # 使った時間に応じて休む (duty=0.2 なら 1秒使ったら 4秒休む)
+            busy = max(0.0, time.perf_counter() - started - self._waited)
+            if self._stop.wait(busy * (1 - self.duty) / self.duty):
+                break
+        return dict(self.stats)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            before = self.stats["converted"]
+            stats = self.run_once()
+            if stats["converted"] > before:
+                saved = (stats["bytes_before"] - stats["bytes_after"]) / 1024 / 1024
+                print(
+                    f"🗜️ 古い保存ファイルを Opus に変換: 累計 {stats['converted']}件 "
+                    f"({saved:.1f}MB 削減)"
+                )
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="tiering")
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """変換中のファイルは途中でやめて元のまま残す"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
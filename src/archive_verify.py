@@ -0,0 +1,276 @@
+"""保存フォルダの点検 (デコードできるか・タグ・トラック番号の抜けや重複・書きかけのファイル)"""
+
+import collections
+import concurrent.futures
+import datetime
+import json
+import os
+import time
+
+import soundfile as sf
+
+from archive_manifest import AUDIO_EXTS, DAY_DIR_PATTERN, MANIFEST_NAME, DayManifest
+
+# タグ読み取り用 (あれば使う)
+try:
+    from mutagen import File as MutagenFile
+
+    HAS_MUTAGEN = True
+except ImportError:
+    HAS_MUTAGEN = False
+
+RESULT_VERSION = 1
+REQUIRED_TAGS = ("title", "artist", "album", "tracknumber")
+# Ogg ページの header_type で「最後のページ」を表すビット
+_OGG_EOS = 0x04
+_DECODE_BLOCK = 65536
+
+
+def _issue(path, code, detail=""):
+    return {"path": path, "issue": code, "detail": detail}
+
+
+def ogg_finished(path):
+    """Ogg の最後のページに終端 (EOS) の印があるか。途中で止まった保存には無い"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+    pos = tail.rfind(b"OggS")
+    return pos >= 0 and pos + 5 < len(tail) and bool(tail[pos + 5] & _OGG_EOS)
+
+
+def decode_frames(path):
+    """最後までデコードしてフレーム数を返す (少しずつ読むのでメモリは増えない)"""
+    frames = 0
+    for block in sf.blocks(path, blocksize=_DECODE_BLOCK, dtype="float32"):
+        frames += len(block)
+    return frames
+
+
+def _tag(audio, key):
+    value = audio.get(key)
+    return value[0] if isinstance(value, list) and value else None
+
+
+def _has_artwork(audio):
+    if hasattr(audio, "pictures"):
+        return bool(audio.pictures)
+    return bool(audio.get("metadata_block_picture"))
+
+
+def check_file(path, artist=None, album_prefix=None, require_artwork=True):
+    """
+    1ファイルを点検する。戻り値は {"path", "track", "frames", "issues": [...]}。
+    artist / album_prefix を指定すると、タグがその値になっているかも確かめる
+    """
+    result: dict = {"path": path, "track": None, "frames": None, "issues": []}
+    issues = result["issues"]
+
+    if os.path.getsize(path) == 0:
+        issues.append(_issue(path, "empty", "0 バイト"))
+        return result
+
+    audio = None
+    try:
+        audio = MutagenFile(path)
+        if audio is None:
+            issues.append(_issue(path, "unreadable", "形式を認識できません"))
+    except Exception as e:
+        issues.append(_issue(path, "unreadable", str(e)))
+
+    # 書きかけのファイル: FLAC は長さ (STREAMINFO) が未確定、Ogg は終端ページが無い
+    expected = None
+    try:
+        if path.endswith(".flac"):
+            if audio is not None:
+                expected = audio.info.total_samples
+                if expected == 0:
+                    issues.append(_issue(path, "truncated", "長さが記録されていません"))
+        elif not ogg_finished(path):
+            issues.append(_issue(path, "truncated", "終端ページがありません"))
+    except Exception as e:
+        issues.append(_issue(path, "unreadable", str(e)))
+
+    try:
+        result["frames"] = decode_frames(path)
+        if expected and result["frames"] < expected:
+            issues.append(
+                _issue(
+                    path,
+                    "truncated",
+                    f"{result['frames']} / {expected} フレームしかデコードできません",
+                )
+            )
+    except Exception as e:
+        issues.append(_issue(path, "decode_error", str(e)))
+
+    if audio is None:
+        return result
+
+    for key in REQUIRED_TAGS:
+        if not _tag(audio, key):
+            issues.append(_issue(path, "missing_tag", key))
+
+    track = _tag(audio, "tracknumber")
+    if track:
+        try:
+            result["track"] = int(str(track).split("/")[0])
+        except ValueError:
+            issues.append(_issue(path, "tag_mismatch", f"tracknumber={track}"))
+
+    day = os.path.basename(os.path.dirname(path))
+    expected_tags = {}
+    if artist:
+        expected_tags["artist"] = artist
+    if album_prefix and DAY_DIR_PATTERN.fullmatch(day):
+        expected_tags["album"] = f"{album_prefix}_{day}"
+    for key, value in expected_tags.items():
+        actual = _tag(audio, key)
+        if actual and actual != value:
+            issues.append(_issue(path, "tag_mismatch", f"{key}={actual}"))
+
+    if require_artwork and not _has_artwork(audio):
+        issues.append(_issue(path, "missing_artwork"))
+    return result
+
+
+def _check_chunk(paths, options):
+    return [check_file(path, **options) for path in paths]
+
+
+def _check_tracks(day_dir, results):
+    """フォルダ内のトラック番号の重複と抜け"""
+    issues = []
+    by_track = collections.defaultdict(list)
+    for result in results:
+        if result["track"] is not None:
+            by_track[result["track"]].append(result["path"])
+
+    duplicates = sorted(t for t, paths in by_track.items() if len(paths) > 1)
+    for track in duplicates:
+        for path in by_track[track]:
+            issues.append(_issue(path, "duplicate_track", str(track)))
+
+    gaps = [t for t in range(1, max(by_track, default=0) + 1) if t not in by_track]
+    if gaps:
+        issues.append(_issue(day_dir, "track_gap", ",".join(map(str, gaps))))
+    return issues, duplicates, gaps
+
+
+def _check_manifest(day_dir, filenames):
+    """目録と実際のファイルの食い違い (保存が終わっていない記録・消えたファイル)"""
+    if not os.path.exists(os.path.join(day_dir, MANIFEST_NAME)):
+        return []
+    issues = []
+    for record in DayManifest(day_dir).records():
+        name = record.get("filename") or ""
+        path = os.path.join(day_dir, name)
+        if record.get("status") == "reserved":
+            issues.append(
+                _issue(path, "unfinished_save", f"track {record.get('track')}")
+            )
+        elif record.get("status") == "saved" and name not in filenames:
+            issues.append(_issue(path, "missing_file", f"track {record.get('track')}"))
+    return issues
+
+
+def find_day_dirs(root):
+    """root 以下の日付フォルダ (yymmdd) と、その中のファイル"""
+    folders = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        if DAY_DIR_PATTERN.fullmatch(os.path.basename(dirpath)):
+            files = sorted(name for name in filenames if name.endswith(AUDIO_EXTS))
+            folders[dirpath] = files
+    return folders
+
+
+def verify_archive(
+    root,
+    workers=None,
+    artist=None,
+    album_prefix=None,
+    require_artwork=True,
+    on_result=None,
+):
+    """
+    root 以下のすべての日付フォルダを点検し、結果を JSON にできる dict で返す。
+    ファイルの点検 (デコードを含む) は数十件ずつプロセスプールで並列に行う。
+    workers=1 ならこのプロセスで行う。on_result(result) をファイルごとに呼ぶ
+    """
+    if not HAS_MUTAGEN:
+        raise RuntimeError("mutagen がインストールされていません")
+
+    started = time.perf_counter()
+    folders = find_day_dirs(root)
+    paths = [
+        os.path.join(day_dir, name)
+        for day_dir, names in folders.items()
+        for name in names
+    ]
+    options = {
+        "artist": artist,
+        "album_prefix": album_prefix,
+        "require_artwork": require_artwork,
+    }
+
+    results = {}
+
+    def collect(chunk_results):
+        for result in chunk_results:
+            results[result["path"]] = result
+            if on_result is not None:
+                on_result(result)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) <= 1:
+        collect(_check_chunk(paths, options))
+    else:
+        chunk = max(1, min(32, len(paths) // (workers * 4)))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_check_chunk, paths[i : i + chunk], options)
+                for i in range(0, len(paths), chunk)
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                collect(future.result())
+
+    problems = []
+    folder_reports = {}
+    for day_dir, names in folders.items():
+        day_results = [results[os.path.join(day_dir, name)] for name in names]
+        for result in day_results:
+            problems.extend(result["issues"])
+        track_issues, duplicates, gaps = _check_tracks(day_dir, day_results)
+        problems.extend(track_issues)
+        problems.extend(_check_manifest(day_dir, set(names)))
+        folder_reports[os.path.relpath(day_dir, root)] = {
+            "files": len(names),
+            "duplicates": duplicates,
+            "gaps": gaps,
+        }
+
+    broken = {p["path"] for p in problems}
+    return {
+        "version": RESULT_VERSION,
+        "root": os.path.abspath(root),
+        "checked_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "elapsed_sec": round(time.perf_counter() - started, 3),
+        "folders": folder_reports,
+        "files": len(paths),
+        "ok": sum(1 for path in paths if path not in broken),
+        "issue_counts": dict(collections.Counter(p["issue"] for p in problems)),
+        "problems": problems,
+    }
+
+
+def dump_report(report, path=None):
+    """結果を JSON で書き出す (path が None なら文字列を返す)"""
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if path is None:
+        return text
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text + "\n")
+    return text
@@ -0,0 +1,111 @@
+"""読み上げ中の音声を少しずつファイルに書き足す"""
+
+import collections
+import concurrent.futures
+import os
+import threading
+
+
+class ArchiveWriter:
+    """
+    1件の読み上げを、確定した音声から順に1つのファイルへ書き足す。
+    書き込みは保存キューのスレッドで行い、どのスレッドが処理しても順番は保つ。
+    close() で閉じて finalize(path) (タグ付けなど) を呼び、
+    discard() では書きかけのファイルを削除する。
+    """
+
+    def __init__(self, path, encoder, sr, channels, save_queue, finalize=None):
+        self.path = path
+        self.encoder = encoder
+        self.sample_rate = sr
+        self.channels = channels
+        self.save_queue = save_queue
+        self.finalize = finalize
+        self.frames = 0
+        self.failed = False
+        self._stream = None
+        self._ended = False
+        self._pending: collections.deque = collections.deque()
+        self._lock = threading.Lock()
+        # 結果: True (保存完了) / False (失敗) / None (破棄・書き込みなし)
+        self.finished: concurrent.futures.Future = concurrent.futures.Future()
+
+    def _submit(self, op, data=None):
+        self._pending.append((op, data))
+        self.save_queue.submit(self._drain)
+
+    def write(self, data):
+        """音声を書き足す (すぐに戻る)"""
+        if len(data) > 0:
+            self.frames += len(data)
+            self._submit("write", data)
+
+    def close(self):
+        """書き込みを終えてファイルを確定する。結果は finished (Future) で分かる"""
+        self._submit("close")
+        return self.finished
+
+    def discard(self):
+        """書きかけのファイルを削除する (中断時)"""
+        self._submit("discard")
+        return self.finished
+
+    def _remove(self):
+        if os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def _drain(self):
+        """
+        溜まっている操作を順に実行する。保存キューの件数としては
+        close / discard の時だけ結果 (True / False) を返し、途中の書き込みは None
+        """
+        result = None
+        with self._lock:
+            while self._pending:
+                op, data = self._pending.popleft()
+                if self._ended:
+                    continue
+                try:
+                    result = self._apply(op, data)
+                    if self._ended:
+                        self.finished.set_result(result)
+                except Exception as e:
+                    print(f"⚠️ 保存失敗: {e}")
+                    self.failed = True
+                    self._ended = True
+                    if self._stream is not None:
+                        try:
+                            self._stream.abort()
+                        except Exception:
+                            pass
+                    self._remove()
+                    result = False
+                    self.finished.set_result(False)
+        return result
+
+    def _apply(self, op, data):
+        if op == "write":
+            if self._stream is None:
+                self._stream = self.encoder.open(
+                    self.path, self.sample_rate, self.channels
+                )
+            self._stream.write(data)
+            return None
+
+        self._ended = True
+        if op == "discard":
+            if self._stream is not None:
+                self._stream.abort()
+            self._remove()
+            return None
+
+        if self._stream is None:
+            # 1フレームも書かれなかった場合はファイルを作らない
+            return None
+        self._stream.close()
+        if self.finalize is not None:
+            self.finalize(self.path)
+        return True
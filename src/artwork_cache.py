@@ -0,0 +1,163 @@
+"""保存ファイルに埋め込むカバー画像を、変換済みの形で使い回す"""
+
+import base64
+import hashlib
+import io
+import os
+import threading
+from typing import NamedTuple, Optional
+
+# FLAC画像ブロックの組み立て用 (あれば使う)
+try:
+    from mutagen.flac import Picture
+
+    HAS_MUTAGEN = True
+except ImportError:
+    HAS_MUTAGEN = False
+
+# 縮小・再圧縮用 (あれば使う)
+try:
+    from PIL import Image
+
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+
+class Artwork(NamedTuple):
+    mime: str
+    # 画像ファイルのバイト列 (縮小した場合は縮小後)
+    data: bytes
+    # FLAC の METADATA_BLOCK_PICTURE 構造体 (FLAC はこれを add_picture する)
+    picture: object
+    # Ogg/Opus の METADATA_BLOCK_PICTURE タグの値 (上の構造体の Base64)
+    block_base64: str
+
+
+def _mime_for(path):
+    if path.lower().endswith((".jpg", ".jpeg")):
+        return "image/jpeg"
+    return "image/png"
+
+
+def _downscale(data, max_px, quality):
+    """
+    長辺が max_px を超える画像を縮小して再圧縮する。
+    透過のある画像は PNG、それ以外は JPEG。縮小しない場合は None
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        if max(image.size) <= max_px:
+            return None
+        image.thumbnail((max_px, max_px), Image.Resampling.LANCZOS)
+        out = io.BytesIO()
+        if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+            image.save(out, format="PNG", optimize=True)
+            mime = "image/png"
+        else:
+            image.convert("RGB").save(
+                out, format="JPEG", quality=quality, optimize=True
+            )
+            mime = "image/jpeg"
+        return mime, out.getvalue(), image.size
+
+
+class ArtworkCache:
+    """
+    カバー画像の読み込み・FLAC画像ブロックへの変換・Base64化を1回だけ行う。
+    パスと更新時刻 (mtime) が変わらない限り同じものを返す。
+    max_px を指定すると、それより大きい画像は縮小して埋め込む (Pillow が必要)。
+    保存スレッドが複数あっても使えるよう、変換はロックの中で行う。
+    """
+
+    # 埋め込み済みの画像を縮小した結果を覚えておく数 (保存フォルダではふつう1種類)
+    EMBEDDED_CACHE_SIZE = 8
+
+    def __init__(self, max_px=0, quality=90):
+        self.max_px = max(0, int(max_px or 0))
+        self.quality = int(quality)
+        self.loads = 0
+        self._lock = threading.Lock()
+        self._key = None
+        self._artwork: Optional[Artwork] = None
+        self._embedded: dict = {}
+
+    def get(self, path):
+        """path のカバー画像 (Artwork)。ファイルが無い・読めない場合は None"""
+        if not HAS_MUTAGEN or not path:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        key = (path, stat.st_mtime_ns, stat.st_size, self.max_px, self.quality)
+        with self._lock:
+            if key != self._key:
+                self._artwork = self._load(path)
+                self._key = key
+            return self._artwork
+
+    def _load(self, path):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            print(f"⚠️ アートワーク読み込みエラー: {e}")
+            return None
+        self.loads += 1
+
+        image = Picture()
+        # ★修正: Enumではなく整数値(3=Cover Front)を明示的に設定
+        image.type = 3
+        # ★修正: Descriptionを明示 (一部プレーヤー対策)
+        image.desc = "Cover"
+        image.mime = _mime_for(path)
+
+        resized = self._shrink(data)
+        if resized is not None:
+            image.mime, data, (image.width, image.height) = resized
+            print(
+                f"🎨 アートワークを縮小: {image.width}x{image.height} "
+                f"({len(data) // 1024}KB)"
+            )
+
+        image.data = data
+        block = image.write()
+        return Artwork(
+            mime=image.mime,
+            data=data,
+            picture=image,
+            block_base64=base64.b64encode(block).decode("ascii"),
+        )
+
+    def _shrink(self, data):
+        """max_px を超える画像なら縮小した (mime, data, size)。それ以外は None"""
+        if not (self.max_px and HAS_PIL):
+            return None
+        try:
+            return _downscale(data, self.max_px, self.quality)
+        except Exception as e:
+            print(f"⚠️ アートワーク縮小エラー (元の画像を使用): {e}")
+            return None
+
+    def shrink_picture(self, picture):
+        """
+        ファイルに埋め込まれている画像 (Picture) を max_px に合わせて縮小した
+        Picture を返す (形式の変換用)。同じ画像は1回だけ変換し、
+        縮小しない場合は元の Picture をそのまま返す
+        """
+        key = hashlib.sha256(picture.data).hexdigest()
+        with self._lock:
+            if key not in self._embedded:
+                if len(self._embedded) >= self.EMBEDDED_CACHE_SIZE:
+                    self._embedded.clear()
+                self._embedded[key] = self._shrink(picture.data)
+            resized = self._embedded[key]
+        if resized is None:
+            return picture
+
+        image = Picture()
+        image.type = picture.type
+        image.desc = picture.desc
+        image.mime, image.data, (image.width, image.height) = resized
+        return image
@@ -0,0 +1,389 @@
+"""音声データ処理 (WAV解析・フェードなど) の共通関数"""
+
+import functools
+import math
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WavFormat(NamedTuple):
+    audio_format: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    block_align: int
+    data_offset: int
+    # 0 または 0xFFFFFFFF の場合は「長さ不明 (ストリーム)」として扱う
+    data_size: int
+
+
+def parse_wav_header(buf) -> Optional[WavFormat]:
+    """
+    RIFF/WAVE ヘッダを解析する。
+    data チャンクの先頭までまだ届いていなければ None を返す。
+    """
+    if len(buf) < 12:
+        return None
+    if bytes(buf[0:4]) != b"RIFF" or bytes(buf[8:12]) != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE stream")
+
+    fmt = None
+    pos = 12
+    while True:
+        if len(buf) < pos + 8:
+            return None
+        chunk_id = bytes(buf[pos : pos + 4])
+        size = int.from_bytes(buf[pos + 4 : pos + 8], "little")
+
+        if chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            return WavFormat(*fmt, data_offset=pos + 8, data_size=size)
+
+        if chunk_id == b"fmt ":
+            if len(buf) < pos + 8 + size:
+                return None
+            body = bytes(buf[pos + 8 : pos + 8 + size])
+            audio_format = int.from_bytes(body[0:2], "little")
+            channels = int.from_bytes(body[2:4], "little")
+            sample_rate = int.from_bytes(body[4:8], "little")
+            block_align = int.from_bytes(body[12:14], "little")
+            bits = int.from_bytes(body[14:16], "little")
+            if audio_format == WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                # SubFormat GUID の先頭2バイトが実際のフォーマット
+                audio_format = int.from_bytes(body[24:26], "little")
+            fmt = (audio_format, channels, sample_rate, bits, block_align)
+
+        # チャンクは2バイト境界に揃えられている
+        pos += 8 + size + (size & 1)
+
+
+def pcm_to_float32(raw, fmt: WavFormat, out=None):
+    """
+    PCMバイト列を float32 の配列に変換する。
+    out を渡した場合はその配列に書き込む (割り当てなし)。
+    """
+    key = (fmt.audio_format, fmt.bits_per_sample)
+    if key == (WAVE_FORMAT_PCM, 16):
+        samples = np.frombuffer(raw, dtype="<i2")
+        scale = 1.0 / 32768
+    elif key == (WAVE_FORMAT_PCM, 32):
+        samples = np.frombuffer(raw, dtype="<i4")
+        scale = 1.0 / 2147483648
+    elif key == (WAVE_FORMAT_PCM, 8):
+        samples = np.frombuffer(raw, dtype="u1")
+        if out is None:
+            out = np.empty(len(samples), dtype=np.float32)
+        np.subtract(samples, 128.0, out=out, dtype=np.float32)
+        out *= 1.0 / 128
+        return _shape(out, fmt)
+    elif key == (WAVE_FORMAT_PCM, 24):
+        b = np.frombuffer(raw, dtype="u1").reshape(-1, 3).astype(np.int32)
+        samples = (b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8 >> 8
+        scale = 1.0 / 8388608
+    elif key == (WAVE_FORMAT_IEEE_FLOAT, 32):
+        samples = np.frombuffer(raw, dtype="<f4")
+        scale = 1.0
+    elif key == (WAVE_FORMAT_IEEE_FLOAT, 64):
+        samples = np.frombuffer(raw, dtype="<f8")
+        scale = 1.0
+    else:
+        raise ValueError(f"Unsupported WAV format: {key}")
+
+    if out is None:
+        out = np.empty(len(samples), dtype=np.float32)
+    np.multiply(samples, scale, out=out, dtype=np.float32)
+    return _shape(out, fmt)
+
+
+def _shape(data, fmt: WavFormat):
+    if fmt.channels > 1:
+        return data.reshape(-1, fmt.channels)
+    return data
+
+
+class WavStreamDecoder:
+    """
+    WAVを少しずつ受け取りながら float32 のフレームに変換する。
+    ヘッダが揃った時点から、届いた分のフレームを返す。
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self.format: Optional[WavFormat] = None
+        self._remaining = None
+
+    def feed(self, chunk):
+        """受信したバイト列を渡し、新たにデコードできたフレームを返す"""
+        self._buf += chunk
+
+        if self.format is None:
+            self.format = parse_wav_header(self._buf)
+            if self.format is None:
+                return None
+            del self._buf[: self.format.data_offset]
+            if self.format.data_size not in (0, 0xFFFFFFFF):
+                self._remaining = self.format.data_size
+
+        fmt = self.format
+        usable = len(self._buf)
+        if self._remaining is not None:
+            usable = min(usable, self._remaining)
+        usable -= usable % fmt.block_align
+        if usable <= 0:
+            return None
+
+        frames = pcm_to_float32(bytes(self._buf[:usable]), fmt)
+        del self._buf[:usable]
+        if self._remaining is not None:
+            self._remaining -= usable
+        return frames
+
+    @property
+    def sample_rate(self):
+        return self.format.sample_rate if self.format else None
+
+
+def _fade_curve(fade_len, data):
+    curve = np.linspace(0.0, 1.0, fade_len, dtype=np.float32)
+    if data.ndim > 1:
+        return curve[:, np.newaxis]
+    return curve
+
+
+def apply_fade_in(data, fade_len):
+    """先頭 fade_len サンプルをフェードインする (その場で書き換え)"""
+    if fade_len > 0:
+        data[:fade_len] *= _fade_curve(fade_len, data)
+    return data
+
+
+def apply_fade_out(data, fade_len):
+    """末尾 fade_len サンプルをフェードアウトする (その場で書き換え)"""
+    if fade_len > 0:
+        data[-fade_len:] *= _fade_curve(fade_len, data)[::-1]
+    return data
+
+
+# ─── サンプリングレート変換 ────────────────
+@functools.lru_cache(maxsize=16)
+def _polyphase_bank(up, down, half_taps):
+    """
+    窓付き sinc のローパスフィルタを up 個の位相に分けたもの。
+    bank[phase, k] = h[k * up + phase]
+    """
+    width = max(up, down)
+    length = 2 * half_taps * width + 1
+    center = half_taps * width
+    cutoff = 0.5 / width
+    t = np.arange(length) - center
+    h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(length, 8.0) * up
+
+    pad = (-length) % up
+    h = np.concatenate([h, np.zeros(pad)])
+    bank = np.ascontiguousarray(h.reshape(-1, up).T, dtype=np.float32)
+    return bank, center
+
+
+class PolyphaseResampler:
+    """
+    有理数比 (up/down) のポリフェーズ方式でサンプリングレートを変換する。
+    ストリーミング用に状態を持ち、process() を続けて呼んでも継ぎ目が出ない。
+    最後に flush() で残りを出し切る。
+    """
+
+    # 出力を何サンプルずつまとめて計算するか (一時配列の大きさを抑える)
+    BLOCK = 4096
+
+    def __init__(self, src_sr, dst_sr, half_taps=16):
+        g = math.gcd(int(src_sr), int(dst_sr))
+        self.up = int(dst_sr) // g
+        self.down = int(src_sr) // g
+        self.bank, self.center = _polyphase_bank(self.up, self.down, half_taps)
+        self.taps = self.bank.shape[1]
+
+        self._buf = None  # まだ使う入力 (先頭が絶対位置 _buf_start)
+        self._buf_start = 0
+        self._received = 0  # 受け取った入力サンプル数
+        self._produced = 0  # 出力したサンプル数
+
+    def _input_index(self, n):
+        """出力 n 番目を計算するのに必要な最後の入力位置と位相"""
+        m = n * self.down + self.center
+        return m // self.up, m % self.up
+
+    def _compute(self, end):
+        """出力 _produced 〜 end-1 を計算する"""
+        buf = self._buf
+        if buf is None or end <= self._produced:
+            return None
+        outputs = []
+        for start in range(self._produced, end, self.BLOCK):
+            n = np.arange(start, min(start + self.BLOCK, end))
+            base, phase = self._input_index(n)
+            # 入力の絶対位置 → バッファ内の位置 (前に taps 分のゼロを足してある)
+            idx = (base - self._buf_start)[:, None] - np.arange(self.taps)[None, :]
+            window = buf[idx + self.taps]
+            coeffs = self.bank[phase]
+            if window.ndim == 3:
+                outputs.append(np.einsum("nk,nkc->nc", coeffs, window))
+            else:
+                outputs.append(np.einsum("nk,nk->n", coeffs, window))
+
+        self._produced = end
+        return np.concatenate(outputs).astype(np.float32, copy=False)
+
+    def _append(self, data):
+        pad_shape = (self.taps,) + data.shape[1:]
+        if self._buf is None:
+            # 先頭より前はゼロとして扱う
+            self._buf = np.concatenate([np.zeros(pad_shape, np.float32), data])
+        else:
+            self._buf = np.concatenate([self._buf, data])
+        self._received += len(data)
+
+    def _trim(self):
+        """今後の計算に使わない古い入力を捨てる"""
+        first_needed = self._input_index(self._produced)[0] - self.taps + 1
+        drop = first_needed - self._buf_start
+        if self._buf is not None and drop > 0:
+            self._buf = self._buf[drop:]
+            self._buf_start += drop
+
+    def process(self, data):
+        """入力を渡し、計算できた分の出力を返す"""
+        data = np.asarray(data, dtype=np.float32)
+        self._append(data)
+
+        # 必要な入力がすべて届いている出力まで計算する
+        last = self._received - 1
+        end = max(self._produced, (last * self.up - self.center) // self.down + 1)
+        out = self._compute(end)
+        self._trim()
+        if out is None:
+            return np.zeros((0,) + data.shape[1:], np.float32)
+        return out
+
+    def flush(self):
+        """入力の終わりを伝え、残りの出力を返す"""
+        if self._buf is None:
+            return np.zeros(0, np.float32)
+
+        total = -(-self._received * self.up // self.down)
+        shape = self._buf.shape[1:]
+        self._append(np.zeros((self.center // self.up + 2,) + shape, np.float32))
+        out = self._compute(total)
+        if out is None:
+            return np.zeros((0,) + shape, np.float32)
+        return out
+
+
+def resample(data, src_sr, dst_sr):
+    """1行ぶんの音声をまとめて変換する (同じレートならそのまま返す)"""
+    if src_sr == dst_sr or len(data) == 0:
+        return data
+    resampler = PolyphaseResampler(src_sr, dst_sr)
+    head = resampler.process(data)
+    return np.concatenate([head, resampler.flush()])
+
+
+def match_channels(data, channels):
+    """チャンネル数を揃える (モノラル ↔ ステレオ)"""
+    current = 1 if data.ndim == 1 else data.shape[1]
+    if current == channels:
+        return data
+    if channels == 1:
+        return data.mean(axis=1, dtype=np.float32)
+    mono = data if data.ndim == 1 else data.mean(axis=1, dtype=np.float32)
+    return np.repeat(mono[:, np.newaxis], channels, axis=1)
+
+
+# ─── 時間伸縮 (再生速度の変更) ────────────────
+class WsolaStretcher:
+    """
+    WSOLA (波形の似た位置を探して重ね合わせる方式) で音の高さを変えずに再生速度を変える。
+    1行ぶんの音声を受け取り、read() を呼ぶたびにその時点の速度で続きを返すので、
+    再生中に速度を変えてもすぐ反映される。
+    先頭・末尾は元の音声そのままにつながるので、前後の行との継ぎ目は出ない。
+    """
+
+    def __init__(self, data, sr, frame_ms=40, search_ms=10):
+        self.x = data.reshape(-1, 1) if data.ndim == 1 else data
+        self.mono_input = data.ndim == 1
+        # 探索に使うモノラル信号
+        self.guide = self.x.mean(axis=1) if self.x.shape[1] > 1 else self.x[:, 0]
+
+        self.frame = max(4, int(sr * frame_ms / 1000) // 2 * 2)
+        self.hop = self.frame // 2
+        self.search = max(1, int(sr * search_ms / 1000))
+        # 半分ずらして足すと 1 になる窓 (periodic Hann)
+        n = np.arange(self.frame)
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * n / self.frame)).astype(
+            np.float32
+        )[:, np.newaxis]
+
+        # 仮想的な「1つ前のフレーム」を -hop に置き、その後半を初期値にする
+        self.prev = -self.hop
+        self.pos = 0.0
+        self.tail = self.x[: self.hop] * self.window[self.hop : self.hop + len(self.x)]
+        self.finished = False
+
+    def _shape(self, out):
+        return out[:, 0] if self.mono_input else out
+
+    def _best_start(self, natural, nominal):
+        """nominal 付近で、natural からの自然な続きに最も似ている位置を探す"""
+        lo = max(0, nominal - self.search)
+        hi = min(len(self.x) - self.frame, nominal + self.search)
+        if hi <= lo:
+            return max(0, min(nominal, len(self.x) - self.frame))
+
+        template = self.guide[natural : natural + self.hop]
+        region = self.guide[lo : hi + self.hop]
+        corr = np.correlate(region, template, mode="valid")
+        # 音量の大きい位置ばかり選ばれないよう候補ごとのエネルギーで割る
+        energy = np.cumsum(np.concatenate([[0.0], region.astype(np.float64) ** 2]))
+        norms = np.sqrt(energy[self.hop :] - energy[: -self.hop]) + 1e-9
+        return lo + int(np.argmax(corr / norms[: len(corr)]))
+
+    def _finish(self):
+        """残りを自然な続きのまま出し切る"""
+        natural = self.prev + self.hop
+        overlap = self.x[natural : natural + len(self.tail)]
+        out = self.tail[: len(overlap)] + overlap * self.window[: len(overlap)]
+        rest = self.x[natural + len(overlap) :]
+        self.finished = True
+        return self._shape(np.concatenate([out, rest]))
+
+    def read(self, rate, max_frames):
+        """
+        rate 倍速で伸縮した続きを最大 max_frames 程度返す。
+        出し切った後は None
+        """
+        if self.finished:
+            return None
+
+        outputs = []
+        produced = 0
+        while produced < max_frames:
+            natural = self.prev + self.hop
+            if natural + self.frame > len(self.x):
+                outputs.append(self._finish())
+                break
+            # 最後のフレームは末尾にそろえ、伸縮後の長さが速度どおりになるようにする
+            nominal = min(int(round(self.pos)), len(self.x) - self.frame)
+
+            start = self._best_start(natural, nominal)
+            segment = self.x[start : start + self.frame] * self.window
+            outputs.append(self._shape(self.tail + segment[: self.hop]))
+            self.tail = segment[self.hop :]
+            self.prev = start
+            self.pos += self.hop * rate
+            produced += self.hop
+
+        return np.concatenate(outputs) if outputs else None
@@ -0,0 +1,110 @@
+"""読み上げテキストを合成単位 (チャンク) に分ける"""
+
+# 文の区切り (この後ろで分ける)
+SENTENCE_END = "。！？!?"
+# 文が長すぎる場合に使う区切り
+CLAUSE_END = "、，,"
+# 区切り記号の直後に続く閉じ括弧などは前の文に含める
+CLOSERS = "」』）)】〉》\"'…"
+
+
+def split_after(text, marks):
+    """marks のいずれかの文字の直後でテキストを分ける (記号は前に残す)"""
+    pieces = []
+    start = 0
+    i = 0
+    while i < len(text):
+        if text[i] in marks:
+            end = i + 1
+            while end < len(text) and (text[end] in marks or text[end] in CLOSERS):
+                end += 1
+            pieces.append(text[start:end])
+            start = i = end
+        else:
+            i += 1
+    if start < len(text):
+        pieces.append(text[start:])
+    return [p.strip() for p in pieces if p.strip()]
+
+
+def chunk_limit(index, first_chars, max_chars):
+    """
+    index 番目のチャンクの上限文字数。
+    最初は短くし、以降は倍々に大きくする (先の合成が再生に追いつけるように)
+    """
+    return min(max_chars, first_chars * (2 ** min(index, 16)))
+
+
+def _pack_line(line, start_index, first_chars, max_chars):
+    chunks: list = []
+    current = ""
+    pending = split_after(line, SENTENCE_END)
+
+    while pending:
+        piece = pending.pop(0)
+        limit = chunk_limit(start_index + len(chunks), first_chars, max_chars)
+
+        if len(piece) > limit and not current:
+            # 1文が長すぎる場合は読点で、それでも長ければ文字数で分ける
+            finer = split_after(piece, CLAUSE_END)
+            if len(finer) == 1:
+                finer = [piece[:limit], piece[limit:]]
+            pending[:0] = finer
+            continue
+
+        if current and len(current) + len(piece) > limit:
+            chunks.append(current)
+            current = ""
+            pending.insert(0, piece)
+            continue
+
+        current += piece
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _merge_tiny(chunks, start_index, min_chars, max_chars):
+    """短すぎる断片を後ろ (最後の断片は前) のチャンクにまとめる"""
+    merged: list = []
+    carry = ""
+    for i, chunk in enumerate(chunks):
+        chunk = carry + chunk
+        carry = ""
+        # 全体の最初のチャンクは最初の音を早く出すため短いまま残す
+        is_first = start_index + len(merged) == 0
+        has_next = i + 1 < len(chunks)
+        if (
+            len(chunk) < min_chars
+            and not is_first
+            and has_next
+            and len(chunk) + len(chunks[i + 1]) <= max_chars
+        ):
+            carry = chunk
+            continue
+        merged.append(chunk)
+
+    if (
+        len(merged) >= 2
+        and len(merged[-1]) < min_chars
+        and start_index + len(merged) - 1 > 0
+        and len(merged[-2]) + len(merged[-1]) <= max_chars
+    ):
+        merged[-2:] = [merged[-2] + merged[-1]]
+    return merged
+
+
+def chunk_lines(lines, first_chars, max_chars, min_chars=8):
+    """
+    行のリストを合成用のチャンクに分ける。
+    行の境目はそのまま保ち、長い行だけを文 (。！？) → 読点 (、) の順で分ける。
+    最初のチャンクは first_chars 文字以内、以降は max_chars まで徐々に大きくし、
+    min_chars 未満の断片は隣のチャンクにまとめる。
+    """
+    first_chars = max(1, min(first_chars, max_chars))
+    result: list = []
+    for line in lines:
+        chunks = _pack_line(line, len(result), first_chars, max_chars)
+        result.extend(_merge_tiny(chunks, len(result), min_chars, max_chars))
+    return result
@@ -0,0 +1,212 @@
+"""録音ファイルのエンコーダ (Opus / FLAC)"""
+
+import abc
+import os
+import subprocess
+
+import numpy as np
+import soundfile as sf
+
+from audio_dsp import PolyphaseResampler
+
+# libsndfile の Opus が扱えるサンプリングレート (それ以外は 48kHz に変換する)
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+# libsndfile の compression_level 0.0〜1.0 が対応する1チャンネルあたりのビットレート
+_SNDFILE_OPUS_BITRATE_RANGE = (256000, 6000)
+
+
+def _channels(data):
+    return 1 if data.ndim == 1 else data.shape[1]
+
+
+class _SoundfileStream:
+    """libsndfile で少しずつ書き足すファイル"""
+
+    def __init__(self, path, sr, channels, resampler=None, **kwargs):
+        self._fileobj = open(path, "wb")
+        try:
+            self._file = sf.SoundFile(
+                self._fileobj, "w", samplerate=sr, channels=channels, **kwargs
+            )
+        except Exception:
+            self._fileobj.close()
+            raise
+        self._resampler = resampler
+
+    def write(self, data):
+        if self._resampler is not None:
+            data = self._resampler.process(data)
+        if len(data) > 0:
+            self._file.write(data)
+
+    def close(self):
+        try:
+            if self._resampler is not None:
+                tail = self._resampler.flush()
+                if len(tail) > 0:
+                    self._file.write(tail)
+        finally:
+            self.abort()
+
+    def abort(self):
+        try:
+            self._file.close()
+        finally:
+            self._fileobj.close()
+
+
+class _FfmpegStream:
+    """ffmpeg の標準入力に少しずつ PCM を流し込む"""
+
+    def __init__(self, ffmpeg_path, path, sr, channels, bitrate):
+        command = [
+            ffmpeg_path,
+            "-loglevel",
+            "error",
+            "-f",
+            "f32le",
+            "-ar",
+            str(sr),
+            "-ac",
+            str(channels),
+            "-i",
+            "pipe:0",
+            "-c:a",
+            "libopus",
+            "-b:a",
+            f"{bitrate // 1000}k",
+            "-vbr",
+            "on",
+            "-y",
+            path,
+        ]
+
+        # Windowsの場合、コマンドプロンプトが出ないようにフラグを設定
+        creation_flags = 0
+        if os.name == "nt":
+            creation_flags = 0x08000000  # CREATE_NO_WINDOW
+
+        self._process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            creationflags=creation_flags,
+        )
+
+    def write(self, data):
+        pcm = np.ascontiguousarray(data, dtype=np.float32)
+        # tobytes() でコピーせず、配列のメモリをそのまま渡す
+        self._process.stdin.write(pcm.data.cast("B"))  # type: ignore[union-attr]
+
+    def close(self):
+        _, stderr = self._process.communicate()
+        if self._process.returncode != 0:
+            err_msg = stderr.decode("utf-8", errors="ignore")
+            print(f"⚠️ FFmpegエラー詳細: {err_msg}")
+            raise Exception(f"FFmpeg failed (Code: {self._process.returncode})")
+
+    def abort(self):
+        self._process.kill()
+        self._process.communicate()
+
+
+class _Encoder(abc.ABC):
+    name = ""
+    ext = ""
+
+    @abc.abstractmethod
+    def open(self, path, sr, channels):
+        """少しずつ書き足すためにファイルを開く (write() / close() / abort())"""
+
+    def encode(self, path, data, sr):
+        """1ファイルぶんの音声をまとめて書き出す"""
+        stream = self.open(path, sr, _channels(data))
+        try:
+            stream.write(data)
+        except Exception:
+            stream.abort()
+            raise
+        stream.close()
+
+
+class FlacEncoder(_Encoder):
+    name = "flac"
+    ext = ".flac"
+
+    def open(self, path, sr, channels):
+        return _SoundfileStream(path, sr, channels, format="FLAC")
+
+
+class SoundfileOpusEncoder(_Encoder):
+    """libsndfile (soundfile) で Ogg/Opus を書き出す。プロセスを起動しない"""
+
+    name = "soundfile"
+    ext = ".opus"
+
+    def __init__(self, bitrate=128000):
+        self.bitrate = bitrate
+
+    @staticmethod
+    def available():
+        """libsndfile が Ogg/Opus の書き出しに対応しているか (1.0.29 以降)"""
+        try:
+            return "OPUS" in sf.available_subtypes("OGG")
+        except Exception:
+            return False
+
+    def _compression_level(self, channels):
+        high, low = _SNDFILE_OPUS_BITRATE_RANGE
+        level = (high - self.bitrate / channels) / (high - low)
+        return min(1.0, max(0.0, level))
+
+    def open(self, path, sr, channels):
+        resampler = None
+        if sr not in OPUS_SAMPLE_RATES:
+            resampler = PolyphaseResampler(sr, 48000)
+            sr = 48000
+        return _SoundfileStream(
+            path,
+            sr,
+            channels,
+            resampler,
+            format="OGG",
+            subtype="OPUS",
+            compression_level=self._compression_level(channels),
+        )
+
+
+class FfmpegOpusEncoder(_Encoder):
+    """ffmpeg を起動して Opus にする (他に手段が無い場合の予備)"""
+
+    name = "ffmpeg"
+    ext = ".opus"
+
+    def __init__(self, ffmpeg_path, bitrate=128000):
+        self.ffmpeg_path = ffmpeg_path
+        self.bitrate = bitrate
+
+    def open(self, path, sr, channels):
+        return _FfmpegStream(self.ffmpeg_path, path, sr, channels, self.bitrate)
+
+
+def select_encoder(use_opus=True, backend="auto", ffmpeg_path=None):
+    """
+    使えるエンコーダを選ぶ。Opus は libsndfile → ffmpeg の順に試し、
+    backend ("soundfile" / "ffmpeg") を指定した場合はそれを優先する。
+    どちらも使えなければ FLAC
+    """
+    if not use_opus:
+        return FlacEncoder()
+
+    candidates = ["soundfile", "ffmpeg"]
+    if backend in candidates:
+        candidates.remove(backend)
+        candidates.insert(0, backend)
+
+    for name in candidates:
+        if name == "soundfile" and SoundfileOpusEncoder.available():
+            return SoundfileOpusEncoder()
+        if name == "ffmpeg" and ffmpeg_path:
+            return FfmpegOpusEncoder(ffmpeg_path)
+    return FlacEncoder()
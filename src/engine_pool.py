@@ -0,0 +1,164 @@
+import threading
+import time
+
+
+def normalize_endpoint(endpoint, default_port=10101):
+    """ "host", "host:port", "http://host:port" のいずれかをベースURLにする"""
+    endpoint = str(endpoint).strip().rstrip("/")
+    if "://" not in endpoint:
+        if ":" not in endpoint:
+            endpoint = f"{endpoint}:{default_port}"
+        endpoint = f"http://{endpoint}"
+    return endpoint
+
+
+class Endpoint:
+    def __init__(self, url):
+        self.url = url
+        self.healthy = True
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        # 停止中と判定したエンジンを再確認する時刻 (time.monotonic)
+        self.retry_at = 0.0
+
+
+# ─── 複数エンジンへの振り分け ────────────────
+class EnginePool:
+    """
+    複数の AivisSpeech Engine に合成リクエストを振り分ける。
+    処理中のリクエストが一番少ないエンジンを選び (least outstanding)、
+    接続できなかったエンジンは一定時間外して残りのエンジンに切り替える。
+    外したエンジンは health_interval 秒ごとに probe(url) で復帰を確認する。
+    確認はバックグラウンドのスレッドで行い、合成リクエストを待たせない。
+    """
+
+    def __init__(self, urls, probe=None, health_interval=10.0):
+        if not urls:
+            raise ValueError("EnginePool needs at least one endpoint")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.probe = probe
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._health_thread = None
+
+    @property
+    def urls(self):
+        return [ep.url for ep in self.endpoints]
+
+    @property
+    def primary(self):
+        return self.endpoints[0]
+
+    # ─── 停止中エンジンの復帰確認 (バックグラウンド) ────────────────
+    def _start_health_check(self):
+        """停止中のエンジンの確認スレッドを起こす (self._lock を持った状態で呼ぶ)"""
+        if self._health_thread is not None or self._closed.is_set():
+            return
+        self._health_thread = threading.Thread(
+            target=self._health_loop, daemon=True, name="engine-health"
+        )
+        self._health_thread.start()
+
+    def _health_loop(self):
+        """停止中のエンジンがある間だけ動き、全部復帰したら終わる"""
+        while True:
+            with self._lock:
+                waiting = [ep.retry_at for ep in self.endpoints if not ep.healthy]
+                if not waiting:
+                    self._health_thread = None
+                    return
+            delay = max(0.05, min(waiting) - time.monotonic())
+            if self._closed.wait(delay):
+                return
+            self._revive_due()
+
+    def close(self):
+        """復帰確認のスレッドを止める"""
+        self._closed.set()
+
+    def _revive_due(self):
+        """再確認の時刻を過ぎた停止中エンジンを probe で確認する"""
+        now = time.monotonic()
+        with self._lock:
+            due = [ep for ep in self.endpoints if not ep.healthy and ep.retry_at <= now]
+            for ep in due:
+                # 同時に何度も確認しないよう、先に次の時刻を入れておく
+                ep.retry_at = now + self.health_interval
+
+        for ep in due:
+            if self.probe is None or self.probe(ep.url):
+                with self._lock:
+                    ep.healthy = True
+                print(f"✅ エンジン復帰: {ep.url}")
+
+    def acquire(self, exclude=()):
+        """
+        次のリクエストを送るエンジンを選び、処理中の数を1増やす。
+        使い終わったら必ず release() すること。
+        exclude のエンジンは他に候補が無い場合だけ使う。
+        """
+        with self._lock:
+            candidates = [ep for ep in self.endpoints if ep.healthy]
+            preferred = [ep for ep in candidates if ep not in exclude]
+            if preferred:
+                candidates = preferred
+            elif not candidates:
+                # 全滅している場合は、一番早く再確認予定のエンジンに賭ける
+                candidates = sorted(self.endpoints, key=lambda ep: ep.retry_at)[:1]
+
+            # 同数なら設定の並び順 (min は先に見つかった方を返す)
+            ep = min(candidates, key=lambda ep: ep.outstanding)
+            ep.outstanding += 1
+            ep.requests += 1
+            return ep
+
+    def release(self, ep, ok=True):
+        """
+        リクエストの完了を記録する。
+        ok=False (接続できない・タイムアウト) のエンジンは一時的に外す
+        """
+        with self._lock:
+            ep.outstanding = max(0, ep.outstanding - 1)
+            if ok:
+                ep.healthy = True
+                return
+            ep.failures += 1
+            if len(self.endpoints) > 1 and ep.healthy:
+                ep.healthy = False
+                ep.retry_at = time.monotonic() + self.health_interval
+                print(f"⚠️ エンジンに接続できないため一時的に外します: {ep.url}")
+                self._start_health_check()
+
+    def has_alternative(self, exclude):
+        """exclude 以外に使える (停止中でない) エンジンがあるか"""
+        with self._lock:
+            return any(ep.healthy for ep in self.endpoints if ep not in exclude)
+
+    def check_all(self):
+        """全エンジンを probe で確認し、使えるエンジンの数を返す"""
+        results = [
+            (ep, self.probe is None or self.probe(ep.url)) for ep in self.endpoints
+        ]
+        with self._lock:
+            for ep, ok in results:
+                ep.healthy = ok
+                if not ok:
+                    ep.retry_at = time.monotonic() + self.health_interval
+            if len(self.endpoints) > 1 and not all(ok for _, ok in results):
+                self._start_health_check()
+        return sum(1 for _, ok in results if ok)
+
+    def stats(self):
+        with self._lock:
+            return [
+                {
+                    "url": ep.url,
+                    "healthy": ep.healthy,
+                    "outstanding": ep.outstanding,
+                    "requests": ep.requests,
+                    "failures": ep.failures,
+                }
+                for ep in self.endpoints
+            ]
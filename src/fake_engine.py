@@ -0,0 +1,225 @@
+"""
+AivisSpeech Engine の代わりに使うローカル疑似サーバー (テスト・ベンチマーク用)
+
+/speakers, /version, /audio_query, /synthesis, /multi_synthesis を実装し、
+テキストから決まる正弦波のWAVを返す。同じ入力には常に同じ音声を返す。
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import threading
+import time
+import wave
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+ENGINE_VERSION = "0.0.0-fake"
+
+
+def render_wav(text, sample_rate, speed=1.0, post_pause=0.0, volume=1.0):
+    """テキストから決定的なモノラル16bit WAVを作る (1文字あたり0.1秒)"""
+    seconds = max(0.1, len(text) * 0.1 / max(speed, 0.1)) + max(post_pause, 0.0)
+    n = int(sample_rate * seconds)
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    freq = 200 + digest[0] * 2
+
+    t = np.arange(n, dtype=np.float64) / sample_rate
+    samples = 0.3 * min(volume, 2.0) * np.sin(2 * np.pi * freq * t)
+    pcm = (samples * 32767).astype("<i2")
+
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    engine: "FakeEngine"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, obj, status=200):
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self._send(status, body, "application/json")
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        self.engine._count(path)
+        if path == "/speakers":
+            self._send_json(
+                [{"name": "Fake", "styles": [{"name": "ノーマル", "id": 1}]}]
+            )
+        elif path == "/version":
+            self._send_json(ENGINE_VERSION)
+        else:
+            self._send_json({"detail": "Not Found"}, status=404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        # Keep-Alive 接続を壊さないよう、未対応パスでも本文は必ず読み切る
+        body = self._read_body()
+        self.engine._count(url.path)
+
+        if url.path == "/audio_query":
+            text = params.get("text", [""])[0]
+            self.engine._sleep_for(text)
+            self._send_json(self.engine.make_query(text))
+        elif url.path == "/synthesis":
+            query = json.loads(body)
+            self.engine._sleep_for(query.get("kana", ""))
+            self._send(200, self.engine.synthesize(query), "audio/wav")
+        elif url.path == "/multi_synthesis" and self.engine.multi_synthesis:
+            queries = json.loads(body)
+            self.engine._sleep_for("".join(q.get("kana", "") for q in queries))
+            buf = io.BytesIO()
+            with zipfile.ZipFile(buf, "w") as zf:
+                for i, query in enumerate(queries):
+                    zf.writestr(f"{i + 1:03}.wav", self.engine.synthesize(query))
+            self._send(200, buf.getvalue(), "application/zip")
+        else:
+            self._send_json({"detail": "Not Found"}, status=404)
+
+
+class FakeEngine:
+    """
+    スレッドで動く疑似エンジン。port=0 なら空きポートを使う。
+
+    latency_per_char: 1文字あたりの処理時間 (秒)。エンジンの重さを真似る
+    latency_base: 文字数によらず1リクエストごとにかかる時間 (秒)
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        sample_rate=24000,
+        latency_per_char=0.0,
+        latency_base=0.0,
+        multi_synthesis=True,
+    ):
+        self.sample_rate = sample_rate
+        self.latency_per_char = latency_per_char
+        self.latency_base = latency_base
+        self.multi_synthesis = multi_synthesis
+
+        self.request_counts: dict = {}
+        self._lock = threading.Lock()
+
+        handler = type("Handler", (_Handler,), {"engine": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def host(self):
+        return self.server.server_address[0]
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def _count(self, path):
+        with self._lock:
+            self.request_counts[path] = self.request_counts.get(path, 0) + 1
+
+    def _sleep_for(self, text):
+        delay = self.latency_base + self.latency_per_char * len(text)
+        if delay > 0:
+            time.sleep(delay)
+
+    def make_query(self, text):
+        return {
+            "accent_phrases": [],
+            "speedScale": 1.0,
+            "pitchScale": 0.0,
+            "intonationScale": 1.0,
+            "volumeScale": 1.0,
+            "prePhonemeLength": 0.1,
+            "postPhonemeLength": 0.1,
+            "outputSamplingRate": self.sample_rate,
+            "outputStereo": False,
+            "kana": text,
+        }
+
+    def synthesize(self, query):
+        return render_wav(
+            query.get("kana", ""),
+            int(query.get("outputSamplingRate", self.sample_rate)),
+            speed=float(query.get("speedScale", 1.0)),
+            post_pause=float(query.get("postPhonemeLength", 0.0)),
+            volume=float(query.get("volumeScale", 1.0)),
+        )
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AivisSpeech Engine の疑似サーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=10101)
+    parser.add_argument("--sample-rate", type=int, default=24000)
+    parser.add_argument(
+        "--latency-per-char",
+        type=float,
+        default=0.0,
+        help="1文字あたりの疑似処理時間 (秒)",
+    )
+    parser.add_argument(
+        "--latency-base",
+        type=float,
+        default=0.0,
+        help="1リクエストごとの疑似処理時間 (秒)",
+    )
+    args = parser.parse_args()
+
+    engine = FakeEngine(
+        host=args.host,
+        port=args.port,
+        sample_rate=args.sample_rate,
+        latency_per_char=args.latency_per_char,
+        latency_base=args.latency_base,
+    )
+    print(f"🧪 疑似エンジン起動: {engine.url}")
+    try:
+        engine.server.serve_forever()
+    except KeyboardInterrupt:
+        engine.server.server_close()
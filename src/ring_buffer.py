@@ -0,0 +1,65 @@
+import numpy as np
+
+
+class SPSCRingBuffer:
+    """
+    書き込み側1スレッド・読み出し側1スレッド専用のリングバッファ (ロックなし)。
+    音声コールバック (読み出し側) がロック待ちで止まらないよう、
+    読み出し位置・書き込み位置はそれぞれ片側のスレッドだけが更新する。
+    位置は書き込み/読み出しの累計フレーム数で持ち、データを書いてから更新する。
+    """
+
+    def __init__(self, capacity, channels):
+        self.capacity = int(capacity)
+        self.channels = int(channels)
+        self._buf = np.zeros((self.capacity, self.channels), dtype=np.float32)
+        self._read = 0
+        self._write = 0
+
+    def readable(self):
+        """読み出せるフレーム数"""
+        return self._write - self._read
+
+    def writable(self):
+        """書き込めるフレーム数"""
+        return self.capacity - (self._write - self._read)
+
+    def write(self, frames):
+        """
+        frames (フレーム数, channels) を書ける分だけ書き、書いたフレーム数を返す。
+        書き込み側スレッドからのみ呼ぶ
+        """
+        n = min(len(frames), self.writable())
+        if n <= 0:
+            return 0
+
+        start = self._write % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start : start + first] = frames[:first]
+        if n > first:
+            self._buf[: n - first] = frames[first:n]
+
+        self._write += n
+        return n
+
+    def read_into(self, out):
+        """
+        out を先頭から埋め、読んだフレーム数を返す (足りない部分は触らない)。
+        読み出し側スレッドからのみ呼ぶ
+        """
+        n = min(len(out), self.readable())
+        if n <= 0:
+            return 0
+
+        start = self._read % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._buf[start : start + first]
+        if n > first:
+            out[first:n] = self._buf[: n - first]
+
+        self._read += n
+        return n
+
+    def discard(self):
+        """溜まっているデータを捨てる。読み出し側スレッドからのみ呼ぶ"""
+        self._read = self._write
@@ -0,0 +1,85 @@
+"""録音ファイルの保存 (エンコード・タグ付け) をバックグラウンドで行うキュー"""
+
+import concurrent.futures
+import threading
+import time
+
+
+class SaveQueue:
+    """
+    保存処理を専用のスレッドで実行し、読み上げ側を待たせないようにする。
+    workers=1 (既定) なら投入した順にファイルが書き出される。
+    ファイル名やトラック番号は投入時に決めておくので、並列にしても変わらない。
+    """
+
+    def __init__(self, workers=1):
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, int(workers)), thread_name_prefix="save"
+        )
+        self._lock = threading.Lock()
+        self._futures: set = set()
+        self.saved = 0
+        self.failed = 0
+        self.busy_sec = 0.0
+        self.max_backlog = 0
+
+    def _run(self, fn, args):
+        started = time.perf_counter()
+        result = False
+        try:
+            result = fn(*args)
+        except Exception as e:
+            print(f"⚠️ 保存失敗: {e}")
+        finally:
+            with self._lock:
+                self.busy_sec += time.perf_counter() - started
+                # None は「ファイル単位の結果ではない」処理 (書き足しの途中など)
+                if result is True:
+                    self.saved += 1
+                elif result is False:
+                    self.failed += 1
+        return result
+
+    def _done(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def submit(self, fn, *args):
+        """
+        fn(*args) を保存スレッドで実行する。fn は1ファイルの保存を終えたら True、
+        失敗したら False を返す (例外も失敗として数える)。
+        戻り値は fn の結果を持つ concurrent.futures.Future
+        """
+        with self._lock:
+            future = self.executor.submit(self._run, fn, args)
+            self._futures.add(future)
+            self.max_backlog = max(self.max_backlog, len(self._futures))
+        future.add_done_callback(self._done)
+        return future
+
+    def backlog(self):
+        """保存待ち (実行中を含む) の件数"""
+        with self._lock:
+            return len(self._futures)
+
+    def flush(self, timeout=None):
+        """それまでに投入した保存がすべて終わるまで待つ。終わっていれば True"""
+        with self._lock:
+            futures = list(self._futures)
+        _, not_done = concurrent.futures.wait(futures, timeout=timeout)
+        return not not_done
+
+    def shutdown(self):
+        """保存待ちをすべて書き出してからスレッドを止める"""
+        self.flush()
+        self.executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backlog": len(self._futures),
+                "max_backlog": self.max_backlog,
+                "saved": self.saved,
+                "failed": self.failed,
+                "busy_sec": self.busy_sec,
+            }
@@ -0,0 +1,191 @@
+"""合成した行ごとの音声を1本の音声につなぐ (行の継ぎ目のクロスフェード)"""
+
+import numpy as np
+
+from audio_dsp import apply_fade_in, apply_fade_out, match_channels, resample
+
+
+class SegmentAssembler:
+    """
+    行ごとの音声を、あらかじめ確保したバッファに順に書き込んで1本にする。
+    行の継ぎ目は crossfade_ms だけ重ねてクロスフェードする (音量の落ち込みも隙間も出ない)。
+    gap_ms を指定した場合は重ねずに、フェードアウト → 無音 → フェードインでつなぐ。
+    全体の先頭と末尾はクリックノイズ対策としてフェードする。
+
+    add() / finish() は「もう書き換えない部分」を返すので、そのまま再生に回せる。
+    次の行と重ねるため、各行の末尾 crossfade_ms 分は次の行が届くまで保留する。
+    retain=False なら返した部分は手元に残さない (audio は使えず、メモリは行数に比例しない)。
+    """
+
+    def __init__(self, crossfade_ms=30, gap_ms=0, expected_sec=0.0, retain=True):
+        self.crossfade_ms = max(0, crossfade_ms)
+        self.gap_ms = max(0, gap_ms)
+        self.expected_sec = expected_sec
+        self.retain = retain
+        self.sample_rate = 0
+        self.channels = 0
+        self.joins = 0
+        self.reallocations = 0
+        self._buf = np.zeros(0, dtype=np.float32)
+        self._fade = 0
+        self._length = 0
+        self._released = 0
+        # retain=False で捨てたフレーム数
+        self._dropped = 0
+        # 現在の行の開始位置と、まだフェードインしていない行頭 (無ければ None)
+        self._line_start = 0
+        self._fade_in_at = None
+        # 重ねる長さに届くまで溜めておく新しい行の先頭 (ストリーミングの短いブロック)
+        self._head: list = []
+
+    @property
+    def audio(self):
+        """ここまでにつないだ音声 (バッファのビュー)"""
+        if not self.retain:
+            raise RuntimeError("SegmentAssembler(retain=False) does not keep audio")
+        return self._buf[: self._length]
+
+    @property
+    def total_frames(self):
+        """ここまでにつないだフレーム数"""
+        return self._dropped + self._length
+
+    def _allocate(self, data, sr):
+        self.sample_rate = sr
+        self.channels = 1 if data.ndim == 1 else data.shape[1]
+        self._fade = int(sr * self.crossfade_ms / 1000)
+
+        expected = int(sr * self.expected_sec) if self.retain else 0
+        capacity = max(len(data), expected)
+        shape = (capacity,) if data.ndim == 1 else (capacity, self.channels)
+        self._buf = np.zeros(shape, dtype=np.float32)
+
+    def _reserve(self, frames):
+        """frames フレーム書き足せるようにする (足りなければ倍に広げる)"""
+        needed = self._length + frames
+        if needed <= len(self._buf):
+            return
+
+        # 返した部分を残さない場合は、まだ返していない部分だけを新しいバッファに移す
+        # (返したビューはまだ再生・保存で使われているので、古いバッファは書き換えない)
+        start = 0 if self.retain else self._released
+        kept = self._length - start
+        capacity = max(kept + frames, len(self._buf) * (2 if self.retain else 1))
+        grown = np.zeros((capacity,) + self._buf.shape[1:], dtype=np.float32)
+        grown[:kept] = self._buf[start : self._length]
+        self._buf = grown
+        self.reallocations += 1
+
+        if start:
+            self._dropped += start
+            self._length -= start
+            self._released -= start
+            self._line_start = max(0, self._line_start - start)
+            if self._fade_in_at is not None:
+                self._fade_in_at -= start
+
+    def _conform(self, data, sr):
+        """途中で形式の違う音声が来た場合は最初の行に揃える"""
+        if sr != self.sample_rate:
+            data = resample(data, sr, self.sample_rate)
+        channels = 1 if data.ndim == 1 else data.shape[1]
+        if channels != self.channels or data.ndim != self._buf.ndim:
+            data = match_channels(data, self.channels)
+            data = data.reshape((-1,) + self._buf.shape[1:])
+        return data
+
+    def _append(self, data):
+        self._reserve(len(data))
+        self._buf[self._length : self._length + len(data)] = data
+        self._length += len(data)
+
+    def _apply_pending_fade_in(self, force=False):
+        """行頭のフェードインを、フェード分が揃った時点 (force なら今ある分) でかける"""
+        start = self._fade_in_at
+        if start is None:
+            return
+        available = self._length - start
+        if available < self._fade and not force:
+            return
+        apply_fade_in(self._buf[start : self._length], min(self._fade, available))
+        self._fade_in_at = None
+
+    def _fade_out_line_end(self):
+        """現在の行の末尾をフェードアウトする"""
+        n = min(self._fade, self._length - self._line_start)
+        apply_fade_out(self._buf[self._length - n : self._length], n)
+
+    def _join(self, data):
+        """前の行に data (新しい行の先頭) をつなぐ"""
+        self._apply_pending_fade_in(force=True)
+        self.joins += 1
+
+        if self.gap_ms > 0:
+            self._fade_out_line_end()
+            self._append(
+                np.zeros(
+                    (int(self.sample_rate * self.gap_ms / 1000),) + data.shape[1:],
+                    dtype=np.float32,
+                )
+            )
+            self._line_start = self._length
+            self._fade_in_at = self._length
+            self._append(data)
+            return
+
+        # 前の行の末尾と新しい行の先頭を同じ長さだけ重ねる (線形の曲線は足すと1)
+        n = min(self._fade, self._length - self._line_start, len(data))
+        tail = self._buf[self._length - n : self._length]
+        apply_fade_out(tail, n)
+        tail += apply_fade_in(data[:n].astype(np.float32, copy=True), n)
+        self._line_start = self._length - n
+        self._append(data[n:])
+
+    def _flush_head(self):
+        if self._head:
+            head = self._head[0] if len(self._head) == 1 else np.concatenate(self._head)
+            self._head = []
+            self._join(head)
+
+    def _release(self, end):
+        end = max(self._released, end)
+        ready = self._buf[self._released : end]
+        self._released = end
+        return ready
+
+    def add(self, data, sr, new_line=True):
+        """
+        音声を書き足し、再生してよくなった部分を返す。
+        ストリーミング中の行は、2ブロック目以降を new_line=False で渡す
+        """
+        if len(data) == 0:
+            return self._buf[:0]
+
+        if self.sample_rate == 0:
+            self._allocate(data, sr)
+            self._fade_in_at = 0
+            self._append(data)
+        else:
+            data = self._conform(data, sr)
+            if new_line:
+                self._flush_head()
+                self._head = [data]
+            elif self._head:
+                self._head.append(data)
+            else:
+                self._append(data)
+            if sum(len(block) for block in self._head) >= self._fade:
+                self._flush_head()
+
+        self._apply_pending_fade_in()
+        end = self._length - self._fade
+        if self._fade_in_at is not None:
+            end = min(end, self._fade_in_at)
+        return self._release(end)
+
+    def finish(self):
+        """末尾をフェードアウトし、残りをすべて返す"""
+        self._flush_head()
+        self._apply_pending_fade_in(force=True)
+        self._fade_out_line_end()
+        return self._release(self._length)
@@ -0,0 +1,256 @@
+import abc
+import collections
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+
+def normalize_text(text):
+    """キャッシュキー用に行テキストを正規化する (Unicode正規化 + 空白の統一)"""
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _hash_key(payload):
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ─── ディスク保存型 LRU キャッシュ (共通部分) ────────────────
+class DiskLRUCache(abc.ABC):
+    """
+    1エントリ = 1ファイルで cache_dir に保存するキャッシュ。
+    合計サイズが上限を超えたら、最後に使われたのが古い順に削除する。
+    保存形式はサブクラスの _read / _write で決める。
+    """
+
+    FILE_EXT = ".bin"
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # key -> ファイルサイズ (先頭ほど古い)
+        self._entries: collections.OrderedDict[str, int] = collections.OrderedDict()
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._load_index()
+
+    def _load_index(self):
+        """既存のキャッシュファイルを最終アクセス順に読み込む"""
+        found = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith(self.FILE_EXT):
+                continue
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            found.append((st.st_mtime, filename[: -len(self.FILE_EXT)], st.st_size))
+
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.total_bytes += size
+
+        self._evict()
+
+    @abc.abstractmethod
+    def _read(self, path):
+        """ファイルから値を読む"""
+
+    @abc.abstractmethod
+    def _write(self, f, value):
+        """値をファイル (バイナリ) に書く"""
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + self.FILE_EXT)
+
+    def _load(self, key):
+        """キャッシュがあれば値を返す。なければ None"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+
+        path = self._path(key)
+        try:
+            value = self._read(path)
+            # 最終アクセス時刻を更新 (再起動後もLRU順を保つため)
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            # 壊れたファイルは捨ててミス扱い
+            with self._lock:
+                self._drop(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+        return value
+
+    def _store(self, key, value):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                self._write(f, value)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"⚠️ キャッシュ書き込みエラー: {e}")
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)
+            self._entries[key] = size
+            self.total_bytes += size
+            self._evict()
+
+    def _drop(self, key):
+        size = self._entries.pop(key, None)
+        if size is None:
+            return
+        self.total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# ─── 合成結果キャッシュ ────────────────
+class SynthCache(DiskLRUCache):
+    """
+    合成済みPCMを「テキスト + 話者 + 合成パラメータ + エンジンバージョン」の
+    ハッシュをキーにして保存するキャッシュ。値は (data, sr)。
+    """
+
+    FILE_EXT = ".npz"
+
+    @staticmethod
+    def make_key(text, speaker_id, params, engine_version):
+        return _hash_key(
+            {
+                "text": normalize_text(text),
+                "speaker": speaker_id,
+                "params": params,
+                "engine": engine_version,
+            }
+        )
+
+    def _read(self, path):
+        with np.load(path) as f:
+            return f["data"], int(f["sr"])
+
+    def _write(self, f, value):
+        data, sr = value
+        np.savez(f, data=data, sr=np.int64(sr))
+
+    def get(self, key):
+        """キャッシュがあれば (data, sr) を返す。なければ None"""
+        return self._load(key)
+
+    def put(self, key, data, sr):
+        self._store(key, (data, sr))
+
+
+# ─── audio_query キャッシュ ────────────────
+class QueryCache(DiskLRUCache):
+    """
+    /audio_query の結果 (アクセント・音素解析) を「テキスト + 話者 + エンジンバージョン」
+    で保存するキャッシュ。話速などのスライダー値はキーに含めないので、
+    パラメータを変えて読み直しても /synthesis だけで済む。
+    ディスクの手前にメモリ上のLRUを持つ。
+    """
+
+    FILE_EXT = ".json"
+
+    def __init__(self, cache_dir, max_bytes, memory_entries=256):
+        self.memory_entries = memory_entries
+        self._memory: collections.OrderedDict[str, str] = collections.OrderedDict()
+        super().__init__(cache_dir, max_bytes)
+
+    @staticmethod
+    def make_key(text, speaker_id, engine_version):
+        return _hash_key(
+            {
+                "text": normalize_text(text),
+                "speaker": speaker_id,
+                "engine": engine_version,
+            }
+        )
+
+    def _read(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _write(self, f, value):
+        f.write(value.encode("utf-8"))
+
+    def _remember(self, key, raw):
+        with self._lock:
+            self._memory[key] = raw
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """クエリ (dict) を返す。呼び出し側で書き換えてよいよう毎回新しく作る"""
+        with self._lock:
+            raw = self._memory.get(key)
+            if raw is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+
+        if raw is None:
+            raw = self._load(key)
+            if raw is None:
+                return None
+            self._remember(key, raw)
+
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def put(self, key, query):
+        raw = json.dumps(query, ensure_ascii=False)
+        self._remember(key, raw)
+        self._store(key, raw)
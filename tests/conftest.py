@@ -1,6 +1,9 @@
 import os
+import struct
 import sys
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
+
+import pytest
 
 # Add src directory to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
@@ -12,3 +15,52 @@ sys.modules["pyperclip"] = MagicMock()
 sys.modules["keyboard"] = MagicMock()
 
 # Mock ConfigManager if needed (can be imported after modules are mocked)
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path):
+    """Keep synthesis caches out of the project root during tests"""
+    import aivis_reader
+
+    with patch.dict(aivis_reader.cfg.data, {"cache_dir": str(tmp_path / "cache")}):
+        yield
+
+
+@pytest.fixture
+def write_flac():
+    """Return a writer for metadata-only FLAC files (STREAMINFO, no audio frames)"""
+
+    def write(path, total_samples=0):
+        info = struct.pack(">HH", 4096, 4096) + b"\0" * 6
+        info += ((24000 << 44) | (15 << 36) | total_samples).to_bytes(8, "big")
+        info += b"\0" * 16
+        path.write_bytes(b"fLaC\x80" + len(info).to_bytes(3, "big") + info)
+
+    return write
+
+
+@pytest.fixture
+def write_opus():
+    """Return a writer for minimal Ogg/Opus streams with empty tags and one packet"""
+    # mutagen is optional, so only the tests that write Opus files import it
+    from mutagen.ogg import OggPage
+
+    def write(path, finished=True):
+        packets = [
+            b"OpusHead\x01\x01" + struct.pack("<HIhB", 312, 48000, 0, 0),
+            b"OpusTags" + struct.pack("<I", 4) + b"test" + struct.pack("<I", 0),
+            b"\xf8\xff\xfe",
+        ]
+        data = b""
+        for sequence, packet in enumerate(packets):
+            page = OggPage()
+            page.packets = [packet]
+            page.serial = 1
+            page.sequence = sequence
+            page.position = 960 if sequence == 2 else 0
+            page.first = sequence == 0
+            page.last = finished and sequence == 2
+            data += page.write()
+        path.write_bytes(data)
+
+    return write
@@ -0,0 +1,184 @@
+import sqlite3
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+import aivis_reader
+from aivis_reader import AivisSynthesizer, TaskManager
+from archive_index import ArchiveIndex
+from archive_manifest import DayManifest
+
+PARAMS = {"speedScale": 1.0, "pitchScale": 0.0}
+VERSION = "1.0.0"
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = ArchiveIndex(str(tmp_path / "index.sqlite3"))
+    yield idx
+    idx.close()
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"")
+    return str(path)
+
+
+class TestArchiveIndex:
+    def test_search_full_text(self, index, tmp_path):
+        """Test that any part of the spoken text finds the file, newest first"""
+        a = _touch(tmp_path / "240101" / "a.flac")
+        b = _touch(tmp_path / "240102" / "b.flac")
+        index.add(a, "今日は晴れのち曇りでしょう。", day="240101", track=1)
+        index.add(b, "明日の天気は晴れです。", day="240102", track=1)
+
+        assert [r["path"] for r in index.search("晴れ")] == [b, a]
+        assert [r["path"] for r in index.search("のち曇り")] == [a]
+        assert index.search("雪が降る") == []
+        # Short queries fall back to substring matching
+        assert [r["path"] for r in index.search("曇")] == [a]
+
+    def test_search_filters_by_day(self, index, tmp_path):
+        """Test that a date prefix narrows the results"""
+        a = _touch(tmp_path / "231231" / "a.flac")
+        b = _touch(tmp_path / "240101" / "b.flac")
+        index.add(a, "ニュースの読み上げ", day="231231", track=1)
+        index.add(b, "ニュースの読み上げ", day="240101", track=1)
+
+        assert [r["path"] for r in index.search("ニュース", day="2401")] == [b]
+
+    def test_re_adding_a_path_replaces_it(self, index, tmp_path):
+        """Test that the same file is indexed once with the latest text"""
+        a = _touch(tmp_path / "a.flac")
+        index.add(a, "古い文章です", day="240101", track=1)
+        index.add(a, "新しい文章です", day="240101", track=1)
+
+        assert index.count() == 1
+        assert index.search("古い文章") == []
+        assert index.search("新しい文章")[0]["text"] == "新しい文章です"
+
+    def test_find_audio_requires_same_settings(self, index, tmp_path):
+        """Test that archived audio is reused only for identical settings"""
+        a = _touch(tmp_path / "a.flac")
+        index.add(a, "おはよう", speaker_id=1, params=PARAMS, engine_version=VERSION)
+
+        reordered = dict(reversed(PARAMS.items()))
+        assert index.find_audio("おはよう", 1, reordered, VERSION) == a
+        assert index.find_audio("おはよう", 2, PARAMS, VERSION) is None
+        faster = {**PARAMS, "speedScale": 1.2}
+        assert index.find_audio("おはよう", 1, faster, VERSION) is None
+        assert index.find_audio("おはよう", 1, PARAMS, "2.0.0") is None
+
+        (tmp_path / "a.flac").unlink()
+        assert index.find_audio("おはよう", 1, PARAMS, VERSION) is None
+
+    def test_old_index_gains_engine_version(self, tmp_path):
+        """Test that an index created before engine versions were stored still opens"""
+        db_path = tmp_path / "old.sqlite3"
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(
+                "CREATE TABLE recordings (id INTEGER PRIMARY KEY,"
+                " path TEXT NOT NULL UNIQUE, day TEXT, track INTEGER,"
+                " text TEXT NOT NULL, speaker_id INTEGER, params TEXT,"
+                " duration REAL, saved_at TEXT, mtime REAL, source TEXT NOT NULL)"
+            )
+        conn.close()
+
+        index = ArchiveIndex(str(db_path))
+        a = _touch(tmp_path / "a.flac")
+        index.add(a, "おはよう", speaker_id=1, params=PARAMS, engine_version=VERSION)
+        assert index.find_audio("おはよう", 1, PARAMS, VERSION) == a
+        index.close()
+
+    def test_rename_moves_entry(self, index, tmp_path):
+        """Test that a transcoded file keeps its text and settings"""
+        a = _touch(tmp_path / "a.flac")
+        index.add(a, "おはよう", speaker_id=1, params=PARAMS, engine_version=VERSION)
+        b = _touch(tmp_path / "a.opus")
+        (tmp_path / "a.flac").unlink()
+
+        index.rename(a, b)
+        assert index.count() == 1
+        assert index.find_audio("おはよう", 1, PARAMS, VERSION) == b
+        assert index.search("おはよう")[0]["path"] == b
+
+    def test_backfill_reads_tags_and_manifest(self, index, tmp_path):
+        """Test that existing files are imported and vanished ones dropped"""
+        day_dir = tmp_path / "240101"
+        day_dir.mkdir()
+        _touch(day_dir / "a.flac")
+        _touch(day_dir / "b.opus")
+        _touch(tmp_path / "cover.jpg")
+        manifest = DayManifest(str(day_dir))
+        manifest.reserve("b.opus", params={"speaker_id": 7, **PARAMS})
+
+        tags = {
+            "a.flac": (1, "最初の読み上げ", 1.5),
+            "b.opus": (2, "二つ目の読み上げ", None),
+        }
+        with patch(
+            "archive_index.read_tags", side_effect=lambda p: tags[p[-6:]]
+        ) as reader:
+            assert index.backfill(str(tmp_path)) == (2, 0)
+            # Unchanged files are not read again
+            assert index.backfill(str(tmp_path)) == (0, 0)
+            assert reader.call_count == 2
+
+        record = index.search("二つ目")[0]
+        assert (record["speaker_id"], record["params"]) == (7, PARAMS)
+        assert record["source"] == "backfill"
+        # Backfilled titles are not exact, so they never stand in for synthesis
+        assert index.find_audio("二つ目の読み上げ", 7, PARAMS, None) is None
+
+        (day_dir / "a.flac").unlink()
+        assert index.backfill(str(tmp_path)) == (0, 1)
+        assert index.search("最初の") == []
+
+
+class TestSynthesizerArchiveIndex:
+    @patch("aivis_reader.sf.read")
+    def test_saved_reading_is_replayed(self, mock_read, tmp_path):
+        """Test that a whole saved reading plays from its file without synthesis"""
+        mock_read.return_value = (np.ones(800, dtype=np.float32), 8000)
+        overrides = {
+            "dropbox_dir": str(tmp_path),
+            "output_dir": "logs",
+            "override_date": "240101",
+            "dictionary": {},
+            "require_hiragana": False,
+            "min_length": 1,
+        }
+        with patch.dict(aivis_reader.cfg.data, overrides):
+            synth = AivisSynthesizer()
+            synth.get_engine_version = MagicMock(return_value=VERSION)
+            synth._request = MagicMock()
+
+            job = synth._prepare_log_job("保存済みの文章。続きの文です。")
+            _touch(Path(job["filepath"]))
+            synth._record_log_result(job, "saved", 0.1)
+
+            player = MagicMock()
+            manager = TaskManager(synth, player)
+            manager.add_text("保存済みの文章。続きの文です。")
+            manager.task_queue.join()
+            results = synth.search_archive("保存済み")
+
+            # Only the whole reading matches, not one of its lines or sentences
+            assert synth.find_saved_reading("保存済みの文章。") is None
+            # A different engine version no longer matches the saved file
+            synth.get_engine_version.return_value = "2.0.0"
+            assert synth.find_saved_reading("保存済みの文章。続きの文です。") is None
+            records = job["manifest"].records()
+            synth.shutdown()
+
+        synth._request.assert_not_called()
+        data, sr = player.enqueue.call_args.args
+        assert sr == 8000 and len(data) == 800
+        player.enqueue.assert_called_once()
+        # Nothing new is saved and the lossy audio never enters the synth cache
+        assert [r["status"] for r in records] == ["saved"]
+        assert synth.cache.total_bytes == 0
+        assert [r["track"] for r in results] == [1]
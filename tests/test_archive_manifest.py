@@ -0,0 +1,113 @@
+import json
+import threading
+
+from archive_manifest import MANIFEST_NAME, DayManifest
+
+
+class TestDayManifest:
+    def test_reserve_numbers_in_order(self, tmp_path):
+        """Test that reservations get consecutive numbers and are persisted"""
+        manifest = DayManifest(str(tmp_path))
+        assert manifest.reserve("a.flac", "一つ目") == 1
+        assert manifest.reserve("b.flac", "二つ目") == 2
+
+        manifest.finish(1, "saved", duration=1.5)
+        records = DayManifest(str(tmp_path)).records()
+        assert [r["track"] for r in records] == [1, 2]
+        assert records[0]["status"] == "saved"
+        assert records[0]["duration"] == 1.5
+        assert records[0]["filename"] == "a.flac"
+        assert records[1]["status"] == "reserved"
+
+    def test_discarded_last_number_is_reused(self, tmp_path):
+        """Test that a discarded reservation at the end frees its number"""
+        manifest = DayManifest(str(tmp_path))
+        manifest.reserve("a.flac")
+        manifest.reserve("b.flac")
+        manifest.finish(2, "discarded")
+        assert manifest.reserve("c.flac") == 2
+
+        # A released number in the middle is not handed out again
+        manifest.finish(1, "failed")
+        assert manifest.reserve("d.flac") == 3
+
+    def test_concurrent_reservations_are_unique(self, tmp_path):
+        """Test that threads using separate instances never share a number"""
+        numbers = []
+        lock = threading.Lock()
+
+        def worker():
+            manifest = DayManifest(str(tmp_path))
+            for _ in range(10):
+                track = manifest.reserve("x.flac")
+                with lock:
+                    numbers.append(track)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sorted(numbers) == list(range(1, 41))
+
+    def test_picks_up_records_from_other_instance(self, tmp_path):
+        """Test that lines appended by another process are read before reserving"""
+        first = DayManifest(str(tmp_path))
+        second = DayManifest(str(tmp_path))
+        assert first.reserve("a.flac") == 1
+        assert second.reserve("b.flac") == 2
+        assert first.reserve("c.flac") == 3
+
+    def test_reloads_after_other_instance_rewrites(self, tmp_path):
+        """Test that a manifest rewritten elsewhere is read again from the start"""
+        first = DayManifest(str(tmp_path))
+        second = DayManifest(str(tmp_path))
+        for name in ("a.flac", "b.flac", "c.flac"):
+            first.reserve(name)
+        assert len(second.records()) == 3
+
+        first.renumber({"c.flac": 1, "a.flac": 2})
+        first.reserve("d.flac")
+        records = second.records()
+        assert [(r["track"], r["filename"]) for r in records] == [
+            (1, "c.flac"),
+            (2, "a.flac"),
+            (3, "d.flac"),
+        ]
+        assert second.reserve("e.flac") == 4
+
+    def test_rebuilds_from_existing_files(self, tmp_path):
+        """Test that a missing manifest is rebuilt from files in filename order"""
+        (tmp_path / "240101090000_a.flac").write_bytes(b"")
+        (tmp_path / "240101100000_b.opus").write_bytes(b"")
+        (tmp_path / "notes.txt").write_bytes(b"")
+
+        manifest = DayManifest(str(tmp_path))
+        assert manifest.reserve("c.flac") == 3
+        records = manifest.records()
+        assert [r["filename"] for r in records[:2]] == [
+            "240101090000_a.flac",
+            "240101100000_b.opus",
+        ]
+        assert all(r["rebuilt"] for r in records[:2])
+
+        # Deleting the manifest and rebuilding keeps the existing files only
+        (tmp_path / MANIFEST_NAME).unlink()
+        manifest.rebuild()
+        assert len(manifest.records()) == 2
+
+    def test_ignores_partial_last_line(self, tmp_path):
+        """Test that a half-written line does not break loading"""
+        path = tmp_path / MANIFEST_NAME
+        path.write_text(
+            json.dumps({"track": 1, "filename": "a.flac", "status": "saved"})
+            + '\n{"track": 2, "fil',
+            encoding="utf-8",
+        )
+        manifest = DayManifest(str(tmp_path))
+        assert [r["track"] for r in manifest.records()] == [1]
+
+        # The next record starts on a fresh line and survives a reload
+        assert manifest.reserve("b.flac") == 2
+        assert [r["track"] for r in DayManifest(str(tmp_path)).records()] == [1, 2]
@@ -0,0 +1,103 @@
+import os
+
+import pytest
+from mutagen.flac import FLAC
+from mutagen.oggopus import OggOpus
+from PIL import Image
+
+from archive_manifest import DayManifest
+from archive_retag import plan_retag, run_retag
+
+
+@pytest.fixture
+def archive(tmp_path, write_flac, write_opus):
+    day_dir = tmp_path / "240101"
+    day_dir.mkdir()
+    write_flac(day_dir / "240101090000_a.flac")
+    write_opus(day_dir / "240101100000_b.opus")
+    write_flac(tmp_path / "loose.flac")
+    return tmp_path
+
+
+class TestBulkRetag:
+    def test_plan_covers_tree_and_renumbers_day_folders(self, archive):
+        """Test that album and track tags apply only inside dated folders"""
+        jobs = dict(plan_retag(str(archive), "Artist", "Log", renumber=True))
+
+        assert jobs[str(archive / "loose.flac")] == {"artist": "Artist"}
+        assert jobs[str(archive / "240101" / "240101100000_b.opus")] == {
+            "artist": "Artist",
+            "album": "Log_240101",
+            "tracknumber": "2",
+        }
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_retag_writes_once_then_skips(self, archive, workers):
+        """Test that matching files are left untouched on a second run"""
+        cover = archive / "cover.png"
+        Image.new("RGB", (8, 8)).save(cover)
+        jobs = plan_retag(str(archive), "Artist", "Log", renumber=True)
+
+        first = run_retag(jobs, artwork_path=str(cover), workers=workers)
+        assert (first["updated"], first["failed"]) == (3, 0)
+        assert first["changes"]["artwork"] == 3
+
+        flac = FLAC(archive / "240101" / "240101090000_a.flac")
+        assert flac["album"] == ["Log_240101"]
+        assert flac.pictures[0].data == cover.read_bytes()
+        opus = OggOpus(archive / "240101" / "240101100000_b.opus")
+        assert opus["tracknumber"] == ["2"]
+        assert opus["artist"] == ["Artist"]
+        assert "metadata_block_picture" in opus
+
+        mtimes = {path: os.path.getmtime(path) for path, _ in jobs}
+        second = run_retag(jobs, artwork_path=str(cover), workers=workers)
+        assert (second["updated"], second["unchanged"]) == (0, 3)
+        assert {path: os.path.getmtime(path) for path, _ in jobs} == mtimes
+
+    def test_dry_run_changes_nothing(self, archive):
+        """Test that a dry run reports changes without saving them"""
+        jobs = plan_retag(str(archive), artist="Artist")
+        before = {path: open(path, "rb").read() for path, _ in jobs}
+
+        summary = run_retag(jobs, workers=1, dry_run=True)
+        assert summary["updated"] == 3
+        assert {path: open(path, "rb").read() for path, _ in jobs} == before
+
+    def test_renumber_updates_manifest(self, archive):
+        """Test that renumbering rewrites the day manifest to match the tags"""
+        day_dir = archive / "240101"
+        manifest = DayManifest(str(day_dir))
+        # The manifest already holds both files under other numbers
+        manifest.records()
+        manifest.reserve("240101100000_b.opus", "二つ目")
+        manifest.reserve("discarded.flac")
+        manifest.finish(4, "discarded")
+
+        run_retag(plan_retag(str(archive), renumber=True), workers=1)
+
+        records = DayManifest(str(day_dir)).records()
+        assert [(r["track"], r["filename"]) for r in records] == [
+            (1, "240101090000_a.flac"),
+            (2, "240101100000_b.opus"),
+        ]
+        assert records[1]["text_hash"] is not None
+
+    def test_failed_file_keeps_manifest(self, archive):
+        """Test that a day with a failed retag keeps its manifest numbering"""
+        day_dir = archive / "240101"
+        (day_dir / "240101080000_broken.flac").write_bytes(b"not audio")
+        before = DayManifest(str(day_dir)).records()
+        assert len(before) == 3
+
+        summary = run_retag(plan_retag(str(archive), renumber=True), workers=1)
+        assert summary["failed"] == 1
+        assert DayManifest(str(day_dir)).records() == before
+
+    def test_unreadable_file_is_reported(self, tmp_path, write_flac):
+        """Test that a corrupt file counts as a failure without stopping the run"""
+        (tmp_path / "broken.flac").write_bytes(b"not audio")
+        write_flac(tmp_path / "ok.flac")
+
+        summary = run_retag(plan_retag(str(tmp_path), artist="A"), workers=1)
+        assert (summary["updated"], summary["failed"]) == (1, 1)
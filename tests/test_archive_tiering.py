@@ -0,0 +1,241 @@
+import base64
+import datetime
+import io
+import os
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from mutagen.flac import FLAC, Picture
+from mutagen.oggopus import OggOpus
+from PIL import Image
+
+import aivis_reader
+from archive_manifest import DayManifest
+from archive_tiering import ArchiveTiering
+from artwork_cache import ArtworkCache
+
+TODAY = datetime.date(2024, 1, 20)
+
+
+class FakeEncoder:
+    """Writes a minimal Opus stream when closed (stands in for libopus)"""
+
+    ext = ".opus"
+
+    def __init__(self, write_opus, finished=True):
+        self.write_opus = write_opus
+        self.finished = finished
+
+    def open(self, path, samplerate, channels):
+        stream = MagicMock()
+        stream.close.side_effect = lambda: self.write_opus(
+            Path(path), finished=self.finished
+        )
+        return stream
+
+
+@pytest.fixture
+def encoder(write_opus):
+    return lambda finished=True: FakeEncoder(write_opus, finished)
+
+
+@pytest.fixture
+def fake_audio():
+    """Every file is 960 frames at 48 kHz and decodes completely"""
+    sf = MagicMock()
+    sf.info.return_value = SimpleNamespace(samplerate=48000, channels=1)
+    sf.blocks.side_effect = lambda *a, **k: iter([[0.0] * 960])
+    with (
+        patch("archive_tiering.sf", sf),
+        patch("archive_tiering.decode_frames", return_value=960) as decode,
+    ):
+        yield decode
+
+
+@pytest.fixture
+def saved_flac(write_flac):
+    """Return a writer for tagged FLAC files with cover art, as saved by the reader"""
+
+    def write(day_dir, name, track, cover=b"cover", audio_bytes=65536):
+        day_dir.mkdir(exist_ok=True)
+        path = day_dir / name
+        write_flac(path, total_samples=960)
+        audio = FLAC(path)
+        audio["title"] = ["本文"]
+        audio["tracknumber"] = [str(track)]
+        picture = Picture()
+        picture.data = cover
+        audio.add_picture(picture)
+        audio.save()
+        # Stand-in for the audio frames, which make up most of a real file
+        with open(path, "ab") as f:
+            f.write(b"\0" * audio_bytes)
+        return path
+
+    return write
+
+
+class TestArchiveTiering:
+    def test_candidates_are_old_flac_only(
+        self, tmp_path, saved_flac, write_flac, write_opus, encoder
+    ):
+        """Test that only FLAC files in day folders older than the cut-off qualify"""
+        old = saved_flac(tmp_path / "240101", "240101090000_a.flac", 1)
+        saved_flac(tmp_path / "240118", "240118090000_b.flac", 1)
+        write_opus(tmp_path / "240101" / "240101100000_c.opus")
+        write_flac(tmp_path / "loose.flac")
+
+        tiering = ArchiveTiering(str(tmp_path), encoder(), min_age_days=7)
+        assert tiering.candidates(TODAY) == [str(old)]
+
+    def test_transcode_keeps_tags_and_updates_manifest(
+        self, tmp_path, fake_audio, saved_flac, encoder
+    ):
+        """Test that the Opus copy replaces the FLAC with tags, mtime and manifest"""
+        day_dir = tmp_path / "240101"
+        src = saved_flac(day_dir, "240101090000_a.flac", 1)
+        os.utime(src, (1_700_000_000, 1_700_000_000))
+        # The manifest is rebuilt from the existing file as track 1
+        DayManifest(str(day_dir)).records()
+        moved = []
+
+        tiering = ArchiveTiering(
+            str(tmp_path),
+            encoder(),
+            min_age_days=7,
+            duty=1.0,
+            on_moved=lambda old, new: moved.append((old, new)),
+        )
+        stats = tiering.run_once(TODAY)
+
+        dst = day_dir / "240101090000_a.opus"
+        assert stats["converted"] == 1
+        assert not src.exists()
+        assert sorted(os.listdir(day_dir)) == [".manifest.jsonl", dst.name]
+        opus = OggOpus(dst)
+        assert opus["title"] == ["本文"]
+        assert opus["tracknumber"] == ["1"]
+        assert "metadata_block_picture" in opus
+        assert os.path.getmtime(dst) == 1_700_000_000
+        assert moved == [(str(src), str(dst))]
+        records = DayManifest(str(day_dir)).records()
+        assert [(r["track"], r["filename"]) for r in records] == [(1, dst.name)]
+
+    def test_failed_verification_keeps_original(
+        self, tmp_path, fake_audio, saved_flac, encoder
+    ):
+        """Test that a short or unfinished encode leaves the FLAC in place"""
+        src = saved_flac(tmp_path / "240101", "240101090000_a.flac", 1)
+        fake_audio.return_value = 96000
+
+        tiering = ArchiveTiering(str(tmp_path), encoder(), 7, duty=1.0)
+        assert tiering.run_once(TODAY)["failed"] == 1
+        assert os.listdir(src.parent) == [src.name]
+        # Not retried during the same session
+        assert tiering.candidates(TODAY) == []
+
+        fake_audio.return_value = 960
+        tiering = ArchiveTiering(str(tmp_path), encoder(finished=False), 7)
+        assert tiering.run_once(TODAY)["failed"] == 1
+        assert src.exists()
+
+    def test_waits_while_busy_and_stops(
+        self, tmp_path, fake_audio, saved_flac, encoder
+    ):
+        """Test that nothing is converted while busy and stop() ends the wait"""
+        src = saved_flac(tmp_path / "240101", "240101090000_a.flac", 1)
+        tiering = ArchiveTiering(
+            str(tmp_path), encoder(), 7, is_busy=lambda: True, interval=0
+        )
+        tiering.start()
+        tiering.stop(timeout=5.0)
+
+        assert not tiering._thread.is_alive()
+        assert tiering.stats["converted"] == 0
+        assert src.exists()
+
+    def test_keeps_flac_when_opus_is_not_smaller(
+        self, tmp_path, fake_audio, saved_flac, encoder
+    ):
+        """Test that a conversion that would grow the file is dropped"""
+        src = saved_flac(tmp_path / "240101", "240101090000_a.flac", 1, audio_bytes=0)
+        moved = []
+        tiering = ArchiveTiering(
+            str(tmp_path),
+            encoder(),
+            7,
+            duty=1.0,
+            on_moved=lambda old, new: moved.append(new),
+        )
+
+        stats = tiering.run_once(TODAY)
+        assert (stats["converted"], stats["skipped"]) == (0, 1)
+        assert sorted(os.listdir(src.parent)) == [".manifest.jsonl", src.name]
+        assert moved == []
+        assert tiering.candidates(TODAY) == []
+
+        # The decision is kept in the manifest, so a restart does not retry it
+        records = DayManifest(str(src.parent)).records()
+        assert [(r["filename"], r["tiering"]) for r in records] == [
+            (src.name, "kept_flac")
+        ]
+        restarted = ArchiveTiering(str(tmp_path), encoder(), 7)
+        assert restarted.candidates(TODAY) == []
+
+    def test_cover_is_downscaled(self, tmp_path, fake_audio, saved_flac, encoder):
+        """Test that the embedded cover follows artwork_max_px"""
+        cover = io.BytesIO()
+        Image.effect_noise((256, 256), 64).convert("RGB").save(cover, format="PNG")
+        saved_flac(tmp_path / "240101", "240101090000_a.flac", 1, cover.getvalue())
+
+        tiering = ArchiveTiering(
+            str(tmp_path), encoder(), 7, duty=1.0, artwork=ArtworkCache(max_px=16)
+        )
+        assert tiering.run_once(TODAY)["converted"] == 1
+
+        opus = OggOpus(tmp_path / "240101" / "240101090000_a.opus")
+        picture = Picture(base64.b64decode(opus["metadata_block_picture"][0]))
+        assert (picture.width, picture.height, picture.mime) == (16, 16, "image/jpeg")
+        assert len(picture.data) < len(cover.getvalue())
+
+    def test_waits_mid_file_when_reading_starts(
+        self, tmp_path, fake_audio, saved_flac, encoder
+    ):
+        """Test that a busy signal between blocks pauses the running conversion"""
+        src = saved_flac(tmp_path / "240101", "240101090000_a.flac", 1)
+        busy = MagicMock(side_effect=[False] + [True] * 100)
+        tiering = ArchiveTiering(str(tmp_path), encoder(), 7, is_busy=busy)
+
+        threading.Timer(0.2, tiering.stop).start()
+        stats = tiering.run_once(TODAY)
+
+        # Idle before the file, busy after the first block: stopped while waiting
+        assert busy.call_count >= 2
+        assert (stats["converted"], stats["failed"]) == (0, 0)
+        assert os.listdir(src.parent) == [src.name]
+
+
+class TestStartTiering:
+    @pytest.mark.parametrize("tiering_px, expected_px", [(600, 600), (0, 0)])
+    def test_tiered_covers_are_downscaled_by_default(self, tiering_px, expected_px):
+        """Test that tiered files get a smaller cover unless the option is 0"""
+        overrides = {
+            "archive_tiering_days": 30,
+            "archive_tiering_artwork_px": tiering_px,
+            "artwork_max_px": 0,
+        }
+        encoder = SimpleNamespace(ext=".opus", name="fake")
+        with (
+            patch.dict(aivis_reader.cfg.data, overrides),
+            patch("aivis_reader.select_encoder", return_value=encoder),
+            patch.object(ArchiveTiering, "start"),
+        ):
+            synth = aivis_reader.AivisSynthesizer()
+            tiering = synth.start_tiering()
+            synth.tiering = None
+            synth.shutdown()
+
+        assert tiering.artwork.max_px == expected_px
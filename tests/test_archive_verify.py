@@ -0,0 +1,140 @@
+import base64
+import json
+from unittest.mock import patch
+
+import pytest
+from mutagen import File as MutagenFile
+from mutagen.flac import Picture
+
+from archive_manifest import DayManifest
+from archive_verify import dump_report, verify_archive
+
+
+def _tag(path, track, artwork=True, **extra):
+    audio = MutagenFile(path)
+    if audio.tags is None:
+        audio.add_tags()
+    tags = {"title": "本文", "artist": "Artist", "album": "Log_240101"}
+    tags.update(extra, tracknumber=str(track))
+    for key, value in tags.items():
+        audio[key] = [value]
+    if artwork:
+        picture = Picture()
+        picture.data = b"cover"
+        if hasattr(audio, "add_picture"):
+            audio.add_picture(picture)
+        else:
+            audio["metadata_block_picture"] = [
+                base64.b64encode(picture.write()).decode("ascii")
+            ]
+    audio.save()
+
+
+def _codes(report, name=None):
+    return sorted(
+        p["issue"]
+        for p in report["problems"]
+        if name is None or p["path"].endswith(name)
+    )
+
+
+@pytest.fixture
+def decode():
+    """Pretend every file decodes to 4800 frames"""
+    with patch("archive_verify.decode_frames", return_value=4800) as mock:
+        yield mock
+
+
+class TestVerifyArchive:
+    def test_clean_archive_has_no_problems(
+        self, tmp_path, decode, write_flac, write_opus
+    ):
+        """Test that well-formed, fully tagged files pass every check"""
+        day_dir = tmp_path / "240101"
+        day_dir.mkdir()
+        write_flac(day_dir / "a.flac", total_samples=4800)
+        write_opus(day_dir / "b.opus")
+        _tag(day_dir / "a.flac", 1)
+        _tag(day_dir / "b.opus", 2)
+
+        report = verify_archive(
+            str(tmp_path), workers=1, artist="Artist", album_prefix="Log"
+        )
+        assert report["problems"] == []
+        assert (report["files"], report["ok"]) == (2, 2)
+        assert report["folders"]["240101"] == {"files": 2, "duplicates": [], "gaps": []}
+        # The report round-trips through JSON
+        assert json.loads(dump_report(report))["files"] == 2
+
+    def test_detects_truncated_and_broken_files(
+        self, tmp_path, decode, write_flac, write_opus
+    ):
+        """Test that crashed saves, empty files and decode errors are reported"""
+        day_dir = tmp_path / "240101"
+        day_dir.mkdir()
+        write_flac(day_dir / "unfinished.flac")
+        write_flac(day_dir / "short.flac", total_samples=9600)
+        write_opus(day_dir / "cut.opus", finished=False)
+        (day_dir / "empty.opus").write_bytes(b"")
+        for i, name in enumerate(["unfinished.flac", "short.flac", "cut.opus"], 1):
+            _tag(day_dir / name, i)
+
+        report = verify_archive(str(tmp_path), workers=1)
+        assert _codes(report, "unfinished.flac") == ["truncated"]
+        assert _codes(report, "short.flac") == ["truncated"]
+        assert _codes(report, "cut.opus") == ["truncated"]
+        assert _codes(report, "empty.opus") == ["empty"]
+
+        decode.side_effect = RuntimeError("malformed")
+        report = verify_archive(str(tmp_path), workers=1)
+        assert "decode_error" in _codes(report, "short.flac")
+
+    def test_reports_tag_and_numbering_problems(self, tmp_path, decode, write_flac):
+        """Test missing tags, mismatches, duplicate tracks and gaps"""
+        day_dir = tmp_path / "240101"
+        day_dir.mkdir()
+        for name in ("a.flac", "b.flac", "c.flac", "d.flac"):
+            write_flac(day_dir / name, total_samples=4800)
+        _tag(day_dir / "a.flac", 1)
+        _tag(day_dir / "b.flac", 1, artist="Other")
+        _tag(day_dir / "c.flac", 4, artwork=False)
+        write_flac(day_dir / "d.flac")
+
+        report = verify_archive(str(tmp_path), workers=1, artist="Artist")
+        assert _codes(report, "a.flac") == ["duplicate_track"]
+        assert _codes(report, "b.flac") == ["duplicate_track", "tag_mismatch"]
+        assert _codes(report, "c.flac") == ["missing_artwork"]
+        assert _codes(report, "d.flac") == ["missing_artwork"] + ["missing_tag"] * 4 + [
+            "truncated"
+        ]
+        assert report["folders"]["240101"]["gaps"] == [2, 3]
+        assert report["folders"]["240101"]["duplicates"] == [1]
+
+    def test_compares_against_manifest(self, tmp_path, decode, write_flac):
+        """Test that unfinished reservations and vanished files are reported"""
+        day_dir = tmp_path / "240101"
+        day_dir.mkdir()
+        write_flac(day_dir / "a.flac", total_samples=4800)
+        _tag(day_dir / "a.flac", 1)
+        manifest = DayManifest(str(day_dir))
+        manifest.reserve("gone.flac")
+        manifest.finish(2, "saved")
+        manifest.reserve("pending.flac")
+
+        report = verify_archive(str(tmp_path), workers=1)
+        assert _codes(report, "gone.flac") == ["missing_file"]
+        assert _codes(report, "pending.flac") == ["unfinished_save"]
+
+    def test_parallel_run_matches_serial(self, tmp_path, decode, write_flac):
+        """Test that the process pool produces the same report"""
+        for day in ("240101", "240102"):
+            day_dir = tmp_path / day
+            day_dir.mkdir()
+            for track in (1, 2, 3):
+                write_flac(day_dir / f"{track}.flac", total_samples=4800)
+                _tag(day_dir / f"{track}.flac", track, album=f"Log_{day}")
+
+        serial = verify_archive(str(tmp_path), workers=1, album_prefix="Log")
+        parallel = verify_archive(str(tmp_path), workers=2, album_prefix="Log")
+        assert parallel["problems"] == serial["problems"] == []
+        assert parallel["folders"] == serial["folders"]
@@ -0,0 +1,89 @@
+import numpy as np
+
+from archive_writer import ArchiveWriter
+from save_queue import SaveQueue
+
+
+class RecordingEncoder:
+    """Encoder stand-in that writes raw float32 PCM and records each call"""
+
+    name = "raw"
+    ext = ".raw"
+
+    def __init__(self, fail_on_write=None):
+        self.fail_on_write = fail_on_write
+        self.writes = 0
+
+    def open(self, path, sr, channels):
+        encoder = self
+
+        class Stream:
+            def __init__(self):
+                self.file = open(path, "wb")
+
+            def write(self, data):
+                encoder.writes += 1
+                if encoder.writes == encoder.fail_on_write:
+                    raise OSError("disk full")
+                self.file.write(data.tobytes())
+
+            def close(self):
+                self.file.close()
+
+            def abort(self):
+                self.file.close()
+
+        return Stream()
+
+
+def _writer(tmp_path, encoder, finalized):
+    queue = SaveQueue()
+    writer = ArchiveWriter(
+        str(tmp_path / "log.raw"), encoder, 24000, 1, queue, finalize=finalized.append
+    )
+    return writer, queue
+
+
+class TestArchiveWriter:
+    def test_appends_in_order_and_finalizes(self, tmp_path):
+        """Test that blocks land in the file in order before tags are written"""
+        finalized: list = []
+        writer, queue = _writer(tmp_path, RecordingEncoder(), finalized)
+        blocks = [np.full(100, i, dtype=np.float32) for i in range(5)]
+        for block in blocks:
+            writer.write(block)
+
+        assert writer.close().result(timeout=2) is True
+        queue.shutdown()
+
+        saved = np.fromfile(tmp_path / "log.raw", dtype=np.float32)
+        np.testing.assert_array_equal(saved, np.concatenate(blocks))
+        assert finalized == [writer.path]
+        assert queue.stats()["saved"] == 1
+
+    def test_discard_removes_partial_file(self, tmp_path):
+        """Test that a stopped reading leaves no file and no tags"""
+        finalized: list = []
+        writer, queue = _writer(tmp_path, RecordingEncoder(), finalized)
+        writer.write(np.ones(100, dtype=np.float32))
+        queue.flush()
+        assert (tmp_path / "log.raw").exists()
+
+        writer.discard()
+        queue.shutdown()
+
+        assert not (tmp_path / "log.raw").exists()
+        assert finalized == []
+
+    def test_write_error_drops_file_once(self, tmp_path):
+        """Test that a failed append removes the file and counts one failure"""
+        finalized: list = []
+        writer, queue = _writer(tmp_path, RecordingEncoder(fail_on_write=2), finalized)
+        for _ in range(3):
+            writer.write(np.ones(10, dtype=np.float32))
+        writer.close()
+        queue.shutdown()
+
+        assert not (tmp_path / "log.raw").exists()
+        assert finalized == []
+        assert (queue.stats()["saved"], queue.stats()["failed"]) == (0, 1)
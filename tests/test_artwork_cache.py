@@ -0,0 +1,73 @@
+import base64
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from artwork_cache import ArtworkCache
+
+
+def _write_image(path, size, mode="RGB", fmt="JPEG"):
+    Image.new(mode, size, color="red" if mode == "RGB" else (255, 0, 0, 128)).save(
+        path, format=fmt
+    )
+
+
+class TestArtworkCache:
+    def test_reuses_converted_artwork(self, tmp_path):
+        """Test that the file is read and converted only once per version"""
+        path = tmp_path / "cover.jpg"
+        _write_image(path, (32, 32))
+        cache = ArtworkCache()
+
+        first = cache.get(str(path))
+        assert cache.get(str(path)) is first
+        assert cache.loads == 1
+        assert first.mime == "image/jpeg"
+        assert first.data == path.read_bytes()
+        # The base64 tag value is the serialized FLAC picture block
+        assert base64.b64decode(first.block_base64) == first.picture.write()
+
+    def test_reloads_when_file_changes(self, tmp_path):
+        """Test that a newer mtime invalidates the cached artwork"""
+        path = tmp_path / "cover.png"
+        _write_image(path, (16, 16), fmt="PNG")
+        cache = ArtworkCache()
+        first = cache.get(str(path))
+
+        _write_image(path, (24, 24), fmt="PNG")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        second = cache.get(str(path))
+        assert second is not first
+        assert second.data == path.read_bytes()
+        assert cache.loads == 2
+
+    def test_missing_file_returns_none(self, tmp_path):
+        """Test that a missing artwork path is skipped"""
+        assert ArtworkCache().get(str(tmp_path / "none.jpg")) is None
+        assert ArtworkCache().get("") is None
+
+    @pytest.mark.parametrize(
+        "mode, fmt, mime",
+        [("RGB", "JPEG", "image/jpeg"), ("RGBA", "PNG", "image/png")],
+    )
+    def test_downscales_large_images(self, tmp_path, mode, fmt, mime):
+        """Test that images above max_px are shrunk, keeping alpha as PNG"""
+        path = tmp_path / f"cover.{fmt.lower()}"
+        _write_image(path, (800, 400), mode=mode, fmt=fmt)
+        artwork = ArtworkCache(max_px=200).get(str(path))
+
+        assert artwork.mime == mime
+        assert (artwork.picture.width, artwork.picture.height) == (200, 100)
+        with Image.open(io.BytesIO(artwork.data)) as image:
+            assert image.size == (200, 100)
+
+    def test_small_images_are_kept(self, tmp_path):
+        """Test that images within max_px are embedded unchanged"""
+        path = tmp_path / "cover.jpg"
+        _write_image(path, (100, 50))
+        artwork = ArtworkCache(max_px=200).get(str(path))
+        assert artwork.data == path.read_bytes()
@@ -0,0 +1,248 @@
+import asyncio
+import io
+import socket
+import threading
+import time
+import wave
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+import aivis_reader
+from aivis_reader import (
+    AivisSynthesizer,
+    AsyncAivisSynthesizer,
+    AsyncTaskManager,
+    create_task_manager,
+)
+from archive_manifest import DayManifest
+from fake_engine import FakeEngine
+
+pytest.importorskip("aiohttp")
+
+
+def _read_wav(file, *args, **kwargs):
+    with wave.open(io.BytesIO(file.read()) if hasattr(file, "read") else file) as w:
+        pcm = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+        return pcm.astype(np.float32) / 32768, w.getframerate()
+
+
+OVERRIDES = {
+    "dictionary": {},
+    "require_hiragana": False,
+    "min_length": 1,
+    "batch_char_budget": 0,
+    "pipeline_depth": 3,
+    "synth_cache": False,
+    "query_cache": False,
+    "segment_crossfade_ms": 0,
+    "archive_streaming": False,
+}
+
+
+@patch("aivis_reader.sf.read", side_effect=_read_wav)
+class TestAsyncEngine:
+    def _manager(self, engine):
+        synth = AivisSynthesizer()
+        synth.base_url = engine.url
+        synth.save_log = MagicMock()
+        player = MagicMock()
+        return AsyncTaskManager(synth, player), synth, player
+
+    def test_lines_play_in_order(self, mock_read):
+        """Test that concurrent async requests are enqueued in line order"""
+        lines = ["あ" * n for n in (6, 1, 4, 2)]
+        with (
+            FakeEngine(latency_per_char=0.01) as engine,
+            patch.dict(aivis_reader.cfg.data, OVERRIDES),
+        ):
+            manager, synth, player = self._manager(engine)
+            manager.add_text("\n".join(lines))
+            manager.task_queue.join()
+
+        lengths = [len(call.args[0]) for call in player.enqueue.call_args_list]
+        # Each clip is 0.1 s per character plus the same trailing pause
+        pause = lengths[1] - 2400
+        assert lengths == [int(24000 * 0.1 * len(line)) + pause for line in lines]
+        synth.save_log.assert_called_once()
+
+        # Each request is logged, and later ones reuse pooled connections
+        log = synth.get_http_log()
+        assert len(log) == synth.get_http_stats()["requests"]
+        assert all(r["status"] == 200 for r in log)
+        assert {r["reused"] for r in log} == {False, True}
+
+    def test_skip_cancels_in_flight_request(self, mock_read):
+        """Test that skip aborts a slow request instead of waiting for it"""
+        with (
+            FakeEngine(latency_per_char=0.5) as engine,
+            patch.dict(aivis_reader.cfg.data, OVERRIDES),
+        ):
+            manager, synth, player = self._manager(engine)
+            manager.add_text("あいうえおかきくけこ")
+            time.sleep(0.3)
+
+            started = time.perf_counter()
+            manager.skip_current()
+            manager.task_queue.join()
+
+        assert time.perf_counter() - started < 1.0
+        player.enqueue.assert_not_called()
+        synth.save_log.assert_not_called()
+
+    def test_long_line_streams_in_blocks(self, mock_read):
+        """Test that a long line starts playing before its body has fully arrived"""
+        line = "あ" * 30
+        with (
+            FakeEngine() as engine,
+            patch.dict(aivis_reader.cfg.data, {**OVERRIDES, "streaming_min_chars": 10}),
+        ):
+            manager, synth, player = self._manager(engine)
+            manager.add_text(line)
+            manager.task_queue.join()
+
+        lengths = [len(call.args[0]) for call in player.enqueue.call_args_list]
+        # The ~145 KB body arrives in 16 KB chunks, each played as it is decoded
+        assert len(lengths) >= 8
+        saved = synth.save_log.call_args.args[0]
+        assert sum(lengths) == len(saved) > int(24000 * 0.1 * len(line))
+
+    def test_archive_is_opened_off_the_event_loop(self, mock_read):
+        """Test that opening the save file does not run on the loop thread"""
+        opened_on = []
+        writer = MagicMock()
+
+        def open_log(*args):
+            opened_on.append(threading.current_thread())
+            return writer
+
+        with (
+            FakeEngine() as engine,
+            patch.dict(aivis_reader.cfg.data, {**OVERRIDES, "archive_streaming": True}),
+        ):
+            manager, synth, player = self._manager(engine)
+            synth.open_log = MagicMock(side_effect=open_log)
+            manager.add_text("あいう\nかきく")
+            manager.task_queue.join()
+
+        assert len(opened_on) == 1
+        assert opened_on[0] is not manager.thread
+        assert writer.write.call_count == player.enqueue.call_count
+        writer.close.assert_called_once()
+
+    def test_close_discards_reading_in_progress(self, mock_read, tmp_path):
+        """Test that quitting mid-reading leaves no partial file behind"""
+        overrides = {
+            **OVERRIDES,
+            "pipeline_depth": 1,
+            "archive_streaming": True,
+            "archive_index": False,
+            "dropbox_dir": str(tmp_path),
+            "output_dir": "logs",
+            "override_date": "240101",
+        }
+        with (
+            FakeEngine(latency_per_char=0.02) as engine,
+            patch.dict(aivis_reader.cfg.data, overrides),
+        ):
+            manager, synth, player = self._manager(engine)
+            synth.force_flac = True
+            manager.add_text("\n".join(["あいうえお"] * 20))
+
+            day_dir = tmp_path / "logs" / "240101"
+            deadline = time.monotonic() + 5
+            while not list(day_dir.glob("*.flac")) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert list(day_dir.glob("*.flac"))
+
+            manager.close()
+            synth.shutdown()
+
+        assert list(day_dir.glob("*.flac")) == []
+        records = DayManifest(str(day_dir)).records()
+        assert [r["status"] for r in records] == ["discarded"]
+
+    def test_requests_spread_over_engines(self, mock_read):
+        """Test that asyncio mode dispatches to every engine in the pool"""
+        lines = [f"{'あ' * 4}{i}" for i in range(6)]
+        with (
+            FakeEngine(latency_per_char=0.02) as first,
+            FakeEngine(latency_per_char=0.02) as second,
+            patch.dict(
+                aivis_reader.cfg.data,
+                {**OVERRIDES, "engines": [first.url, second.url]},
+            ),
+        ):
+            synth = AivisSynthesizer()
+            synth.save_log = MagicMock()
+            manager = AsyncTaskManager(synth, MagicMock())
+            manager.add_text("\n".join(lines))
+            manager.task_queue.join()
+
+        counts = [e.request_counts.get("/synthesis", 0) for e in (first, second)]
+        assert sum(counts) == len(lines)
+        assert min(counts) > 0
+        assert all(s["outstanding"] == 0 for s in synth.get_engine_stats())
+
+    def test_dead_engine_fails_over(self, mock_read):
+        """Test that asyncio requests move to a live engine without backing off"""
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            dead = f"http://127.0.0.1:{s.getsockname()[1]}"
+        with (
+            FakeEngine() as engine,
+            patch.dict(
+                aivis_reader.cfg.data,
+                {**OVERRIDES, "engines": [dead, engine.url]},
+            ),
+            patch("aivis_reader.asyncio.sleep") as mock_sleep,
+        ):
+            synth = AivisSynthesizer()
+            synth.save_log = MagicMock()
+            player = MagicMock()
+            manager = AsyncTaskManager(synth, player)
+            manager.add_text("あいう\nかきく")
+            manager.task_queue.join()
+
+        assert player.enqueue.call_count == 2
+        stats = {s["url"]: s for s in synth.get_engine_stats()}
+        assert stats[dead]["healthy"] is False
+        assert stats[engine.url]["requests"] >= 4
+        mock_sleep.assert_not_called()
+
+    def test_batch_audio_queries_overlap(self, mock_read):
+        """Test that a batch sends its per-line audio queries concurrently"""
+        lines = ["はい", "いいえ", "たぶん", "そうです"]
+        with (
+            FakeEngine(latency_base=0.3) as engine,
+            patch.dict(aivis_reader.cfg.data, OVERRIDES),
+        ):
+            synth = AivisSynthesizer()
+            synth.base_url = engine.url
+            async_synth = AsyncAivisSynthesizer(synth)
+
+            async def run():
+                try:
+                    return await async_synth.synthesize_batch(lines)
+                finally:
+                    await async_synth.close()
+
+            started = time.perf_counter()
+            results = asyncio.run(run())
+            elapsed = time.perf_counter() - started
+
+        assert all(r is not None for r in results)
+        assert engine.request_counts.get("/multi_synthesis") == 1
+        # One after another would take 4 queries + 1 synthesis = 1.5 s
+        assert elapsed < 1.2
+
+
+def test_factory_falls_back_without_aiohttp():
+    """Test that asyncio mode degrades to the thread manager"""
+    with (
+        patch.dict(aivis_reader.cfg.data, {"engine_mode": "asyncio"}),
+        patch.object(aivis_reader, "HAS_AIOHTTP", False),
+    ):
+        manager = create_task_manager(MagicMock(), MagicMock())
+    assert type(manager) is aivis_reader.TaskManager
@@ -0,0 +1,123 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from aivis_reader import AudioPlayer
+from ring_buffer import SPSCRingBuffer
+
+SR = 24000
+BLOCK = 240
+
+
+def _pull(player, blocks=1):
+    """Act as the audio device: run the callback and collect its output"""
+    out = np.empty((BLOCK, 1), dtype=np.float32)
+    collected = []
+    for _ in range(blocks):
+        player._callback(out, BLOCK, None, None)
+        collected.append(out[:, 0].copy())
+    return np.concatenate(collected)
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+class TestRingBuffer:
+    def test_wraparound_roundtrip(self):
+        """Test that data written across the end of the buffer reads back intact"""
+        ring = SPSCRingBuffer(8, 1)
+        out = np.zeros((8, 1), dtype=np.float32)
+
+        assert ring.write(np.ones((6, 1), dtype=np.float32)) == 6
+        assert ring.read_into(out[:5]) == 5
+        data = np.arange(7, dtype=np.float32).reshape(-1, 1)
+        assert ring.write(data) == 7
+        assert ring.writable() == 0
+
+        assert ring.read_into(out) == 8
+        np.testing.assert_array_equal(out[1:, 0], np.arange(7))
+
+
+class TestAudioPlayer:
+    def _loaded_player(self, seconds=0.5):
+        player = AudioPlayer()
+        player.enqueue(np.ones(int(SR * seconds), dtype=np.float32), SR)
+        _wait_for(lambda: player.ring.readable() > 0)
+        return player
+
+    def test_stop_takes_effect_within_one_block(self):
+        """Test that stop_immediate silences the very next callback"""
+        player = self._loaded_player()
+        assert np.all(_pull(player) == 1.0)
+
+        player.stop_immediate()
+        assert np.all(_pull(player) == 0.0)
+        assert player.ring.readable() == 0
+
+    def test_pause_holds_position(self):
+        """Test that pause outputs silence without consuming buffered audio"""
+        player = self._loaded_player()
+        _wait_for(lambda: player.queue.unfinished_tasks == 0)
+        buffered = player.ring.readable()
+
+        player.toggle_pause()
+        assert np.all(_pull(player, 3) == 0.0)
+        assert player.ring.readable() == buffered
+
+        player.toggle_pause()
+        assert np.all(_pull(player) == 1.0)
+
+    def test_playback_rate_applies_to_queued_audio(self):
+        """Test that queued audio is time-stretched at the current rate"""
+        player = AudioPlayer()
+        assert player.set_playback_rate(10) == AudioPlayer.PLAYBACK_RATE_RANGE[1]
+        player.set_playback_rate(2.0)
+        player.enqueue(np.ones(SR // 2, dtype=np.float32), SR)
+
+        _wait_for(lambda: player.queue.unfinished_tasks == 0)
+        # The first and last WSOLA frames keep the original speed
+        assert abs(player.ring.readable() - SR // 4) <= SR * 0.05
+
+    def test_underrun_and_overrun_counters(self):
+        """Test that a full ring counts an overrun and a starved one an underrun"""
+        player = self._loaded_player(seconds=1.5)  # larger than the 1 s ring
+        _wait_for(lambda: player.overruns == 1)
+
+        # Play half a second; the feeder tops the ring up with the rest
+        _pull(player, 50)
+        _wait_for(lambda: player.queue.unfinished_tasks == 0)
+        assert player.ring.readable() == int(SR * 1.0)
+        assert player.get_stats()["underruns"] == 0
+
+        # Audio is still expected but nothing is buffered
+        player.ring.discard()
+        player._feeding = True
+        _pull(player)
+        assert player.get_stats()["underruns"] == 1
+
+        # The device reporting the same starved block is counted separately
+        out = np.empty((BLOCK, 1), dtype=np.float32)
+        player._callback(out, BLOCK, None, SimpleNamespace(output_underflow=True))
+        stats = player.get_stats()
+        assert (stats["underruns"], stats["device_underflows"]) == (2, 1)
+
+    def test_idle_stream_is_suspended_and_prewarmed(self):
+        """Test that an idle stream is stopped and restarted by prewarm"""
+        player = self._loaded_player(seconds=0.01)
+        player.idle_timeout = 0.05
+        stream = player.stream
+        _pull(player, 2)
+
+        stops, starts = stream.stop.call_count, stream.start.call_count
+        _wait_for(lambda: player._suspended, timeout=3.0)
+        assert stream.stop.call_count == stops + 1
+
+        player.prewarm()
+        _wait_for(lambda: not player._suspended)
+        assert stream.start.call_count == starts + 1
+        assert player.stream is stream
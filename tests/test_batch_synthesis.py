@@ -0,0 +1,78 @@
+import time
+import wave
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+import aivis_reader
+from aivis_reader import AivisSynthesizer
+from fake_engine import FakeEngine
+
+
+def _read_wav(buf, dtype="float32"):
+    """Minimal stand-in for soundfile.read (soundfile is mocked in tests)"""
+    with wave.open(buf, "rb") as w:
+        pcm = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+        return pcm.astype(np.float32) / 32768, w.getframerate()
+
+
+@pytest.fixture
+def engine():
+    with FakeEngine() as fake:
+        yield fake
+
+
+@pytest.fixture
+def synth(engine):
+    with patch.dict(aivis_reader.cfg.data, {"synth_cache": False}):
+        s = AivisSynthesizer()
+    s.base_url = engine.url
+    with patch("aivis_reader.sf.read", side_effect=_read_wav):
+        yield s
+
+
+class TestBatchSynthesis:
+    def test_batch_uses_single_synthesis_request(self, engine, synth):
+        """Test that short lines are rendered by one multi_synthesis call"""
+        lines = ["はい", "いいえ", "たぶんそうです"]
+        results = synth.synthesize_batch(lines)
+
+        assert engine.request_counts.get("/multi_synthesis") == 1
+        assert "/synthesis" not in engine.request_counts
+        assert [sr for _, sr in results] == [24000] * 3
+        # Each line keeps its own length (0.1 s per char + post pause)
+        lengths = [len(data) for data, _ in results]
+        assert lengths[0] < lengths[1] < lengths[2]
+
+    def test_batch_matches_single_line_audio(self, engine, synth):
+        """Test that splitting the batch gives the same audio per line"""
+        lines = ["はい", "いいえ"]
+        batch = synth.synthesize_batch(lines)
+        single = [synth.synthesize(line) for line in lines]
+
+        for (a, _), (b, _) in zip(batch, single):
+            np.testing.assert_array_equal(a, b)
+
+    def test_audio_queries_overlap(self, engine, synth):
+        """Test that the per-line audio queries of a batch are sent concurrently"""
+        engine.latency_base = 0.3
+        lines = ["はい", "いいえ", "たぶん", "そうです"]
+
+        started = time.perf_counter()
+        results = synth.synthesize_batch(lines)
+        elapsed = time.perf_counter() - started
+
+        assert all(r is not None for r in results)
+        assert engine.request_counts.get("/audio_query") == 4
+        # One after another would take 4 queries + 1 synthesis = 1.5 s
+        assert elapsed < 1.2
+
+    def test_fallback_when_unsupported(self, engine, synth):
+        """Test that engines without multi_synthesis fall back to per-line calls"""
+        engine.multi_synthesis = False
+        results = synth.synthesize_batch(["はい", "いいえ"])
+
+        assert all(r is not None for r in results)
+        assert engine.request_counts.get("/synthesis") == 2
+        assert synth.multi_synthesis_supported is False
@@ -0,0 +1,40 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+SCRIPTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../scripts"))
+
+
+@pytest.fixture(scope="module")
+def benchmark():
+    sys.path.insert(0, SCRIPTS_DIR)
+    try:
+        yield importlib.import_module("benchmark")
+    finally:
+        sys.path.remove(SCRIPTS_DIR)
+
+
+def test_corpus_is_deterministic(benchmark):
+    """Test that the same seed always produces the same text"""
+    assert benchmark.make_corpus(10, seed=1) == benchmark.make_corpus(10, seed=1)
+    assert benchmark.make_corpus(10, seed=1) != benchmark.make_corpus(10, seed=2)
+
+
+def test_run_benchmark_reports_metrics(benchmark):
+    """Test that an end-to-end run against the fake engine reports every metric"""
+    result = benchmark.run_benchmark(
+        lines=4, repeat=1, warmup=0, latency_per_char=0.0, latency_base=0.0
+    )
+
+    metrics = result["metrics"]
+    assert set(metrics) == set(benchmark.METRICS)
+    assert metrics["ttfa_ms"] > 0
+    assert metrics["lines_per_sec"] > 0
+    assert metrics["realtime_factor"] > 0
+    assert result["runs"][0]["http"]["requests"] > 0
+
+    report = benchmark.compare(result, result)
+    assert "lines_per_sec" in report
+    assert "⚠️" not in report
@@ -0,0 +1,74 @@
+from unittest.mock import MagicMock, patch
+
+import aivis_reader
+from aivis_reader import TaskManager
+from chunker import chunk_lines, split_after
+
+PARAGRAPH = (
+    "今日は良い天気ですね。明日の会議は午後から始まりますので、"
+    "資料を確認しておいてください。はい。よろしくお願いします！"
+) * 10
+
+
+class TestChunker:
+    def test_split_keeps_punctuation_and_closers(self):
+        """Test that sentences are split after the mark and closing brackets"""
+        assert split_after("「はい。」と言った。次へ", "。") == [
+            "「はい。」",
+            "と言った。",
+            "次へ",
+        ]
+
+    def test_first_chunk_is_short_and_chunks_grow(self):
+        """Test that the first chunk fits the first budget and later ones grow"""
+        chunks = chunk_lines([PARAGRAPH], first_chars=12, max_chars=120)
+
+        assert "".join(chunks) == PARAGRAPH
+        assert len(chunks[0]) <= 12
+        assert all(len(c) <= 120 for c in chunks)
+        assert max(len(c) for c in chunks) > 60
+
+    def test_long_sentence_falls_back_to_commas_then_length(self):
+        """Test that an over-long sentence is split on 、 or by length"""
+        assert chunk_lines(["あいうえお、かきくけこ。"], 8, 120, 1) == [
+            "あいうえお、",
+            "かきくけこ。",
+        ]
+        assert [len(c) for c in chunk_lines(["あ" * 50], 10, 30, 1)] == [10, 20, 20]
+
+    def test_tiny_fragments_are_merged(self):
+        """Test that fragments under min_chars join the next chunk"""
+        chunks = chunk_lines(
+            ["最初の文です。", "はい。長めの二番目の文がここに続きます。"], 10, 120, 8
+        )
+        assert chunks == ["最初の文です。", "はい。長めの二番目の文がここに続きます。"]
+
+    def test_line_boundaries_are_kept(self):
+        """Test that separate lines never end up in the same chunk"""
+        assert chunk_lines(["短い。", "行。"], 20, 120, 8) == ["短い。", "行。"]
+
+
+class TestAdaptiveChunking:
+    def _manager(self, sec_per_char):
+        synth = MagicMock()
+        synth.sec_per_char = sec_per_char
+        return TaskManager(synth, MagicMock())
+
+    def test_first_chunk_follows_measured_latency(self):
+        """Test that a slower engine gets a shorter first chunk"""
+        with patch.dict(aivis_reader.cfg.data, {"first_audio_target": 0.5}):
+            fast = self._manager(0.01)._first_chunk_chars(8, 120)
+            slow = self._manager(0.05)._first_chunk_chars(8, 120)
+            unknown = self._manager(None)._first_chunk_chars(8, 120)
+
+        assert (fast, slow) == (50, 10)
+        assert unknown == aivis_reader.cfg["first_chunk_chars"]
+
+    def test_first_chunk_is_not_batched(self):
+        """Test that the short first chunk is synthesized on its own"""
+        manager = self._manager(None)
+        with patch.dict(
+            aivis_reader.cfg.data, {"batch_char_budget": 80, "batch_line_chars": 20}
+        ):
+            groups = manager._group_lines(["あ" * 5, "い" * 5, "う" * 5], True)
+        assert groups == [["あ" * 5], ["い" * 5, "う" * 5]]
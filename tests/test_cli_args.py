@@ -33,5 +33,23 @@ class TestCliArgs:
                 # (coverage mainly)
                 pass
 
+    @patch("aivis_reader.AudioPlayer")
+    @patch("aivis_reader.AivisSynthesizer")
+    def test_cli_search_exits_without_player(self, mock_as, mock_ap):
+        """Test that --search queries the archive index and returns"""
+        synth = mock_as.return_value
+        synth.search_archive.return_value = [
+            {"day": "240101", "track": 1, "path": "a.flac", "text": "天気予報"}
+        ]
+        test_args = ["script_name", "-s", "天気", "--search-date", "2401"]
+
+        with patch.object(sys, "argv", test_args):
+            run_cli()
+
+        synth.search_archive.assert_called_once_with("天気", day="2401")
+        synth.reindex_archive.assert_not_called()
+        synth.shutdown.assert_called_once()
+        mock_ap.assert_not_called()
+
     def test_placeholder(self):
         assert True
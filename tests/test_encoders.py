@@ -0,0 +1,67 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from encoders import (
+    FfmpegOpusEncoder,
+    FlacEncoder,
+    SoundfileOpusEncoder,
+    _Encoder,
+    select_encoder,
+)
+
+
+def _libsndfile_opus(supported):
+    subtypes = {"VORBIS": "Vorbis", "OPUS": "Opus"} if supported else {"VORBIS": ""}
+    return patch("encoders.sf.available_subtypes", return_value=subtypes)
+
+
+class TestSelectEncoder:
+    def test_prefers_in_process_opus(self):
+        """Test that libsndfile Opus wins over spawning ffmpeg"""
+        with _libsndfile_opus(True):
+            assert isinstance(
+                select_encoder(ffmpeg_path="ffmpeg"), SoundfileOpusEncoder
+            )
+            chosen = select_encoder(backend="ffmpeg", ffmpeg_path="ffmpeg")
+            assert isinstance(chosen, FfmpegOpusEncoder)
+
+    def test_falls_back_to_ffmpeg_then_flac(self):
+        """Test the fallback order when libsndfile lacks Opus"""
+        with _libsndfile_opus(False):
+            chosen = select_encoder(backend="soundfile", ffmpeg_path="ffmpeg")
+            assert isinstance(chosen, FfmpegOpusEncoder)
+            assert isinstance(select_encoder(ffmpeg_path=None), FlacEncoder)
+        assert isinstance(select_encoder(use_opus=False), FlacEncoder)
+
+
+class TestSoundfileOpusEncoder:
+    def test_resamples_to_an_opus_rate(self, tmp_path):
+        """Test that 44.1 kHz audio is written as 48 kHz Ogg/Opus"""
+        data = np.zeros(4410, dtype=np.float32)
+        with patch("encoders.sf.SoundFile") as sound_file:
+            SoundfileOpusEncoder().encode(str(tmp_path / "a.opus"), data, 44100)
+
+        kwargs = sound_file.call_args.kwargs
+        assert kwargs["samplerate"] == 48000
+        assert (kwargs["format"], kwargs["subtype"]) == ("OGG", "OPUS")
+        written = [c.args[0] for c in sound_file.return_value.write.call_args_list]
+        assert sum(len(block) for block in written) == 4800
+
+    def test_bitrate_maps_to_compression_level(self):
+        """Test that 128 kbps lands mid-range and scales per channel"""
+        encoder = SoundfileOpusEncoder(bitrate=128000)
+        assert 0.45 < encoder._compression_level(1) < 0.55
+        assert encoder._compression_level(2) > encoder._compression_level(1)
+
+
+class TestEncoderBase:
+    def test_encoder_without_open_cannot_be_created(self):
+        """Test that an encoder missing open() fails at construction"""
+
+        class Incomplete(_Encoder):
+            ext = ".raw"
+
+        with pytest.raises(TypeError):
+            Incomplete()
@@ -0,0 +1,111 @@
+import socket
+import threading
+import time
+from unittest.mock import patch
+
+import aivis_reader
+from aivis_reader import AivisSynthesizer
+from engine_pool import EnginePool, normalize_endpoint
+from fake_engine import FakeEngine
+
+
+def _dead_url():
+    """Return a URL on a port that nothing listens on"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+class TestEnginePool:
+    def test_normalize_endpoint(self):
+        """Test that host, host:port and full URLs are accepted"""
+        assert normalize_endpoint("localhost") == "http://localhost:10101"
+        assert normalize_endpoint("10.0.0.2:10102") == "http://10.0.0.2:10102"
+        assert normalize_endpoint("http://a:1/") == "http://a:1"
+
+    def test_least_outstanding_dispatch(self):
+        """Test that requests go to the engine with the fewest in flight"""
+        pool = EnginePool(["http://a", "http://b", "http://c"])
+        first = pool.acquire()
+        second = pool.acquire()
+        third = pool.acquire()
+        assert [first.url, second.url, third.url] == [
+            "http://a",
+            "http://b",
+            "http://c",
+        ]
+
+        pool.release(second)
+        assert pool.acquire().url == "http://b"
+
+    def test_failed_engine_is_revived_in_background(self):
+        """Test that a failed engine is skipped until the background check passes"""
+        alive = {"http://a": False}
+        probed_on = set()
+
+        def probe(url):
+            probed_on.add(threading.current_thread().name)
+            return alive.get(url, True)
+
+        pool = EnginePool(["http://a", "http://b"], probe=probe, health_interval=0.0)
+        pool.release(pool.acquire(), ok=False)
+        assert pool.acquire().url == "http://b"
+
+        alive["http://a"] = True
+        deadline = time.monotonic() + 2.0
+        while not pool.stats()[0]["healthy"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert pool.acquire().url == "http://a"
+        # acquire() never probes on the caller's thread
+        assert probed_on == {"engine-health"}
+        pool.close()
+
+
+class TestFailover:
+    def test_requests_fail_over_to_live_engine(self):
+        """Test that a dead engine is taken out and requests still succeed"""
+        dead = _dead_url()
+        with (
+            FakeEngine() as engine,
+            patch.dict(
+                aivis_reader.cfg.data,
+                {"engines": [dead, engine.url], "engine_health_interval": 60},
+            ),
+        ):
+            synth = AivisSynthesizer()
+            with patch("aivis_reader.time.sleep") as mock_sleep:
+                for _ in range(3):
+                    synth._request("GET", "/speakers", timeout=(1, 2))
+
+            stats = {s["url"]: s for s in synth.get_engine_stats()}
+            assert stats[dead]["healthy"] is False
+            assert stats[dead]["requests"] == 1
+            assert stats[engine.url]["requests"] == 3
+            # Switching to another engine does not wait for a backoff
+            mock_sleep.assert_not_called()
+
+    def test_streamed_response_counts_until_closed(self):
+        """Test that a streamed request stays outstanding until its body is closed"""
+        with (
+            FakeEngine() as engine,
+            patch.dict(aivis_reader.cfg.data, {"engines": [engine.url]}),
+        ):
+            synth = AivisSynthesizer()
+            res = synth._request("GET", "/speakers", timeout=(1, 2), stream=True)
+            assert synth.get_engine_stats()[0]["outstanding"] == 1
+
+            with res:
+                res.content
+            res.close()
+            assert synth.get_engine_stats()[0]["outstanding"] == 0
+
+    def test_check_connection_covers_all_engines(self):
+        """Test that check_connection succeeds while any engine is up"""
+        with (
+            FakeEngine() as engine,
+            patch.dict(aivis_reader.cfg.data, {"engines": [_dead_url(), engine.url]}),
+        ):
+            synth = AivisSynthesizer()
+            assert synth.check_connection()
+            assert [s["healthy"] for s in synth.get_engine_stats()] == [False, True]
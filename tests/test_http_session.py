@@ -0,0 +1,118 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from aivis_reader import AivisSynthesizer
+
+
+class _SpeakersHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"[]"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def keepalive_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SpeakersHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _response(status):
+    res = MagicMock()
+    res.status_code = status
+    if status >= 400:
+        res.raise_for_status.side_effect = requests.HTTPError(str(status))
+    return res
+
+
+class TestHttpSession:
+    def test_connection_is_reused(self, keepalive_server):
+        """Test that sequential requests share one keep-alive connection"""
+        synth = AivisSynthesizer()
+        synth.base_url = keepalive_server
+
+        for _ in range(5):
+            assert synth.check_connection()
+            synth._request("GET", "/speakers", timeout=(2, 2))
+
+        stats = synth.get_http_stats()
+        assert stats["requests"] == 5
+        assert stats["new_connections"] == 1
+        assert stats["reused_connections"] == 4
+
+    def test_each_request_is_logged(self, keepalive_server):
+        """Test that every request records its connection reuse and latency"""
+        synth = AivisSynthesizer()
+        synth.base_url = keepalive_server
+
+        for _ in range(3):
+            synth._request("GET", "/speakers", timeout=(2, 2))
+
+        log = synth.get_http_log()
+        assert [r["reused"] for r in log] == [False, True, True]
+        assert all(r["status"] == 200 and r["path"] == "/speakers" for r in log)
+        assert all(r["engine"] == keepalive_server for r in log)
+        assert all(r["elapsed_ms"] >= 0 for r in log)
+
+    @patch("aivis_reader.time.sleep")
+    def test_retry_on_server_error(self, mock_sleep):
+        """Test that 5xx responses are retried with exponential backoff"""
+        synth = AivisSynthesizer()
+        synth.http_retries = 3
+        synth.http_backoff = 0.5
+        synth.session.request = MagicMock(
+            side_effect=[_response(503), _response(503), _response(200)]
+        )
+
+        res = synth._request("POST", "/synthesis", timeout=(2, 5))
+
+        assert res.status_code == 200
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [0.5, 1.0]
+        assert synth.get_http_stats()["retries"] == 2
+
+    @patch("aivis_reader.time.sleep")
+    def test_retry_is_bounded(self, mock_sleep):
+        """Test that retries stop after http_retries and the error is raised"""
+        synth = AivisSynthesizer()
+        synth.http_retries = 2
+        synth.session.request = MagicMock(side_effect=requests.ConnectionError("x"))
+
+        with pytest.raises(requests.ConnectionError):
+            synth._request("POST", "/audio_query", timeout=(2, 5))
+
+        assert synth.session.request.call_count == 3
+        assert synth.get_http_stats()["failures"] == 1
+
+    def test_client_error_is_not_retried(self):
+        """Test that 4xx errors fail immediately"""
+        synth = AivisSynthesizer()
+        synth.session.request = MagicMock(return_value=_response(422))
+
+        with pytest.raises(requests.HTTPError):
+            synth._request("POST", "/audio_query", timeout=(2, 5))
+        assert synth.session.request.call_count == 1
+
+    def test_adaptive_timeout(self):
+        """Test that the synthesis timeout follows the measured latency"""
+        synth = AivisSynthesizer()
+        assert synth._synthesis_timeout("あ" * 10) == 30
+
+        synth._record_latency("あ" * 10, 1.0)
+        assert synth._synthesis_timeout("あ" * 10) == 6.0
+        assert synth._synthesis_timeout("あ" * 1000) == 120
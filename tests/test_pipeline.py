@@ -0,0 +1,207 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+import aivis_reader
+from aivis_reader import AivisSynthesizer, TaskManager
+from archive_manifest import DayManifest
+
+
+class SlowSynth:
+    """Fake synthesizer that records how many calls run concurrently"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.saved = []
+
+    def synthesize(self, text):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        # Vary the delay so that later lines can finish before earlier ones
+        time.sleep(self.delay * (1 + (len(text) % 3)))
+        with self.lock:
+            self.active -= 1
+        return np.full(10, len(text), dtype=np.float32), 24000
+
+    def save_log(self, full_audio, sr, original_text):
+        self.saved.append((full_audio, sr, original_text))
+
+
+class StreamingSynth(SlowSynth):
+    """Fake synthesizer that delivers each line in three blocks"""
+
+    def synthesize_stream(self, text, on_block):
+        blocks = [np.full(5, i, dtype=np.float32) for i in range(3)]
+        for block in blocks:
+            time.sleep(self.delay)
+            on_block(block, 24000)
+        return np.concatenate(blocks), 24000
+
+
+class TestPipeline:
+    def _run(self, synth, text, depth, **config):
+        player = MagicMock()
+        overrides = {
+            "pipeline_depth": depth,
+            "dictionary": {},
+            "require_hiragana": False,
+            "min_length": 1,
+            "batch_char_budget": 0,
+            "chunk_sentences": False,
+            "segment_crossfade_ms": 0,
+            "archive_streaming": False,
+            **config,
+        }
+        with patch.dict(aivis_reader.cfg.data, overrides):
+            manager = TaskManager(synth, player)
+            manager.add_text(text)
+            manager.task_queue.join()
+        return player
+
+    def test_pipeline_keeps_line_order(self):
+        """Test that pipelined results are enqueued in the original order"""
+        synth = SlowSynth()
+        lines = ["a" * n for n in range(1, 8)]
+        player = self._run(synth, "\n".join(lines), depth=3)
+
+        enqueued = [call.args[0][0] for call in player.enqueue.call_args_list]
+        assert enqueued == [float(len(line)) for line in lines]
+        assert len(synth.saved) == 1
+        player.prewarm.assert_called_once()
+
+    def test_pipeline_depth_bounds_concurrency(self):
+        """Test that no more than pipeline_depth requests are in flight"""
+        synth = SlowSynth()
+        self._run(synth, "\n".join(["abc"] * 8), depth=2)
+        assert 1 < synth.max_active <= 2
+
+    def test_depth_one_is_sequential(self):
+        """Test that depth 1 falls back to one request at a time"""
+        synth = SlowSynth(delay=0.01)
+        self._run(synth, "\n".join(["abc"] * 4), depth=1)
+        assert synth.max_active == 1
+
+    def test_group_short_lines(self):
+        """Test that consecutive short lines are grouped within the budget"""
+        manager = TaskManager(MagicMock(), MagicMock())
+        lines = ["あ" * 5, "い" * 5, "う" * 50, "え" * 5, "お" * 5, "か" * 5]
+        with patch.dict(
+            aivis_reader.cfg.data, {"batch_char_budget": 10, "batch_line_chars": 20}
+        ):
+            groups = manager._group_lines(lines)
+
+        assert groups == [
+            ["あ" * 5, "い" * 5],
+            ["う" * 50],
+            ["え" * 5, "お" * 5],
+            ["か" * 5],
+        ]
+
+    def test_long_lines_are_streamed(self):
+        """Test that streamed blocks reach the player in order, once each"""
+        synth = StreamingSynth(delay=0.01)
+        long_line = "あ" * 70
+        with patch.dict(aivis_reader.cfg.data, {"streaming_min_chars": 60}):
+            player = self._run(synth, f"{long_line}\nshort\n{long_line}", depth=3)
+
+        enqueued = [call.args[0][0] for call in player.enqueue.call_args_list]
+        assert enqueued == [0.0, 1.0, 2.0, 5.0, 0.0, 1.0, 2.0]
+        assert len(synth.saved[0][0]) == 40
+
+    def test_player_and_archive_share_crossfaded_stream(self):
+        """Test that line joins overlap and playback gets the saved samples"""
+        synth = MagicMock()
+        synth.synthesize.return_value = (np.ones(2400, dtype=np.float32), 24000)
+        player = self._run(synth, "a\nb\nc", depth=2, segment_crossfade_ms=30)
+
+        saved, sr, _ = synth.save_log.call_args.args
+        played = np.concatenate([c.args[0] for c in player.enqueue.call_args_list])
+        # 3 lines of 2400 frames with two 720-frame (30 ms) overlaps
+        assert len(saved) == 3 * 2400 - 2 * 720
+        np.testing.assert_array_equal(played, saved)
+        np.testing.assert_allclose(saved[720:-720], 1.0, atol=1e-6)
+
+    def test_archive_is_written_while_reading(self):
+        """Test that the archive gets the played audio and is closed once"""
+        synth = MagicMock()
+        synth.synthesize.side_effect = lambda text: (
+            np.full(100, len(text), dtype=np.float32),
+            24000,
+        )
+        player = self._run(synth, "a\nbb\nccc", depth=2, archive_streaming=True)
+
+        archive = synth.open_log.return_value
+        written = np.concatenate([c.args[0] for c in archive.write.call_args_list])
+        played = np.concatenate([c.args[0] for c in player.enqueue.call_args_list])
+        np.testing.assert_array_equal(written, played)
+        archive.close.assert_called_once()
+        synth.save_log.assert_not_called()
+
+    def test_stopped_archive_is_discarded(self):
+        """Test that skipping a reading discards its partial archive"""
+        synth = MagicMock()
+        synth.synthesize.side_effect = SlowSynth(delay=0.05).synthesize
+        player = MagicMock()
+        overrides = {
+            "pipeline_depth": 1,
+            "dictionary": {},
+            "require_hiragana": False,
+            "min_length": 1,
+            "batch_char_budget": 0,
+            "chunk_sentences": False,
+            "segment_crossfade_ms": 0,
+            "archive_streaming": True,
+        }
+        with patch.dict(aivis_reader.cfg.data, overrides):
+            manager = TaskManager(synth, player)
+            manager.add_text("\n".join(["abc"] * 10))
+            time.sleep(0.3)
+            manager.skip_current()
+            manager.task_queue.join()
+
+        archive = synth.open_log.return_value
+        archive.discard.assert_called_once()
+        archive.close.assert_not_called()
+
+    def test_close_discards_reading_in_progress(self, tmp_path):
+        """Test that quitting mid-reading leaves no partial file behind"""
+        overrides = {
+            "pipeline_depth": 1,
+            "dictionary": {},
+            "require_hiragana": False,
+            "min_length": 1,
+            "batch_char_budget": 0,
+            "chunk_sentences": False,
+            "segment_crossfade_ms": 0,
+            "archive_streaming": True,
+            "archive_index": False,
+            "synth_cache": False,
+            "dropbox_dir": str(tmp_path),
+            "output_dir": "logs",
+            "override_date": "240101",
+        }
+        with patch.dict(aivis_reader.cfg.data, overrides):
+            synth = AivisSynthesizer()
+            synth.force_flac = True
+            synth.synthesize = SlowSynth(delay=0.05).synthesize
+            manager = TaskManager(synth, MagicMock())
+            manager.add_text("\n".join(["abc"] * 20))
+
+            day_dir = tmp_path / "logs" / "240101"
+            deadline = time.monotonic() + 5
+            while not list(day_dir.glob("*.flac")) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert list(day_dir.glob("*.flac"))
+
+            manager.close()
+            synth.shutdown()
+
+        assert list(day_dir.glob("*.flac")) == []
+        records = DayManifest(str(day_dir)).records()
+        assert [r["status"] for r in records] == ["discarded"]
@@ -0,0 +1,80 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+import aivis_reader
+from aivis_reader import AivisSynthesizer
+from audio_dsp import PolyphaseResampler, match_channels, resample
+from fake_engine import FakeEngine
+
+
+def _sine(sr, seconds=0.5, freq=440.0):
+    t = np.arange(int(sr * seconds)) / sr
+    return np.sin(2 * np.pi * freq * t).astype(np.float32)
+
+
+class TestResampler:
+    @pytest.mark.parametrize(
+        "src,dst", [(24000, 48000), (24000, 44100), (48000, 16000)]
+    )
+    def test_sine_is_preserved(self, src, dst):
+        """Test that a tone keeps its shape and the length scales with the rate"""
+        out = resample(_sine(src), src, dst)
+        expected = _sine(dst)
+
+        assert len(out) == len(expected)
+        np.testing.assert_allclose(out[200:-200], expected[200:-200], atol=1e-3)
+
+    def test_streaming_matches_one_shot(self):
+        """Test that feeding blocks gives exactly the one-shot result"""
+        data = _sine(24000)
+        resampler = PolyphaseResampler(24000, 44100)
+        parts = [resampler.process(data[i : i + 777]) for i in range(0, len(data), 777)]
+        parts.append(resampler.flush())
+
+        np.testing.assert_array_equal(
+            np.concatenate(parts), resample(data, 24000, 44100)
+        )
+
+    def test_match_channels(self):
+        """Test mono/stereo conversion in both directions"""
+        mono = np.array([0.5, -0.5], dtype=np.float32)
+        stereo = match_channels(mono, 2)
+        assert stereo.shape == (2, 2)
+        np.testing.assert_array_equal(match_channels(stereo, 1), mono)
+
+
+class TestOutputFormat:
+    @pytest.fixture
+    def synth(self):
+        overrides = {
+            "synth_cache": False,
+            "output_sample_rate": 48000,
+            "output_channels": 2,
+        }
+        with FakeEngine(sample_rate=24000) as engine:
+            with patch.dict(aivis_reader.cfg.data, overrides):
+                s = AivisSynthesizer()
+            s.base_url = engine.url
+            yield s
+
+    def test_all_paths_return_device_format(self, synth):
+        """Test that plain, batched and streamed synthesis share one format"""
+        plain, plain_sr = synth.synthesize("テストです。")
+        batch = synth.synthesize_batch(["いち。", "に。"])
+        blocks = []
+        streamed, stream_sr = synth.synthesize_stream(
+            "ストリーミングの確認です。" * 3, lambda b, sr: blocks.append((b, sr))
+        )
+
+        for data, sr in [(plain, plain_sr), *batch, (streamed, stream_sr)] + blocks:
+            assert sr == 48000
+            assert data.ndim == 2 and data.shape[1] == 2
+        np.testing.assert_array_equal(np.concatenate([b for b, _ in blocks]), streamed)
+
+        # The duration is unchanged: twice the samples of the engine's 24 kHz
+        synth.output_sr = synth.output_channels = 0
+        native, native_sr = synth.synthesize("テストです。")
+        assert native_sr == 24000
+        assert len(plain) == 2 * len(native)
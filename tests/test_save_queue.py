@@ -0,0 +1,84 @@
+import threading
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+import aivis_reader
+from aivis_reader import AivisSynthesizer
+from save_queue import SaveQueue
+
+
+@pytest.fixture
+def synth(tmp_path):
+    overrides = {
+        "dropbox_dir": str(tmp_path),
+        "output_dir": "logs",
+        "override_date": "240101",
+        "synth_cache": False,
+        "query_cache": False,
+        "save_workers": 2,
+    }
+    with patch.dict(aivis_reader.cfg.data, overrides):
+        s = AivisSynthesizer()
+        s.force_flac = True
+        yield s
+        s.shutdown()
+
+
+class TestSaveQueue:
+    def test_save_log_does_not_block(self, synth):
+        """Test that save_log returns while the encoder is still busy"""
+        release = threading.Event()
+        jobs = []
+
+        def slow_write(full_audio, sr, job):
+            release.wait(2)
+            jobs.append(job)
+            return True
+
+        synth._write_log = slow_write
+        started = time.perf_counter()
+        for text in ("一つ目", "二つ目", "三つ目"):
+            synth.save_log(np.zeros(10, dtype=np.float32), 24000, text)
+
+        assert time.perf_counter() - started < 0.5
+        assert synth.get_save_stats()["backlog"] == 3
+
+        release.set()
+        assert synth.flush_saves(timeout=2)
+        numbers = sorted(int(job["tags"]["tracknumber"]) for job in jobs)
+        assert numbers == [1, 2, 3]
+        assert synth.get_save_stats()["saved"] == 3
+
+    def test_track_numbers_continue_after_existing_files(self, synth, tmp_path):
+        """Test that numbering continues after files saved before the manifest"""
+        day_dir = tmp_path / "logs" / "240101"
+        day_dir.mkdir(parents=True)
+        (day_dir / "old.flac").write_bytes(b"")
+
+        first = synth._prepare_log_job("一つ目")
+        second = synth._prepare_log_job("二つ目")
+        assert (first["track"], second["track"]) == (2, 3)
+        # Files appearing later do not shift numbers already handed out
+        (day_dir / "new.flac").write_bytes(b"")
+        assert synth._prepare_log_job("三つ目")["track"] == 4
+
+    def test_shutdown_flushes_backlog(self):
+        """Test that shutdown waits for queued saves and counts failures"""
+        queue = SaveQueue()
+        done = []
+
+        def write(i):
+            time.sleep(0.02)
+            done.append(i)
+            return i != 2
+
+        for i in range(4):
+            queue.submit(write, i)
+        queue.shutdown()
+
+        assert done == [0, 1, 2, 3]
+        stats = queue.stats()
+        assert (stats["saved"], stats["failed"], stats["backlog"]) == (3, 1, 0)
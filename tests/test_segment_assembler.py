@@ -0,0 +1,98 @@
+import numpy as np
+
+from segment_assembler import SegmentAssembler
+
+SR = 1000  # 1 frame per millisecond keeps the arithmetic readable
+
+
+def _line(frames=100, value=1.0, channels=None):
+    shape = (frames,) if channels is None else (frames, channels)
+    return np.full(shape, value, dtype=np.float32)
+
+
+def _assemble(assembler, lines):
+    played = [assembler.add(line, SR) for line in lines]
+    played.append(assembler.finish())
+    return np.concatenate(played)
+
+
+class TestSegmentAssembler:
+    def test_crossfade_has_no_dip(self):
+        """Test that overlapped joins keep a constant level between lines"""
+        assembler = SegmentAssembler(crossfade_ms=10)
+        played = _assemble(assembler, [_line(), _line(), _line()])
+
+        assert len(assembler.audio) == 300 - 2 * 10
+        np.testing.assert_allclose(assembler.audio[10:-10], 1.0, atol=1e-6)
+        assert assembler.audio[0] == 0.0 and assembler.audio[-1] == 0.0
+        np.testing.assert_array_equal(played, assembler.audio)
+
+    def test_streamed_blocks_match_whole_lines(self):
+        """Test that a line fed in blocks assembles like the whole line"""
+        rng = np.random.default_rng(0)
+        lines = [rng.standard_normal(n).astype(np.float32) for n in (120, 80, 150)]
+        whole = SegmentAssembler(crossfade_ms=10)
+        _assemble(whole, [line.copy() for line in lines])
+
+        streamed = SegmentAssembler(crossfade_ms=10)
+        played = []
+        for line in lines:
+            for i, start in enumerate(range(0, len(line), 7)):
+                played.append(streamed.add(line[start : start + 7], SR, i == 0))
+        played.append(streamed.finish())
+
+        np.testing.assert_allclose(streamed.audio, whole.audio, atol=1e-6)
+        np.testing.assert_array_equal(np.concatenate(played), streamed.audio)
+
+    def test_gap_inserts_silence(self):
+        """Test that gap mode fades out, leaves silence and fades back in"""
+        assembler = SegmentAssembler(crossfade_ms=10, gap_ms=50)
+        _assemble(assembler, [_line(), _line()])
+        audio = assembler.audio
+
+        assert len(audio) == 250
+        np.testing.assert_array_equal(audio[100:150], 0.0)
+        assert audio[99] == 0.0 and audio[150] == 0.0
+        np.testing.assert_allclose(audio[10:90], 1.0)
+
+    def test_no_crossfade_is_plain_concatenation(self):
+        """Test that crossfade 0 releases each line untouched and at once"""
+        assembler = SegmentAssembler(crossfade_ms=0)
+        first = assembler.add(_line(value=0.5), SR)
+
+        np.testing.assert_array_equal(first, _line(value=0.5))
+        assert len(_assemble(assembler, [_line(50)])) == 50
+        assert len(assembler.audio) == 150
+
+    def test_preallocated_buffer(self):
+        """Test that a good size estimate avoids reallocation"""
+        sized = SegmentAssembler(crossfade_ms=10, expected_sec=1.0)
+        _assemble(sized, [_line()] * 5)
+        assert sized.reallocations == 0
+
+        small = SegmentAssembler(crossfade_ms=10)
+        _assemble(small, [_line()] * 5)
+        assert small.reallocations > 0
+        np.testing.assert_array_equal(small.audio, sized.audio)
+
+    def test_later_lines_follow_first_format(self):
+        """Test that a stereo line joins a mono stream as mono"""
+        assembler = SegmentAssembler(crossfade_ms=10)
+        _assemble(assembler, [_line(), _line(channels=2)])
+
+        assert assembler.audio.ndim == 1
+        assert len(assembler.audio) == 190
+
+    def test_unretained_output_matches(self):
+        """Test that dropping released audio keeps the output identical"""
+        rng = np.random.default_rng(1)
+        lines = [rng.standard_normal(n).astype(np.float32) for n in (90, 300, 40, 500)]
+        kept = SegmentAssembler(crossfade_ms=10)
+        dropped = SegmentAssembler(crossfade_ms=10, retain=False)
+
+        expected = _assemble(kept, [line.copy() for line in lines])
+        played = _assemble(dropped, [line.copy() for line in lines])
+
+        np.testing.assert_array_equal(played, expected)
+        assert dropped.total_frames == len(kept.audio)
+        assert len(dropped._buf) < len(kept.audio)
@@ -0,0 +1,146 @@
+import os
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+import requests
+
+import aivis_reader
+from aivis_reader import AivisSynthesizer
+from synth_cache import DiskLRUCache, QueryCache, SynthCache
+
+
+def _key(text, speed=1.0):
+    return SynthCache.make_key(text, 1, {"speedScale": speed}, "1.0.0")
+
+
+class TestSynthCache:
+    def test_key_normalization(self):
+        """Test that whitespace differences map to the same key"""
+        assert _key("こんにちは 世界") == _key("  こんにちは　 世界 ")
+        assert _key("こんにちは") != _key("こんにちは", speed=1.2)
+
+    def test_put_get_roundtrip(self, tmp_path):
+        """Test that stored PCM is returned unchanged"""
+        cache = SynthCache(str(tmp_path), 10 * 1024 * 1024)
+        data = np.linspace(-1, 1, 100, dtype=np.float32)
+
+        assert cache.get(_key("あ")) is None
+        cache.put(_key("あ"), data, 24000)
+        cached, sr = cache.get(_key("あ"))
+
+        assert sr == 24000
+        np.testing.assert_array_equal(cached, data)
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_lru_eviction(self, tmp_path):
+        """Test that the least recently used entry is evicted over the cap"""
+        data = np.zeros(1000, dtype=np.float32)
+        cache = SynthCache(str(tmp_path), 10 * 1024 * 1024)
+        cache.put(_key("a"), data, 24000)
+        entry_size = cache.total_bytes
+
+        cache.max_bytes = entry_size * 2
+        cache.put(_key("b"), data, 24000)
+        cache.get(_key("a"))  # "b" is now the oldest
+        cache.put(_key("c"), data, 24000)
+
+        assert cache.get(_key("b")) is None
+        assert cache.get(_key("a")) is not None
+        assert cache.get(_key("c")) is not None
+        assert cache.stats()["evictions"] == 1
+        assert len(os.listdir(tmp_path)) == 2
+
+    def test_index_survives_restart(self, tmp_path):
+        """Test that a new instance picks up existing cache files"""
+        cache = SynthCache(str(tmp_path), 10 * 1024 * 1024)
+        cache.put(_key("a"), np.zeros(10, dtype=np.float32), 24000)
+
+        reopened = SynthCache(str(tmp_path), 10 * 1024 * 1024)
+        assert reopened.get(_key("a")) is not None
+
+    def test_incomplete_subclass_cannot_be_created(self, tmp_path):
+        """Test that a cache without _read/_write fails at construction"""
+
+        class ReadOnly(DiskLRUCache):
+            def _read(self, path):
+                return None
+
+        with pytest.raises(TypeError):
+            ReadOnly(str(tmp_path), 1024)
+        assert not os.listdir(tmp_path)
+
+
+class TestQueryCache:
+    def test_memory_and_disk_layers(self, tmp_path):
+        """Test that queries are served from memory and survive a restart"""
+        key = QueryCache.make_key("こんにちは", 1, "1.0.0")
+        cache = QueryCache(str(tmp_path), 1024 * 1024)
+        cache.put(key, {"accent_phrases": [1, 2], "speedScale": 1.0})
+
+        query = cache.get(key)
+        query["speedScale"] = 2.0  # callers may patch the returned dict
+        assert cache.get(key)["speedScale"] == 1.0
+
+        reopened = QueryCache(str(tmp_path), 1024 * 1024)
+        assert reopened.get(key) == {"accent_phrases": [1, 2], "speedScale": 1.0}
+        assert reopened.stats()["hits"] == 1
+
+
+class TestSynthesizerCache:
+    def test_unreachable_engine_version_is_retried_later(self):
+        """Test that a failed /version probe is not repeated for every line"""
+        synth = AivisSynthesizer()
+        synth.session.get = MagicMock(side_effect=requests.ConnectionError("down"))
+
+        assert synth.get_engine_version() == "unknown"
+        assert synth.get_engine_version() == "unknown"
+        assert synth.session.get.call_count == 1
+
+        # After the retry interval the engine is asked again
+        synth._engine_version_failed_at -= synth.ENGINE_VERSION_RETRY_SEC
+        synth.session.get = MagicMock()
+        synth.session.get.return_value.json.return_value = "1.0.0"
+        assert synth.get_engine_version() == "1.0.0"
+        assert synth.get_engine_version() == "1.0.0"
+        assert synth.session.get.call_count == 1
+
+    @patch("aivis_reader.sf.read")
+    def test_synthesize_uses_cache(self, mock_read):
+        """Test that a repeated line skips the engine round-trip"""
+        mock_read.side_effect = lambda *a, **k: (np.ones(4000, dtype=np.float32), 8000)
+        synth = AivisSynthesizer()
+        synth.get_engine_version = MagicMock(return_value="1.0.0")
+        synth._request = MagicMock()
+        synth._request.return_value.json.return_value = {}
+        synth._request.return_value.content = b""
+
+        first = synth.synthesize("テストです")
+        calls = synth._request.call_count
+        second = synth.synthesize("テストです")
+
+        assert synth._request.call_count == calls
+        np.testing.assert_array_equal(first[0], second[0])
+        # Fades are applied when lines are joined, not on the cached PCM
+        assert second[0][0] == 1.0
+        assert synth.get_cache_stats()["hits"] == 1
+
+    @patch("aivis_reader.sf.read")
+    def test_param_change_skips_audio_query(self, mock_read):
+        """Test that a slider change re-runs only /synthesis"""
+        mock_read.side_effect = lambda *a, **k: (np.ones(4000, dtype=np.float32), 8000)
+        synth = AivisSynthesizer()
+        synth.get_engine_version = MagicMock(return_value="1.0.0")
+        synth._request = MagicMock()
+        synth._request.return_value.json.return_value = {"accent_phrases": []}
+        synth._request.return_value.content = b""
+
+        synth.synthesize("テストです")
+        with patch.dict(aivis_reader.cfg.data, {"speed": 1.5}):
+            synth.synthesize("テストです")
+
+        paths = [c.args[1] for c in synth._request.call_args_list]
+        assert paths == ["/audio_query", "/synthesis", "/synthesis"]
+        sent = synth._request.call_args_list[-1].kwargs["json"]
+        assert sent["speedScale"] == 1.5
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from audio_dsp import WsolaStretcher
+
+SR = 24000
+
+
+def _tone(seconds=1.0, freq=220.0):
+    t = np.arange(int(SR * seconds)) / SR
+    return (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _stretch(data, rate):
+    stretcher = WsolaStretcher(data, SR)
+    parts = []
+    while (out := stretcher.read(rate, 1200)) is not None:
+        parts.append(out)
+    return np.concatenate(parts)
+
+
+def _frequency(data):
+    crossings = np.count_nonzero(np.diff(np.sign(data)) != 0)
+    return crossings / len(data) * SR / 2
+
+
+class TestWsola:
+    def test_unit_rate_is_transparent(self):
+        """Test that rate 1.0 reproduces the input"""
+        data = _tone()
+        np.testing.assert_allclose(_stretch(data, 1.0), data, atol=1e-6)
+
+    @pytest.mark.parametrize("rate", [0.75, 1.5, 2.0])
+    def test_duration_scales_and_pitch_is_kept(self, rate):
+        """Test that length follows the rate while the tone stays at 220 Hz"""
+        out = _stretch(_tone(2.0), rate)
+
+        assert len(out) == pytest.approx(2 * SR / rate, rel=0.05)
+        assert _frequency(out[500:-500]) == pytest.approx(220, rel=0.02)
+
+    def test_rate_change_mid_line(self):
+        """Test that a new rate applies to the part not yet read"""
+        stretcher = WsolaStretcher(_tone(2.0), SR)
+        head = stretcher.read(1.0, SR // 2)
+        rest = []
+        while (out := stretcher.read(2.0, 1200)) is not None:
+            rest.append(out)
+
+        assert len(head) + len(np.concatenate(rest)) == pytest.approx(
+            SR * (0.5 + 1.5 / 2), rel=0.05
+        )
+
+    def test_stereo_and_short_input(self):
+        """Test that stereo keeps its layout and tiny clips pass through"""
+        stereo = np.stack([_tone(0.5), _tone(0.5)], axis=1)
+        assert _stretch(stereo, 1.3).shape[1] == 2
+        np.testing.assert_allclose(_stretch(_tone(0.001), 2.0), _tone(0.001), atol=1e-6)
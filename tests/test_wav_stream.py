@@ -0,0 +1,133 @@
+import io
+import wave
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+import aivis_reader
+from aivis_reader import AivisSynthesizer
+from audio_dsp import WavStreamDecoder, parse_wav_header
+from fake_engine import FakeEngine, render_wav
+
+
+def _read_wav(buf, dtype="float32"):
+    """Minimal stand-in for soundfile.read (soundfile is mocked in tests)"""
+    with wave.open(buf, "rb") as w:
+        pcm = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+        return pcm.astype(np.float32) / 32768, w.getframerate()
+
+
+class TestWavStreamDecoder:
+    def test_header_needs_enough_bytes(self):
+        """Test that an incomplete header is reported as not ready"""
+        wav = render_wav("テスト", 24000)
+        assert parse_wav_header(wav[:20]) is None
+        fmt = parse_wav_header(wav)
+        assert fmt.sample_rate == 24000
+        assert fmt.channels == 1
+        assert fmt.data_offset == 44
+
+    def test_rejects_non_wav(self):
+        """Test that non-RIFF data raises"""
+        with pytest.raises(ValueError):
+            parse_wav_header(b"ID3\x04" + b"\x00" * 40)
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 100, 4096])
+    def test_chunked_decode_matches_whole(self, chunk_size):
+        """Test that feeding arbitrary chunk sizes yields the same samples"""
+        wav = render_wav("ストリーミング", 16000)
+        expected, sr = _read_wav(io.BytesIO(wav))
+
+        decoder = WavStreamDecoder()
+        blocks = []
+        for i in range(0, len(wav), chunk_size):
+            frames = decoder.feed(wav[i : i + chunk_size])
+            if frames is not None:
+                blocks.append(frames)
+
+        assert decoder.sample_rate == sr
+        np.testing.assert_array_equal(np.concatenate(blocks), expected)
+
+
+class TestSynthesizeStream:
+    @pytest.fixture
+    def synth(self):
+        with FakeEngine() as engine:
+            with patch.dict(aivis_reader.cfg.data, {"synth_cache": False}):
+                s = AivisSynthesizer()
+            s.base_url = engine.url
+            with patch("aivis_reader.sf.read", side_effect=_read_wav):
+                yield s
+
+    def test_stream_emits_blocks_before_end(self, synth):
+        """Test that a long line is delivered in several blocks"""
+        blocks = []
+        text = "これはストリーミング再生の確認用の長い文章です。" * 3
+        data, sr = synth.synthesize_stream(text, lambda b, sr: blocks.append(b))
+
+        assert len(blocks) > 2
+        np.testing.assert_array_equal(np.concatenate(blocks), data)
+
+    def test_stream_matches_buffered_synthesis(self, synth):
+        """Test that streaming yields the same samples as synthesize()"""
+        text = "ストリーミングの確認です。" * 4
+        streamed, _ = synth.synthesize_stream(text, lambda b, sr: None)
+        buffered, _ = synth.synthesize(text)
+
+        np.testing.assert_allclose(streamed, buffered, atol=1e-7)
+
+
+def _wav_bytes(samples, sample_rate, audio_format, bits, channels=1):
+    """Build a WAV file by hand (the wave module only writes integer PCM)"""
+    data = samples.tobytes()
+    block_align = channels * bits // 8
+    fmt = (
+        audio_format.to_bytes(2, "little")
+        + channels.to_bytes(2, "little")
+        + sample_rate.to_bytes(4, "little")
+        + (sample_rate * block_align).to_bytes(4, "little")
+        + block_align.to_bytes(2, "little")
+        + bits.to_bytes(2, "little")
+    )
+    body = b"WAVE" + b"fmt " + len(fmt).to_bytes(4, "little") + fmt
+    body += b"data" + len(data).to_bytes(4, "little") + data
+    return b"RIFF" + len(body).to_bytes(4, "little") + body
+
+
+class TestDecodeFastPath:
+    @pytest.fixture
+    def synth(self):
+        with patch.dict(aivis_reader.cfg.data, {"synth_cache": False}):
+            yield AivisSynthesizer()
+
+    def test_pcm16_matches_reference(self, synth):
+        """Test that the header parser path decodes like soundfile would"""
+        wav = render_wav("ゼロコピー", 24000)
+        expected, _ = _read_wav(io.BytesIO(wav))
+
+        data, sr = synth._decode_wav(wav)
+
+        assert sr == 24000
+        assert data.dtype == np.float32
+        np.testing.assert_array_equal(data, expected)
+
+    def test_one_allocation_per_line(self, synth):
+        """Test that the fast path allocates only the output array"""
+        wav = render_wav("割り当て", 24000)
+        data, _ = synth._decode_wav(wav)
+
+        stats = synth.get_decode_stats()
+        assert stats["allocations_per_line"] == 1
+        assert stats["bytes_copied"] == data.nbytes
+        assert stats["fallbacks"] == 0
+
+    def test_float_and_8bit_stereo(self, synth):
+        """Test float32 and unsigned 8-bit WAVs, including stereo layout"""
+        floats = np.array([[0.5, -0.5], [0.25, -0.25]], dtype="<f4")
+        data, _ = synth._decode_wav(_wav_bytes(floats, 8000, 3, 32, channels=2))
+        np.testing.assert_array_equal(data, floats)
+
+        u8 = np.array([0, 128, 255], dtype="u1")
+        data, _ = synth._decode_wav(_wav_bytes(u8, 8000, 1, 8))
+        np.testing.assert_allclose(data, [-1.0, 0.0, 127 / 128])